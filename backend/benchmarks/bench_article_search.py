@@ -0,0 +1,59 @@
+# Article search latency on a synthetic corpus, against the configured DB_DSN.
+#   python -m benchmarks.bench_article_search --seed 1000000   # one-off, commits synthetic articles (slow)
+#   python -m benchmarks.bench_article_search                  # p50/p99 per query shape
+#   python -m benchmarks.bench_article_search --cleanup        # same as bench_repositories --mode postgres --cleanup
+# Words early in datagen.VOCABULARY appear in most articles, late ones in few, so the shapes
+# cover both huge and small match sets. The ILIKE line is the sequential scan search replaces.
+import argparse
+import asyncio
+
+from benchmarks import datagen
+from benchmarks.harness import run
+from news_backend.db import Database
+from news_articles.repositories.search_repository import SearchRepository
+
+ILIKE_SEARCH = """
+        SELECT article_id, title FROM articles
+        WHERE is_published AND content ILIKE $1
+        ORDER BY published_at DESC LIMIT 20
+        """
+
+async def main(args) -> None:
+    db = Database()
+    await db.connect()
+    search = SearchRepository(db)
+    try:
+        if args.cleanup:
+            await datagen.cleanup(db)
+            return
+        if args.seed:
+            await datagen.seed(db, 100, 0, args.seed)
+        total = await db.fetch_value("SELECT reltuples::bigint FROM pg_class WHERE oid = 'articles'::regclass")
+        print(f"articles (estimated): {total}")
+        common, mid, rare = datagen.VOCABULARY[0], datagen.VOCABULARY[len(datagen.VOCABULARY) // 2], datagen.VOCABULARY[-1]
+        first = await search.search_articles(rare, 20)
+        shapes = [
+            (f"rare '{rare}'", lambda i: search.search_articles(rare, 20), args.runs),
+            (f"mid '{mid}'", lambda i: search.search_articles(mid, 20), args.runs),
+            (f"two terms '{mid} {rare}'", lambda i: search.search_articles(f"{mid} {rare}", 20), args.runs),
+            (f"phrase '\"{common} {mid}\"'", lambda i: search.search_articles(f'"{common} {mid}"', 20), args.runs),
+            ("rare, category World", lambda i: search.search_articles(rare, 20, category="World"), args.runs),
+            ("rare, drafts included", lambda i: search.search_articles(rare, 20, published=None), args.runs),
+            # Every article matches and must be ranked
+            (f"common '{common}'", lambda i: search.search_articles(common, 20), max(1, args.runs // 20)),
+        ]
+        if first.next_cursor:
+            shapes.append((f"rare '{rare}' page 2", lambda i: search.search_articles(rare, 20, first.next_cursor), args.runs))
+        for name, operation, runs in shapes:
+            print((await run(name, operation, runs, 1)).line())
+        ilike = await run(f"ILIKE '%{rare}%'", lambda i: db.fetch_rows(ILIKE_SEARCH, (f"%{rare}%",)), max(1, args.runs // 20), 1)
+        print(ilike.line())
+    finally:
+        await db.disconnect()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", type=int, default=0, help="insert this many synthetic articles first")
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--cleanup", action="store_true", help="delete the synthetic rows and exit")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,97 @@
+# Per-request authentication latency, AuthResolver's single RESOLVE_SESSION query against the
+# three sequential lookups it replaces (get_session_by_hash, get_user_by_id,
+# get_permissions_for_user). Tokens are drawn like bench_repositories' validate workload: 1 in 10
+# unknown and 1 in 10 seeded sessions expired, and both paths turn away the same requests.
+#   --mode fake      in-memory pool from FakeData, --latency adds a simulated round trip per
+#                    query in ms, which is where one query instead of three shows
+#   --mode postgres  the configured DB_DSN, seeded with bench_repositories --seed-users/--seed-sessions
+#   python -m benchmarks.bench_auth_resolver --latency 0.5
+#   python -m benchmarks.bench_auth_resolver --mode postgres --concurrency 50 --save pg-auth
+import argparse
+import asyncio
+import os
+import sys
+from datetime import datetime, timezone
+
+from benchmarks import datagen
+from benchmarks.fakes import attach
+from benchmarks.harness import compare_baseline, run, save_baseline
+from news_backend.db import Database
+from news_users.repositories.auth_resolver import AuthResolver
+from news_users.repositories.permissions_repository import Permissions
+from news_users.repositories.sessions_repository import SessionsRepository
+from news_users.repositories.users_repository import UserRepository
+
+INACTIVE_STATUSES = ("banned", "deleted")
+
+class Paths:
+    def __init__(self, db: Database, population: datagen.Population):
+        self.population = population
+        self.users = UserRepository(db)
+        self.sessions = SessionsRepository(db)
+        self.permissions = Permissions(db)
+        self.resolver = AuthResolver(db)
+
+    def token_hash(self, index: int) -> bytes:
+        return os.urandom(32) if index % 10 == 9 else self.population.token_hash(index * 7919)
+
+    async def three_queries(self, index: int) -> bool:
+        session = await self.sessions.get_session_by_hash(self.token_hash(index))
+        if session is None or session.expires_at <= datetime.now(timezone.utc):
+            return False
+        user = await self.users.get_user_by_id(session.user_id)
+        if user is None or user.status_type in INACTIVE_STATUSES:
+            return False
+        frozenset(permission.permission_code for permission in await self.permissions.get_permissions_for_user(user.user_id))
+        return True
+
+    async def resolver_query(self, index: int) -> bool:
+        return await self.resolver.resolve(self.token_hash(index)) is not None
+
+async def main(args) -> None:
+    db = Database(max_size=args.pool_size)
+    queries = None
+    if args.mode == "fake":
+        population = datagen.FakeData(args.users, args.sessions)
+        pool = attach(db, population.responder, args.latency / 1000)
+        queries = lambda: pool.queries
+    else:
+        await db.connect()
+    try:
+        if args.mode == "postgres":
+            population = await datagen.population(db)
+            if not population.users or not population.sessions:
+                raise SystemExit("No seeded users or sessions, seed with bench_repositories --mode postgres --seed-users and --seed-sessions.")
+        print(f"{args.mode} mode, {population.users} users, {population.sessions} sessions, "
+              f"concurrency {args.concurrency}, pool {args.pool_size}")
+        paths = Paths(db, population)
+        # Both paths must agree on which tokens authenticate before their timings mean anything
+        for index in range(min(args.operations, 500)):
+            if await paths.three_queries(index) != await paths.resolver_query(index):
+                raise SystemExit(f"paths disagree on token {index}")
+        workloads = (("three queries", paths.three_queries), ("resolver", paths.resolver_query))
+        results = []
+        for name, operation in workloads:
+            result = await run(name, operation, args.operations, args.concurrency, queries)
+            results.append(result)
+            print(result.line())
+        if args.save:
+            print(f"saved {save_baseline(args.save, args.mode, results)}")
+        if args.compare and not compare_baseline(args.compare, args.mode, results, args.tolerance):
+            sys.exit(1)
+    finally:
+        await db.disconnect()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=("fake", "postgres"), default="fake")
+    parser.add_argument("--operations", type=int, default=20_000, help="operations per path")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--pool-size", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.0, help="fake mode: simulated round trip per query, ms")
+    parser.add_argument("--users", type=int, default=10_000, help="fake mode population")
+    parser.add_argument("--sessions", type=int, default=20_000, help="fake mode population")
+    parser.add_argument("--save", metavar="LABEL", help="save the results as baseline LABEL")
+    parser.add_argument("--compare", metavar="LABEL", help="compare against baseline LABEL")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed p99/throughput drift for --compare")
+    asyncio.run(main(parser.parse_args()))
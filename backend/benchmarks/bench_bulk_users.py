@@ -0,0 +1,67 @@
+# Bulk user import vs per-row inserts against the configured DB_DSN.
+# Every run happens inside a transaction that is rolled back, so the database is left untouched.
+#   python -m benchmarks.bench_bulk_users --sizes 1000 10000 100000
+import argparse
+import asyncio
+import os
+import time
+
+from news_backend.db import Database
+from news_users.data_classes.user_model import NewUser
+from news_users.repositories.users_repository import UserRepository
+
+class _Rollback(Exception):
+    pass
+
+def make_users(count: int, role_id) -> list[NewUser]:
+    prefix = os.urandom(3).hex()
+    return [
+        NewUser(
+            email=f"{prefix}{i}@bench.example", username=f"b{prefix}{i}",
+            first_name="Bench", last_name=str(i),
+            password_hash=os.urandom(32), password_salt=os.urandom(32), user_role=role_id,
+        )
+        for i in range(count)
+    ]
+
+async def timed(db: Database, work) -> float:
+    start = time.perf_counter()
+    try:
+        async with db.transaction() as connection:
+            await work(connection)
+            raise _Rollback
+    except _Rollback:
+        pass
+    return time.perf_counter() - start
+
+async def main(sizes: list[int], per_row_max: int) -> None:
+    db = Database()
+    await db.connect()
+    users = UserRepository(db)
+    try:
+        role_id = await db.fetch_value("SELECT role_id FROM roles LIMIT 1")
+        if role_id is None:
+            raise SystemExit("Needs at least one row in roles.")
+        for size in sizes:
+            batch = make_users(size, role_id)
+            bulk = await timed(db, lambda connection: users.create_users_conn(connection, batch))
+            line = f"{size:>7} rows  bulk {bulk:8.3f}s  ({size / bulk:>9.0f} rows/s)"
+            if size <= per_row_max:
+                async def per_row(connection):
+                    for user in batch:
+                        await users.create_user_conn(
+                            connection, user.email, user.username, user.first_name, user.last_name,
+                            user.password_hash, user.password_salt, user.user_role,
+                        )
+                single = await timed(db, per_row)
+                line += f"  per-row {single:8.3f}s  ({size / single:>9.0f} rows/s)  x{single / bulk:.1f}"
+            print(line)
+    finally:
+        await db.disconnect()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--per-row-max", type=int, default=100_000, help="skip the per-row path above this size")
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.per_row_max))
@@ -0,0 +1,31 @@
+# Per-query cost of the Database instrumentation hooks, no database needed.
+#   python -m benchmarks.bench_metrics
+import timeit
+from time import perf_counter
+
+from news_backend.metrics import DatabaseMetrics
+
+def main(number: int = 1_000_000) -> None:
+    metrics = DatabaseMetrics(slow_query_seconds=None)
+    statements = [f"STATEMENT_{i}" for i in range(50)]
+
+    def instrumented(i=[0]):
+        i[0] += 1
+        start = perf_counter()
+        metrics.observe_acquire("primary", perf_counter() - start)
+        metrics.observe_query(statements[i[0] % 50], perf_counter() - start, 10)
+
+    def baseline(i=[0]):
+        i[0] += 1
+        start = perf_counter()
+        statements[i[0] % 50], perf_counter() - start
+
+    base = min(timeit.repeat(baseline, number=number, repeat=5)) / number
+    cost = min(timeit.repeat(instrumented, number=number, repeat=5)) / number
+    print(f"baseline      {base * 1e9:7.0f} ns/query")
+    print(f"instrumented  {cost * 1e9:7.0f} ns/query")
+    print(f"overhead      {(cost - base) * 1e9:7.0f} ns/query")
+    print(f"render        {len(metrics.metrics.render())} bytes of Prometheus text")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# Concurrent repository workloads through Database, UserRepository, SessionsRepository and
+# Permissions, reporting throughput and p50/p99 per workload.
+#   --mode fake      in-memory pool answering from FakeData: only Python-side cost is measured
+#                    (routing, gating, statement lookup, row mapping, dataclass construction).
+#                    --latency adds a simulated round trip per query, in ms.
+#   --mode postgres  the configured DB_DSN, a database built from db/scripts/init.sql and
+#                    seeded once with --seed-users/--seed-sessions/--seed-articles
+# Workloads: login (email lookup, new session, last-login touch), validate (session lookup by
+# token hash with 1 in 10 expired and 1 in 10 unknown, user load, role permission set, sliding
+# expiry touch), admin (three user listing pages, user count, active session page) and mixed
+# (80% validate, 15% login, 5% admin, all interleaved). Listings run in the bulk lane, which
+# only admits a few waiters, so admin runs at --admin-concurrency; sheds show up as errors.
+#   python -m benchmarks.bench_repositories --save fake-main
+#   python -m benchmarks.bench_repositories --compare fake-main        # exits 1 on a regression
+#   python -m benchmarks.bench_repositories --mode postgres --seed-users 100000 --seed-sessions 200000 --seed-articles 100000
+#   python -m benchmarks.bench_repositories --mode postgres --concurrency 50 --save pg-main
+#   python -m benchmarks.bench_repositories --mode postgres --cleanup
+import argparse
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+from benchmarks import datagen
+from benchmarks.fakes import attach
+from benchmarks.harness import compare_baseline, run, save_baseline
+from news_backend.db import Database
+from news_users.repositories.permissions_repository import Permissions
+from news_users.repositories.session_cache import SessionCache
+from news_users.repositories.sessions_repository import SessionsRepository
+from news_users.repositories.users_repository import UserRepository
+
+WORKLOADS = ("login", "validate", "admin", "mixed")
+
+class Workloads:
+    def __init__(self, db: Database, population: datagen.Population, session_cache: bool = False):
+        self.population = population
+        self.users = UserRepository(db)
+        self.sessions = SessionsRepository(db, cache=SessionCache() if session_cache else None)
+        self.permissions = Permissions(db)
+
+    async def login(self, index: int) -> None:
+        user = await self.users.get_user_by_email(self.population.email(index))
+        if user is None:
+            raise LookupError("seeded user missing")
+        await self.sessions.create_session(user.user_id, os.urandom(32), datetime.now(timezone.utc) + timedelta(hours=24))
+        await self.users.update_user_last_login(user.user_id)
+
+    async def validate(self, index: int) -> None:
+        # Scattered over the population rather than sequential, so caches see a realistic spread
+        scattered = index * 7919
+        token_hash = os.urandom(32) if index % 10 == 9 else self.population.token_hash(scattered)
+        session = await self.sessions.get_session_by_hash(token_hash)
+        if session is None or session.expires_at <= datetime.now(timezone.utc):
+            return
+        user = await self.users.get_user_by_id(session.user_id)
+        await self.permissions.get_permission_set_for_role(user.user_role)
+        await self.sessions.touch_session(session.session_id)
+
+    async def admin(self, index: int) -> None:
+        page = await self.users.list_users(50)
+        for _ in range(2):
+            if page.next_cursor is None:
+                break
+            page = await self.users.list_users(50, page.next_cursor)
+        await self.users.count_users()
+        await self.sessions.list_active_sessions(50)
+
+    async def mixed(self, index: int) -> None:
+        slot = index % 20
+        if slot == 0:
+            await self.admin(index)
+        elif slot < 4:
+            await self.login(index)
+        else:
+            await self.validate(index)
+
+async def main(args) -> None:
+    db = Database(max_size=args.pool_size)
+    queries = None
+    if args.mode == "fake":
+        population = datagen.FakeData(args.users, args.sessions)
+        pool = attach(db, population.responder, args.latency / 1000)
+        queries = lambda: pool.queries
+    else:
+        await db.connect()
+    try:
+        if args.mode == "postgres":
+            if args.cleanup:
+                await datagen.cleanup(db)
+                return
+            if args.seed_users:
+                population = await datagen.seed(db, args.seed_users, args.seed_sessions, args.seed_articles)
+            else:
+                population = await datagen.population(db)
+            if not population.users or not population.sessions:
+                raise SystemExit("No seeded users or sessions, run once with --seed-users and --seed-sessions.")
+        print(f"{args.mode} mode, {population.users} users, {population.sessions} sessions, "
+              f"concurrency {args.concurrency}, pool {args.pool_size}")
+        workloads = Workloads(db, population, args.session_cache)
+        concurrency = {name: args.concurrency for name in args.workloads}
+        concurrency["admin"] = args.admin_concurrency
+        # One untimed pass warms statement handles, loaders and caches
+        for name in args.workloads:
+            await run(name, getattr(workloads, name), min(args.operations, 200), concurrency[name])
+        results = []
+        for name in args.workloads:
+            result = await run(name, getattr(workloads, name), args.operations, concurrency[name], queries)
+            results.append(result)
+            print(result.line())
+        if args.save:
+            print(f"saved {save_baseline(args.save, args.mode, results)}")
+        if args.compare and not compare_baseline(args.compare, args.mode, results, args.tolerance):
+            sys.exit(1)
+    finally:
+        await db.disconnect()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=("fake", "postgres"), default="fake")
+    parser.add_argument("--workloads", nargs="+", choices=WORKLOADS, default=list(WORKLOADS))
+    parser.add_argument("--operations", type=int, default=20_000, help="operations per workload")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--admin-concurrency", type=int, default=4)
+    parser.add_argument("--pool-size", type=int, default=10)
+    parser.add_argument("--session-cache", action="store_true", help="put a SessionCache in front of token lookups")
+    parser.add_argument("--latency", type=float, default=0.0, help="fake mode: simulated round trip per query, ms")
+    parser.add_argument("--users", type=int, default=10_000, help="fake mode population")
+    parser.add_argument("--sessions", type=int, default=20_000, help="fake mode population")
+    parser.add_argument("--seed-users", type=int, default=0, help="postgres mode: seed this many users first")
+    parser.add_argument("--seed-sessions", type=int, default=0)
+    parser.add_argument("--seed-articles", type=int, default=0)
+    parser.add_argument("--cleanup", action="store_true", help="postgres mode: delete the seeded rows and exit")
+    parser.add_argument("--save", metavar="LABEL", help="save the results as baseline LABEL")
+    parser.add_argument("--compare", metavar="LABEL", help="compare against baseline LABEL")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed p99/throughput drift for --compare")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,75 @@
+# Per-request cost of building Request: the eager constructor (headers and cookies dicts built
+# up front, as the server layer had to before) versus Request.from_scope, for a handler that
+# touches nothing, one header, or the session cookie. Allocation is measured with tracemalloc.
+#   python -m benchmarks.bench_request_parsing
+import time
+import tracemalloc
+
+from news_backend.http import Request
+
+SCOPE = {
+    "type": "http",
+    "method": "GET",
+    "path": "/api/feed",
+    "query_string": b"category=Technology&limit=20",
+    "headers": [
+        (b"host", b"news.example"),
+        (b"user-agent", b"Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"),
+        (b"accept", b"application/json, text/plain, */*"),
+        (b"accept-language", b"en-GB,en;q=0.9"),
+        (b"accept-encoding", b"gzip, deflate, br"),
+        (b"referer", b"https://news.example/technology"),
+        (b"if-none-match", b'"6f1c3a0c2b9d4e8f9a7b5c3d1e2f4a6b-br"'),
+        (b"cookie", b"session=Zm9vYmFyYmF6cXV4cXV1eHF1dXg; theme=dark; consent=1; _ga=GA1.2.123.456"),
+        (b"sec-fetch-mode", b"cors"),
+        (b"sec-fetch-site", b"same-origin"),
+        (b"connection", b"keep-alive"),
+    ],
+}
+
+def eager(scope: dict) -> Request:
+    headers = {name.decode("latin-1"): value.decode("latin-1") for name, value in scope["headers"]}
+    cookies = {}
+    for pair in headers.get("cookie", "").split(";"):
+        name, sep, value = pair.partition("=")
+        if sep:
+            cookies[name.strip()] = value.strip()
+    return Request(scope["method"], scope["path"], headers, cookies, b"")
+
+def lazy(scope: dict) -> Request:
+    return Request.from_scope(scope)
+
+HANDLERS = {
+    "no access": lambda request: None,
+    "one header": lambda request: request.header("accept-encoding"),
+    "session cookie": lambda request: request.cookies.get("session"),
+}
+
+def measure(build, handler, count: int) -> tuple[float, float]:
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+    kept = []
+    for _ in range(1000):
+        request = build(SCOPE)
+        handler(request)
+        kept.append(request)
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    # Timing again without tracemalloc hooks, which inflate CPU time
+    start = time.perf_counter()
+    for _ in range(count):
+        handler(build(SCOPE))
+    elapsed = time.perf_counter() - start
+    return elapsed / count * 1e6, (after - before) / 1000
+
+def main(count: int = 200_000) -> None:
+    print(f"{'handler':<16} {'eager us':>9} {'lazy us':>9} {'eager B':>9} {'lazy B':>9}")
+    for label, handler in HANDLERS.items():
+        eager_us, eager_bytes = measure(eager, handler, count)
+        lazy_us, lazy_bytes = measure(lazy, handler, count)
+        print(f"{label:<16} {eager_us:9.2f} {lazy_us:9.2f} {eager_bytes:9.0f} {lazy_bytes:9.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# Record -> model mapping cost per 10k rows: dict(record) + **splat into a plain dataclass
+# versus positional construction of the slotted models from projected records.
+# FakeRecord name lookups run in Python where asyncpg's are C, so the dict path's CPU figure
+# is inflated here; allocation figures carry over directly.
+#   python -m benchmarks.bench_row_mapping
+import os
+import time
+import tracemalloc
+import uuid
+from dataclasses import dataclass, fields
+from datetime import datetime, timezone
+
+from benchmarks.fakes import record_type
+from news_users.data_classes.user_model import User, UserSummary
+
+@dataclass
+class UnslottedUser:
+    user_id: uuid.UUID
+    email: str
+    username: str
+    first_name: str
+    last_name: str
+    password_hash: bytes
+    password_salt: bytes
+    password_params: str | None
+    user_role: uuid.UUID
+    status_type: str
+    created_at: datetime
+    updated_at: datetime | None
+    last_login: datetime | None
+    deleted_at: datetime | None
+
+def make_rows(count: int) -> list[dict]:
+    now = datetime.now(timezone.utc)
+    role = uuid.uuid4()
+    return [
+        dict(
+            user_id=uuid.uuid4(), email=f"user{i}@example.com", username=f"user{i}", first_name="First", last_name="Last",
+            password_hash=os.urandom(32), password_salt=os.urandom(32), password_params=None, user_role=role, status_type="active",
+            created_at=now, updated_at=now, last_login=None, deleted_at=None,
+        )
+        for i in range(count)
+    ]
+
+def measure(label: str, records: list, convert) -> None:
+    tracemalloc.start()
+    start = time.perf_counter()
+    models = [convert(record) for record in records]
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # Timing again without tracemalloc hooks, which inflate CPU time
+    start = time.perf_counter()
+    models = [convert(record) for record in records]
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} {elapsed * 1000:7.2f} ms  peak {peak / 1024:8.0f} KiB  ({len(models)} rows)")
+
+def main(count: int = 10_000) -> None:
+    rows = make_rows(count)
+    full_columns = [field.name for field in fields(User)]
+    summary_columns = [field.name for field in fields(UserSummary)]
+    FullRecord, SummaryRecord = record_type(full_columns), record_type(summary_columns)
+    full = [FullRecord(row[name] for name in full_columns) for row in rows]
+    summary = [SummaryRecord(row[name] for name in summary_columns) for row in rows]
+
+    measure("SELECT * -> dict -> **dataclass", full, lambda record: UnslottedUser(**dict(record)))
+    measure("SELECT * -> slotted User(*record)", full, lambda record: User(*record))
+    measure("projection -> UserSummary(*record)", summary, lambda record: UserSummary(*record))
+
+if __name__ == "__main__":
+    main()
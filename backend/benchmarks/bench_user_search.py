@@ -0,0 +1,81 @@
+# User search latency on a large users table, against the configured DB_DSN.
+#   python -m benchmarks.bench_user_search --seed 1000000   # one-off, commits synthetic users
+#   python -m benchmarks.bench_user_search                  # p50/p99 per query shape
+#   python -m benchmarks.bench_user_search --cleanup
+import argparse
+import asyncio
+import statistics
+import time
+
+from news_backend.db import Database
+from news_users.repositories.users_repository import UserRepository
+
+SEED_DOMAIN = "search-bench.example"
+
+SEED_USERS = f"""
+        INSERT INTO users (email, username, first_name, last_name, password_hash, password_salt, user_role)
+        SELECT
+            md5(i::text) || '@{SEED_DOMAIN}',
+            'sb' || substr(md5('u' || i::text), 1, 12),
+            'First', 'Last' || i,
+            '\\x00'::bytea, '\\x00'::bytea,
+            $1
+        FROM generate_series($2::int, $3::int) AS i
+        ON CONFLICT DO NOTHING
+        """
+
+async def seed(db: Database, count: int, chunk: int = 100_000) -> None:
+    role_id = await db.fetch_value("SELECT role_id FROM roles LIMIT 1")
+    if role_id is None:
+        raise SystemExit("Needs at least one row in roles.")
+    for start in range(1, count + 1, chunk):
+        await db.execute(SEED_USERS, (role_id, start, min(start + chunk - 1, count)))
+        print(f"seeded {min(start + chunk - 1, count)} / {count}")
+    await db.execute("ANALYZE users")
+
+async def timed(runs: int, call) -> list[float]:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await call()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+def report(label: str, samples: list[float]) -> None:
+    samples.sort()
+    p50 = statistics.median(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    verdict = "ok" if p99 < 10 else "OVER 10ms"
+    print(f"{label:<40} p50 {p50:6.2f} ms  p99 {p99:6.2f} ms  {verdict}")
+
+async def main(args) -> None:
+    db = Database()
+    await db.connect()
+    users = UserRepository(db)
+    try:
+        if args.cleanup:
+            print(await db.execute(f"DELETE FROM users WHERE email LIKE '%@{SEED_DOMAIN}'"))
+            return
+        if args.seed:
+            await seed(db, args.seed)
+        total = await db.fetch_value("SELECT reltuples::bigint FROM pg_class WHERE oid = 'users'::regclass")
+        print(f"users (estimated): {total}")
+        first = await users.search_users("a1b", 20)
+        report("substring 'a1b'", await timed(args.runs, lambda: users.search_users("a1b", 20)))
+        report("substring 'f00d'", await timed(args.runs, lambda: users.search_users("f00d", 20)))
+        # Worst case, every seeded row matches and must be ranked
+        report("substring 'bench' (matches all seeded)", await timed(max(1, args.runs // 20), lambda: users.search_users("bench", 20)))
+        if first.next_cursor:
+            report("substring 'a1b' page 2", await timed(args.runs, lambda: users.search_users("a1b", 20, first.next_cursor)))
+        report("prefix 'sb'", await timed(args.runs, lambda: users.search_usernames_by_prefix("sb", 20)))
+        report("prefix 'sb0a'", await timed(args.runs, lambda: users.search_usernames_by_prefix("sb0a", 20)))
+        report("no match 'zzzzzz'", await timed(args.runs, lambda: users.search_users("zzzzzz", 20)))
+    finally:
+        await db.disconnect()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", type=int, default=0, help="insert this many synthetic users first")
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--cleanup", action="store_true", help="delete the synthetic users and exit")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,241 @@
+# Synthetic data for the load benchmarks. Seeded rows follow fixed formulas (user i has email
+# lb<i>@load-bench.example, session i has token hash sha256("load-bench-session-<i>"), every
+# tenth session is expired), so workloads can name rows without reading them back first.
+# Population describes them, FakeData serves the same rows from memory for the fake pool, and
+# seed()/cleanup() write and remove them on a real database built from db/scripts/init.sql.
+import hashlib
+import os
+from datetime import datetime, timedelta, timezone
+from uuid import UUID, uuid4
+
+from benchmarks.fakes import record_type
+from news_backend.db import Database
+from news_users.repositories import queries
+
+SEED_DOMAIN = "load-bench.example"
+SEED_ROLE = "load-bench"
+
+class Population:
+    def __init__(self, users: int, sessions: int):
+        self.users = users
+        self.sessions = sessions
+
+    def email(self, index: int) -> str:
+        return f"lb{index % self.users + 1}@{SEED_DOMAIN}"
+
+    def token_hash(self, index: int) -> bytes:
+        return hashlib.sha256(f"load-bench-session-{index % self.sessions + 1}".encode()).digest()
+
+    def expired(self, index: int) -> bool:
+        return (index % self.sessions + 1) % 10 == 0
+
+def _columns(projection: str) -> list[str]:
+    return [column.split(" AS ")[-1].strip() for column in projection.split(",")]
+
+# Answers the statements the workloads issue from in-memory rows, in the shapes the queries
+# return them. Anything else gets no rows.
+class FakeData(Population):
+    def __init__(self, users: int = 10_000, sessions: int = 20_000, permissions: int = 40):
+        super().__init__(users, sessions)
+        now = datetime.now(timezone.utc)
+        self.role_id = uuid4()
+        UserRecord = record_type(_columns(queries._USER_COLUMNS))
+        SummaryRecord = record_type(_columns(queries._USER_SUMMARY_COLUMNS))
+        SessionRecord = record_type(_columns(queries._SESSION_COLUMNS))
+        PermissionRecord = record_type(_columns(queries._PERMISSION_COLUMNS))
+        self.CountRecord = record_type(["count"])
+
+        self.users_by_email: dict[str, tuple] = {}
+        self.users_by_id: dict[UUID, tuple] = {}
+        self.summaries: list[tuple] = []
+        for index in range(users):
+            created = now - timedelta(seconds=index)
+            row = UserRecord((
+                uuid4(), self.email(index), f"lb{index + 1}", "Load", f"Bench{index + 1}",
+                os.urandom(32), os.urandom(32), None, self.role_id, "active", created, created, None, None,
+            ))
+            self.users_by_email[row[1]] = row
+            self.users_by_id[row[0]] = row
+            self.summaries.append(SummaryRecord(row[:5] + row[8:]))
+        self.summary_index = {row[0]: index for index, row in enumerate(self.summaries)}
+
+        self.sessions_by_hash: dict[bytes, tuple] = {}
+        self.active_sessions: list[tuple] = []
+        user_ids = list(self.users_by_id)
+        for index in range(sessions):
+            expires = now - timedelta(hours=1) if self.expired(index) else now + timedelta(hours=24)
+            row = SessionRecord((uuid4(), user_ids[index % users], self.token_hash(index), now - timedelta(seconds=index), expires))
+            self.sessions_by_hash[row[2]] = row
+            if not self.expired(index):
+                self.active_sessions.append(row)
+        self.active_index = {row[0]: index for index, row in enumerate(self.active_sessions)}
+
+        self.permissions = [PermissionRecord((uuid4(), f"load-bench.{index}", "Load benchmark")) for index in range(permissions)]
+        self.role = (self.role_id, SEED_ROLE, "Load benchmark users")
+        self.ResolvedRecord = record_type(
+            _columns(queries._SESSION_COLUMNS) + _columns(queries._USER_COLUMNS) + _columns(queries._ROLE_COLUMNS) + ["permission_codes"]
+        )
+
+        self.handlers = {
+            queries.GET_USER_BY_EMAIL: lambda args: self._one(self.users_by_email.get(args[0])),
+            queries.GET_USERS_BY_IDS: lambda args: [self.users_by_id[user_id] for user_id in args[0] if user_id in self.users_by_id],
+            queries.GET_SESSION_BY_HASH: lambda args: self._one(self.sessions_by_hash.get(args[0])),
+            queries.CREATE_SESSION: lambda args: [SessionRecord((uuid4(), args[0], args[1], datetime.now(timezone.utc), args[2]))],
+            queries.GET_PERMISSIONS_BY_ROLE: lambda args: self.permissions if args[0] == self.role_id else [],
+            queries.GET_PERMISSIONS_FOR_USER: lambda args: self.permissions if args[0] in self.users_by_id else [],
+            queries.RESOLVE_SESSION: lambda args: self._resolve(args[0]),
+            queries.LIST_USERS: lambda args: self.summaries[:args[0]],
+            queries.LIST_USERS_AFTER: lambda args: self._after(self.summaries, self.summary_index, args[1], args[2]),
+            queries.LIST_ACTIVE_SESSIONS: lambda args: self.active_sessions[:args[0]],
+            queries.LIST_ACTIVE_SESSIONS_AFTER: lambda args: self._after(self.active_sessions, self.active_index, args[1], args[2]),
+            queries.COUNT_USERS: lambda args: [self.CountRecord((users,))],
+            queries.COUNT_ACTIVE_SESSIONS: lambda args: [self.CountRecord((len(self.active_sessions),))],
+        }
+
+    @staticmethod
+    def _one(row: tuple | None) -> list:
+        return [row] if row is not None else []
+
+    @staticmethod
+    def _after(rows: list, index: dict, last_id: UUID, limit: int) -> list:
+        start = index[last_id] + 1
+        return rows[start:start + limit]
+
+    # Same filtering as the query, every fake user is active
+    def _resolve(self, token_hash: bytes) -> list:
+        session = self.sessions_by_hash.get(token_hash)
+        if session is None or session[4] <= datetime.now(timezone.utc):
+            return []
+        codes = [permission[1] for permission in self.permissions]
+        return [self.ResolvedRecord(tuple(session) + tuple(self.users_by_id[session[1]]) + self.role + (codes,))]
+
+    def responder(self, sql: str, args: tuple) -> list:
+        handler = self.handlers.get(sql)
+        return handler(args) if handler is not None else []
+
+# Seeding, in chunks so each statement stays a bounded transaction
+SEED_ROLE_SQL = """
+        INSERT INTO roles (role_name, descr) VALUES ($1, 'Load benchmark users')
+        ON CONFLICT (role_name) DO UPDATE SET descr = EXCLUDED.descr
+        RETURNING role_id
+        """
+SEED_PERMISSIONS = """
+        INSERT INTO perms (perm_code, descr)
+        SELECT 'load-bench.' || i, 'Load benchmark' FROM generate_series(1, $1::int) AS i
+        ON CONFLICT DO NOTHING
+        """
+SEED_ROLE_PERMISSIONS = """
+        INSERT INTO role_perms (role_id, perm_id)
+        SELECT $1, perm_id FROM perms WHERE perm_code LIKE 'load-bench.%'
+        ON CONFLICT DO NOTHING
+        """
+SEED_USERS = f"""
+        INSERT INTO users (email, username, first_name, last_name, password_hash, password_salt, user_role, status_type, created_at, updated_at)
+        SELECT
+            'lb' || i || '@{SEED_DOMAIN}', 'lb' || i, 'Load', 'Bench' || i,
+            gen_random_bytes(32), gen_random_bytes(32), $1, 'active',
+            now() - i * INTERVAL '1 second', now() - i * INTERVAL '1 second'
+        FROM generate_series($2::int, $3::int) AS i
+        ON CONFLICT DO NOTHING
+        """
+SEED_SESSIONS = f"""
+        INSERT INTO user_sessions (user_id, token_hash, created_at, expires_at)
+        SELECT users.user_id, digest('load-bench-session-' || i, 'sha256'), now() - i * INTERVAL '1 second',
+            CASE WHEN i % 10 = 0 THEN now() - INTERVAL '1 hour' ELSE now() + INTERVAL '24 hours' END
+        FROM generate_series($1::int, $2::int) AS i
+        JOIN users ON users.email = 'lb' || ((i - 1) % $3::int + 1) || '@{SEED_DOMAIN}'
+        ON CONFLICT DO NOTHING
+        """
+SEED_ORGANISATION = """
+        INSERT INTO news_organisations (org_name, org_desc) VALUES ('Load Bench', 'Load benchmark writers')
+        ON CONFLICT (org_name) DO UPDATE SET org_desc = EXCLUDED.org_desc
+        RETURNING org_id
+        """
+SEED_WRITERS = f"""
+        INSERT INTO writer_profiles (user_id, org_id)
+        SELECT user_id, $1 FROM users
+        WHERE email = ANY(ARRAY(SELECT 'lb' || i || '@{SEED_DOMAIN}' FROM generate_series(1, $2::int) AS i)::citext[])
+        ON CONFLICT DO NOTHING
+        """
+SEEDED_WRITER_IDS = "SELECT user_id FROM writer_profiles WHERE org_id = $1"
+# Article text is drawn from VOCABULARY with a skew towards its start, so search sees a few very
+# common terms and a long tail of rare ones. One in twenty articles is a draft, the rest are
+# published a minute apart.
+VOCABULARY = (
+    "government minister election vote policy report market company year people week police court "
+    "health hospital school city council price energy climate water team season match player coach "
+    "league final result growth inflation bank interest rate budget tax trade deal union strike "
+    "research study scientist university data space mission satellite planet technology software "
+    "startup investor chip battery vehicle electric network security breach privacy regulation law "
+    "judge trial appeal verdict border migration refugee summit treaty sanction ceasefire protest "
+    "festival film album concert award director actor series premiere museum exhibition gallery "
+    "vaccine virus outbreak surgery cancer diet sleep therapy clinic nurse doctor patient insurance "
+    "wildfire flood drought storm hurricane earthquake volcano glacier forest ocean coral species "
+    "telescope quantum genome protein fossil dinosaur asteroid comet eclipse rover orbit reactor "
+    "fusion hydrogen lithium cobalt semiconductor robotics algorithm encryption blockchain venture "
+    "merger acquisition dividend shareholder pension mortgage housing rent wage employment layoff "
+    "marathon olympics tournament championship transfer stadium referee injury comeback rivalry "
+    "manifesto coalition referendum parliament senate governor mayor diplomat embassy envoy veto"
+).split()
+
+SEED_ARTICLES = """
+        INSERT INTO articles (writer_id, title, slug, category, tags, excerpt, content, is_published, published_at)
+        SELECT
+            ($3::uuid[])[1 + i % array_length($3::uuid[], 1)],
+            left(initcap(words.title), 80), 'load-bench-' || i,
+            (enum_range(NULL::article_category))[1 + i % 8],
+            ARRAY['load-bench', ($4::text[])[1 + i % 40]]::citext[],
+            words.excerpt, words.content,
+            i % 20 <> 0,
+            CASE WHEN i % 20 <> 0 THEN now() - i * INTERVAL '1 minute' END
+        FROM generate_series($1::int, $2::int) AS i
+        CROSS JOIN LATERAL (
+            SELECT
+                string_agg(word, ' ') FILTER (WHERE n <= 6) AS title,
+                string_agg(word, ' ') FILTER (WHERE n <= 25) AS excerpt,
+                string_agg(word, ' ') AS content
+            FROM (
+                SELECT n, ($4::text[])[1 + floor(power(random(), 3) * array_length($4::text[], 1))::int] AS word
+                FROM generate_series(1, 80 + i % 240) AS n
+            ) AS drawn
+        ) AS words
+        ON CONFLICT DO NOTHING
+        """
+COUNT_SEEDED_USERS = f"SELECT count(*) FROM users WHERE email LIKE '%@{SEED_DOMAIN}'"
+COUNT_SEEDED_SESSIONS = f"""
+        SELECT count(*) FROM user_sessions
+        JOIN users USING (user_id) WHERE users.email LIKE '%@{SEED_DOMAIN}'
+        """
+
+async def seed(db: Database, users: int, sessions: int, articles: int, chunk: int = 50_000) -> Population:
+    role_id = await db.fetch_value(SEED_ROLE_SQL, (SEED_ROLE,))
+    await db.execute(SEED_PERMISSIONS, (40,))
+    await db.execute(SEED_ROLE_PERMISSIONS, (role_id,))
+    for start in range(1, users + 1, chunk):
+        await db.execute(SEED_USERS, (role_id, start, min(start + chunk - 1, users)))
+        print(f"users    {min(start + chunk - 1, users)} / {users}")
+    for start in range(1, sessions + 1, chunk):
+        await db.execute(SEED_SESSIONS, (start, min(start + chunk - 1, sessions), users))
+        print(f"sessions {min(start + chunk - 1, sessions)} / {sessions}")
+    if articles:
+        org_id = await db.fetch_value(SEED_ORGANISATION)
+        await db.execute(SEED_WRITERS, (org_id, min(users, 100)))
+        writers = [row[0] for row in await db.fetch_rows(SEEDED_WRITER_IDS, (org_id,))]
+        for start in range(1, articles + 1, chunk):
+            await db.execute(SEED_ARTICLES, (start, min(start + chunk - 1, articles), writers, list(VOCABULARY)))
+            print(f"articles {min(start + chunk - 1, articles)} / {articles}")
+    for table in ("users", "user_sessions", "articles"):
+        await db.execute(f"ANALYZE {table}")
+    return await population(db)
+
+async def population(db: Database) -> Population:
+    return Population(await db.fetch_value(COUNT_SEEDED_USERS), await db.fetch_value(COUNT_SEEDED_SESSIONS))
+
+async def cleanup(db: Database) -> None:
+    async with db.transaction() as connection:
+        print(await connection.execute("DELETE FROM articles WHERE slug LIKE 'load-bench-%'"))
+        print(await connection.execute(f"DELETE FROM writer_profiles WHERE user_id IN (SELECT user_id FROM users WHERE email LIKE '%@{SEED_DOMAIN}')"))
+        print(await connection.execute(f"DELETE FROM users WHERE email LIKE '%@{SEED_DOMAIN}'"))
+        print(await connection.execute("DELETE FROM news_organisations WHERE org_name = 'Load Bench'"))
+        print(await connection.execute("DELETE FROM perms WHERE perm_code LIKE 'load-bench.%'"))
+        print(await connection.execute("DELETE FROM roles WHERE role_name = $1", SEED_ROLE))
@@ -0,0 +1,122 @@
+# Stand-ins for asyncpg objects so Python-side costs can be measured without a database
+import asyncio
+from typing import Callable
+
+class FakeRecord(tuple):
+    # Like asyncpg.Record: a tuple that also supports lookups by column name
+    __slots__ = ()
+    _columns: dict[str, int] = {}
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return tuple.__getitem__(self, self._columns[key])
+        return tuple.__getitem__(self, key)
+
+    def keys(self):
+        return iter(self._columns)
+
+    def get(self, key, default=None):
+        index = self._columns.get(key)
+        return default if index is None else tuple.__getitem__(self, index)
+
+def record_type(columns: list[str]) -> type[FakeRecord]:
+    return type("Record", (FakeRecord,), {"__slots__": (), "_columns": {name: i for i, name in enumerate(columns)}})
+
+# Answers one statement: (sql, args) -> result rows. Unknown statements should return [].
+Responder = Callable[[str, tuple], list]
+
+class FakeStatement:
+    __slots__ = ("connection", "sql")
+
+    def __init__(self, connection: "FakeConnection", sql: str):
+        self.connection = connection
+        self.sql = sql
+
+    async def fetch(self, *args):
+        return await self.connection.fetch(self.sql, *args)
+
+    async def fetchrow(self, *args):
+        return await self.connection.fetchrow(self.sql, *args)
+
+    async def fetchval(self, *args):
+        return await self.connection.fetchval(self.sql, *args)
+
+class FakeTransaction:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+# Stands in for a PreparedConnection, so the statement registry takes its prepared path.
+# latency is the simulated round trip; 0 still yields to the loop once per query, like a real
+# connection waiting on its socket.
+class FakeConnection:
+    def __init__(self, responder: Responder, latency: float = 0.0):
+        self.responder = responder
+        self.latency = latency
+        self.prepared: dict = {}
+        self.queries = 0
+
+    async def _run(self, sql: str, args: tuple) -> list:
+        self.queries += 1
+        await asyncio.sleep(self.latency)
+        return self.responder(sql, args)
+
+    async def prepare(self, sql: str) -> FakeStatement:
+        return FakeStatement(self, sql)
+
+    async def fetch(self, sql: str, *args) -> list:
+        return await self._run(sql, args)
+
+    async def fetchrow(self, sql: str, *args):
+        rows = await self._run(sql, args)
+        return rows[0] if rows else None
+
+    async def fetchval(self, sql: str, *args):
+        rows = await self._run(sql, args)
+        return rows[0][0] if rows else None
+
+    async def execute(self, sql: str, *args) -> str:
+        rows = await self._run(sql, args)
+        return f"{sql.split(None, 1)[0].upper()} {len(rows)}"
+
+    async def executemany(self, sql: str, args: list) -> None:
+        for item in args:
+            await self._run(sql, item)
+
+    def transaction(self, **options) -> FakeTransaction:
+        return FakeTransaction()
+
+# Fixed-size pool of FakeConnections with asyncpg.Pool's acquire/release surface
+class FakePool:
+    def __init__(self, responder: Responder, size: int = 10, latency: float = 0.0):
+        self.connections = [FakeConnection(responder, latency) for _ in range(size)]
+        self._idle: asyncio.Queue[FakeConnection] = asyncio.Queue()
+        for connection in self.connections:
+            self._idle.put_nowait(connection)
+
+    async def acquire(self, timeout: float | None = None) -> FakeConnection:
+        return await asyncio.wait_for(self._idle.get(), timeout)
+
+    async def release(self, connection: FakeConnection) -> None:
+        self._idle.put_nowait(connection)
+
+    async def close(self) -> None:
+        pass
+
+    def get_size(self) -> int:
+        return len(self.connections)
+
+    def get_idle_size(self) -> int:
+        return self._idle.qsize()
+
+    @property
+    def queries(self) -> int:
+        return sum(connection.queries for connection in self.connections)
+
+# Points a news_backend.db.Database at a FakePool sized like its real pool, in place of connect()
+def attach(db, responder: Responder, latency: float = 0.0) -> FakePool:
+    db.pool = FakePool(responder, db.max_size, latency)
+    db.metrics.track_pool("primary", db.pool)
+    return db.pool
@@ -0,0 +1,117 @@
+# Shared by the load benchmarks: a concurrent workload runner, latency percentiles and saved
+# baselines. Baselines are JSON files under benchmarks/baselines/, one per label, and only mean
+# something when compared on the same machine and mode they were recorded with.
+import asyncio
+import json
+import os
+import platform
+import time
+from collections import Counter
+from itertools import count
+from typing import Awaitable, Callable
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+
+def percentile(samples: list[float], fraction: float) -> float:
+    # samples must be sorted
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))] if samples else 0.0
+
+class Result:
+    __slots__ = ("name", "samples", "errors", "elapsed", "queries")
+
+    def __init__(self, name: str, samples: list[float], errors: Counter, elapsed: float, queries: int | None = None):
+        self.name = name
+        self.samples = sorted(samples)
+        self.errors = errors
+        self.elapsed = elapsed
+        self.queries = queries
+
+    @property
+    def p50(self) -> float:
+        return percentile(self.samples, 0.50)
+
+    @property
+    def p99(self) -> float:
+        return percentile(self.samples, 0.99)
+
+    @property
+    def throughput(self) -> float:
+        return len(self.samples) / self.elapsed if self.elapsed else 0.0
+
+    def line(self) -> str:
+        text = f"{self.name:<22} {len(self.samples):>7} ops  {self.throughput:>9.0f} ops/s  p50 {self.p50:7.3f} ms  p99 {self.p99:7.3f} ms"
+        if self.queries is not None and self.samples:
+            text += f"  {self.queries / len(self.samples):4.1f} q/op"
+        if self.errors:
+            text += "  errors " + ", ".join(f"{name}={total}" for name, total in self.errors.most_common())
+        return text
+
+    def to_dict(self) -> dict:
+        return {"ops": len(self.samples), "throughput": self.throughput, "p50_ms": self.p50, "p99_ms": self.p99, "errors": sum(self.errors.values())}
+
+# operation(i) is one logical request, i runs 0..operations-1 across all workers. Failures are
+# counted by exception type and kept out of the latency samples.
+async def run(
+    name: str,
+    operation: Callable[[int], Awaitable[object]],
+    operations: int,
+    concurrency: int,
+    queries: Callable[[], int] | None = None,
+) -> Result:
+    indexes = count()
+    samples: list[float] = []
+    errors: Counter[str] = Counter()
+    queries_before = queries() if queries is not None else 0
+
+    async def worker() -> None:
+        while (index := next(indexes)) < operations:
+            start = time.perf_counter()
+            try:
+                await operation(index)
+            except Exception as exc:
+                errors[type(exc).__name__] += 1
+                continue
+            samples.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return Result(name, samples, errors, elapsed, queries() - queries_before if queries is not None else None)
+
+def _path(label: str) -> str:
+    return os.path.join(BASELINE_DIR, f"{label}.json")
+
+def save_baseline(label: str, mode: str, results: list[Result]) -> str:
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    data = {
+        "mode": mode,
+        "python": platform.python_version(),
+        "machine": platform.node(),
+        "recorded": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "results": {result.name: result.to_dict() for result in results},
+    }
+    path = _path(label)
+    with open(path, "w") as file:
+        json.dump(data, file, indent=2, sort_keys=True)
+    return path
+
+# Prints each workload against the baseline, returns False when any p99 or throughput moved
+# the wrong way by more than tolerance (a fraction)
+def compare_baseline(label: str, mode: str, results: list[Result], tolerance: float = 0.10) -> bool:
+    with open(_path(label)) as file:
+        data = json.load(file)
+    if data["mode"] != mode:
+        print(f"baseline {label} was recorded in {data['mode']} mode, this run is {mode}")
+    passed = True
+    for result in results:
+        baseline = data["results"].get(result.name)
+        if baseline is None:
+            print(f"{result.name:<22} no baseline")
+            continue
+        p99 = result.p99 / baseline["p99_ms"] - 1 if baseline["p99_ms"] else 0.0
+        throughput = result.throughput / baseline["throughput"] - 1 if baseline["throughput"] else 0.0
+        regressed = p99 > tolerance or throughput < -tolerance
+        passed = passed and not regressed
+        verdict = "REGRESSION" if regressed else "ok"
+        print(f"{result.name:<22} p99 {p99:+7.1%}  throughput {throughput:+7.1%}  {verdict}")
+    return passed
@@ -0,0 +1,40 @@
+from dataclasses import dataclass
+from datetime import datetime
+from uuid import UUID
+
+@dataclass(slots=True)
+class Article:
+    article_id: UUID
+    writer_id: UUID
+    title: str
+    slug: str
+    category: str
+    tags: list[str] | None
+    featured_image_url: str | None
+    excerpt: str | None
+    content: str
+    is_published: bool
+    published_at: datetime | None
+    created_at: datetime
+    updated_at: datetime
+
+# Feed and list views, never carries content
+@dataclass(slots=True)
+class ArticleSummary:
+    article_id: UUID
+    writer_id: UUID
+    title: str
+    slug: str
+    category: str
+    tags: list[str] | None
+    featured_image_url: str | None
+    excerpt: str | None
+    published_at: datetime | None
+
+# One search result, headline is the best matching passage with the terms in <mark> tags.
+# The passage comes from stored content as is, render it the way the article body is rendered.
+@dataclass(slots=True)
+class ArticleHit:
+    article: ArticleSummary
+    headline: str
+    rank: float
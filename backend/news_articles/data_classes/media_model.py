@@ -0,0 +1,12 @@
+from dataclasses import dataclass
+from datetime import datetime
+from uuid import UUID
+
+@dataclass(slots=True)
+class Media:
+    media_id: UUID
+    article_id: UUID
+    url: str
+    mime_type: str
+    alt_text: str | None
+    created_at: datetime
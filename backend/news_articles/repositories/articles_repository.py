@@ -0,0 +1,117 @@
+import asyncpg
+from news_backend.db import Database
+from news_backend.pagination import Page, build_page, decode_cursor
+from news_articles.data_classes.article_model import Article, ArticleSummary
+from news_articles.repositories.feed_cache import FeedCache
+from datetime import datetime
+from typing import Iterable
+from uuid import UUID
+
+from .queries import (
+    GET_ARTICLE_BY_ID,
+    GET_ARTICLE_BY_SLUG,
+    CREATE_ARTICLE,
+    PUBLISH_ARTICLE,
+    UNPUBLISH_ARTICLE,
+    DELETE_ARTICLE_BY_ID,
+    LIST_FEED,
+    LIST_FEED_AFTER,
+    LIST_FEED_CATEGORIES,
+    LIST_FEED_CATEGORIES_AFTER,
+    LIST_FEED_TAGS,
+    LIST_FEED_TAGS_AFTER,
+    LIST_FEED_MIXED,
+    LIST_FEED_MIXED_AFTER,
+)
+
+class ArticleRepository:
+    def __init__(self, db: Database, feed_cache: FeedCache | None = None):
+        self.db = db
+        self.feed_cache = feed_cache
+
+    def _to_article(self, row: asyncpg.Record | None) -> Article | None:
+        return Article(*row) if row else None
+
+    def _to_summary(self, row: asyncpg.Record | None) -> ArticleSummary | None:
+        return ArticleSummary(*row) if row else None
+
+    # Read Operations
+    async def get_article_by_id(self, article_id: UUID) -> Article | None:
+        result = await self.db.fetch_row(GET_ARTICLE_BY_ID, (article_id,))
+        return self._to_article(result)
+
+    async def get_article_by_slug(self, slug: str) -> Article | None:
+        result = await self.db.fetch_row(GET_ARTICLE_BY_SLUG, (slug,))
+        return self._to_article(result)
+
+    # Create Operations, articles start as drafts
+    async def create_article(self, writer_id: UUID, title: str, slug: str, category: str, content: str, tags: list[str] | None = None, featured_image_url: str | None = None, excerpt: str | None = None) -> Article:
+        result = await self.db.fetch_row(CREATE_ARTICLE, (writer_id, title, slug, category, tags, featured_image_url, excerpt, content))
+        return self._to_article(result)
+
+    async def create_article_conn(self, connection: asyncpg.Connection, writer_id: UUID, title: str, slug: str, category: str, content: str, tags: list[str] | None = None, featured_image_url: str | None = None, excerpt: str | None = None) -> Article:
+        result = await self.db.fetch_row_conn(connection, CREATE_ARTICLE, (writer_id, title, slug, category, tags, featured_image_url, excerpt, content))
+        return self._to_article(result)
+
+    # Publication Operations. Each one changes what some feeds show, so with a feed cache the
+    # statement runs in a transaction that also notifies the other workers.
+    async def publish_article(self, article_id: UUID, published_at: datetime | None = None) -> ArticleSummary | None:
+        return await self._change_feeds(PUBLISH_ARTICLE, (article_id, published_at))
+
+    async def unpublish_article(self, article_id: UUID) -> ArticleSummary | None:
+        return await self._change_feeds(UNPUBLISH_ARTICLE, (article_id,))
+
+    async def delete_article_by_id(self, article_id: UUID) -> ArticleSummary | None:
+        return await self._change_feeds(DELETE_ARTICLE_BY_ID, (article_id,))
+
+    async def _change_feeds(self, sql: str, params: tuple) -> ArticleSummary | None:
+        if self.feed_cache is None:
+            return self._to_summary(await self.db.fetch_row(sql, params))
+        async with self.db.transaction() as connection:
+            article = await self._change_feeds_conn(connection, sql, params)
+        if article is not None:
+            self.feed_cache.invalidate(article.category, article.tags)
+        return article
+
+    # Transactional Publication Operations
+    async def publish_article_conn(self, connection: asyncpg.Connection, article_id: UUID, published_at: datetime | None = None) -> ArticleSummary | None:
+        return await self._change_feeds_conn(connection, PUBLISH_ARTICLE, (article_id, published_at))
+
+    async def unpublish_article_conn(self, connection: asyncpg.Connection, article_id: UUID) -> ArticleSummary | None:
+        return await self._change_feeds_conn(connection, UNPUBLISH_ARTICLE, (article_id,))
+
+    async def delete_article_by_id_conn(self, connection: asyncpg.Connection, article_id: UUID) -> ArticleSummary | None:
+        return await self._change_feeds_conn(connection, DELETE_ARTICLE_BY_ID, (article_id,))
+
+    async def _change_feeds_conn(self, connection: asyncpg.Connection, sql: str, params: tuple) -> ArticleSummary | None:
+        article = self._to_summary(await self.db.fetch_row_conn(connection, sql, params))
+        if article is not None and self.feed_cache is not None:
+            await self.feed_cache.publish_conn(connection, article.category, article.tags)
+        return article
+
+    def _to_page(self, rows: list[asyncpg.Record], limit: int) -> Page[ArticleSummary]:
+        return build_page([self._to_summary(row) for row in rows], limit, lambda article: (article.published_at, article.article_id))
+
+    # Feed Operations. No categories and no tags is the global feed, otherwise an article shows
+    # when it is in any wanted category or carries any wanted tag. Served through the feed cache
+    # when one is configured.
+    async def get_feed(self, limit: int, cursor: str | None = None, categories: Iterable[str] = (), tags: Iterable[str] = ()) -> Page[ArticleSummary]:
+        key = (tuple(sorted(set(categories))), tuple(sorted({tag.lower() for tag in tags})), limit, cursor)
+        if self.feed_cache is None:
+            return await self._load_feed(*key)
+        return await self.feed_cache.get(key, lambda: self._load_feed(*key))
+
+    async def _load_feed(self, categories: tuple[str, ...], tags: tuple[str, ...], limit: int, cursor: str | None) -> Page[ArticleSummary]:
+        if categories and tags:
+            first, after, filters = LIST_FEED_MIXED, LIST_FEED_MIXED_AFTER, (list(categories), list(tags))
+        elif categories:
+            first, after, filters = LIST_FEED_CATEGORIES, LIST_FEED_CATEGORIES_AFTER, (list(categories),)
+        elif tags:
+            first, after, filters = LIST_FEED_TAGS, LIST_FEED_TAGS_AFTER, (list(tags),)
+        else:
+            first, after, filters = LIST_FEED, LIST_FEED_AFTER, ()
+        if cursor is None:
+            rows = await self.db.fetch_rows(first, (*filters, limit + 1))
+        else:
+            rows = await self.db.fetch_rows(after, (*filters, *decode_cursor(cursor, datetime), limit + 1))
+        return self._to_page(rows, limit)
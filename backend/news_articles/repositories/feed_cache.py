@@ -0,0 +1,84 @@
+import json
+from contextlib import nullcontext
+from time import monotonic
+from typing import Awaitable, Callable
+
+import asyncpg
+from news_backend.cache import CacheStats, SingleFlight, TTLCache
+from news_backend.db import Database
+from news_backend.pagination import Page
+from news_articles.data_classes.article_model import ArticleSummary
+
+FEED_CHANNEL = "article_feed"
+
+# (categories, tags, limit, cursor), categories and tags as sorted tuples, both empty for the global feed
+FeedKey = tuple[tuple[str, ...], tuple[str, ...], int, str | None]
+FeedLoad = Callable[[], Awaitable[Page[ArticleSummary]]]
+
+# Per-worker cache of public feed pages. The LRU keeps whichever pages are hottest, concurrent
+# misses on one page share a single query, and publishing drops every cached page whose feed the
+# article belongs to. Other workers hear about it through NOTIFY once listen() has run, ttl bounds
+# staleness if a notification is missed. For the replica max_lag after an invalidation, pages load
+# from the primary, a replica that has not replayed the publish yet would re-cache the stale page.
+class FeedCache:
+    def __init__(self, db: Database, maxsize: int = 2048, ttl: float = 30.0):
+        self.db = db
+        self._pages: TTLCache[FeedKey, Page[ArticleSummary]] = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._flights: SingleFlight[FeedKey, Page[ArticleSummary]] = SingleFlight()
+        # Bumped by every invalidation, a load that started before one must not store its page
+        self._generation = 0
+        self._invalidated_at = float("-inf")
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._pages.stats
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    async def get(self, key: FeedKey, load: FeedLoad) -> Page[ArticleSummary]:
+        page = self._pages.get(key)
+        if page is not None:
+            return page
+        return await self._flights.run(key, lambda: self._load(key, load))
+
+    async def _load(self, key: FeedKey, load: FeedLoad) -> Page[ArticleSummary]:
+        generation = self._generation
+        recent = monotonic() - self._invalidated_at < self.db.replicas.max_lag
+        with self.db.primary() if recent else nullcontext():
+            page = await load()
+        if generation == self._generation:
+            self._pages.set(key, page)
+        return page
+
+    def invalidate(self, category: str, tags: list[str] | None) -> None:
+        self._generation += 1
+        self._invalidated_at = monotonic()
+        self._flights.forget()
+        tags = {tag.lower() for tag in tags or ()}
+        for key, _ in self._pages.items():
+            categories, feed_tags = key[0], key[1]
+            if not categories and not feed_tags or category in categories or not tags.isdisjoint(feed_tags):
+                self._pages.pop(key)
+
+    def clear(self) -> None:
+        self._generation += 1
+        self._invalidated_at = monotonic()
+        self._flights.forget()
+        self._pages.clear()
+
+    async def listen(self) -> None:
+        await self.db.listen(FEED_CHANNEL, self._on_notify, resync=self._resync)
+
+    # Invalidations missed while the LISTEN connection was down could be anywhere
+    async def _resync(self) -> None:
+        self.clear()
+
+    # Cross-worker Invalidation, delivered when the publishing transaction commits
+    async def publish_conn(self, connection: asyncpg.Connection, category: str, tags: list[str] | None) -> None:
+        payload = json.dumps({"category": category, "tags": list(tags or ())})
+        await self.db.notify_conn(connection, FEED_CHANNEL, payload)
+
+    def _on_notify(self, payload: str) -> None:
+        message = json.loads(payload)
+        self.invalidate(message["category"], message["tags"])
@@ -0,0 +1,48 @@
+import asyncpg
+from news_backend.db import Database
+from news_articles.data_classes.media_model import Media
+from uuid import UUID
+
+from .queries import (
+    GET_MEDIA_BY_ID,
+    LIST_MEDIA_BY_ARTICLE,
+    CREATE_MEDIA,
+    DELETE_MEDIA_BY_ID,
+    LIST_MEDIA_URLS_IN_USE,
+)
+
+class MediaRepository:
+    def __init__(self, db: Database):
+        self.db = db
+
+    def _to_media(self, row: asyncpg.Record | None) -> Media | None:
+        return Media(*row) if row else None
+
+    # Read Operations
+    async def get_media_by_id(self, media_id: UUID) -> Media | None:
+        result = await self.db.fetch_row(GET_MEDIA_BY_ID, (media_id,))
+        return self._to_media(result)
+
+    async def list_media_by_article(self, article_id: UUID) -> list[Media]:
+        results = await self.db.fetch_rows(LIST_MEDIA_BY_ARTICLE, (article_id,))
+        return [self._to_media(result) for result in results]
+
+    async def urls_in_use(self, urls: list[str]) -> set[str]:
+        results = await self.db.fetch_rows(LIST_MEDIA_URLS_IN_USE, (urls,))
+        return {result["url"] for result in results}
+
+    # Create Operations
+    async def create_media(self, article_id: UUID, url: str, mime_type: str, alt_text: str | None = None) -> Media:
+        result = await self.db.fetch_row(CREATE_MEDIA, (article_id, url, mime_type, alt_text))
+        return self._to_media(result)
+
+    async def create_media_conn(self, connection: asyncpg.Connection, article_id: UUID, url: str, mime_type: str, alt_text: str | None = None) -> Media:
+        result = await self.db.fetch_row_conn(connection, CREATE_MEDIA, (article_id, url, mime_type, alt_text))
+        return self._to_media(result)
+
+    # Delete Operations
+    async def delete_media_by_id(self, media_id: UUID) -> None:
+        await self.db.execute(DELETE_MEDIA_BY_ID, (media_id,))
+
+    async def delete_media_by_id_conn(self, connection: asyncpg.Connection, media_id: UUID) -> None:
+        await self.db.execute_conn(connection, DELETE_MEDIA_BY_ID, (media_id,))
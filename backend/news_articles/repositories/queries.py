@@ -0,0 +1,123 @@
+_MEDIA_COLUMNS = "media_id, article_id, url, mime_type, alt_text, created_at"
+_ARTICLE_COLUMNS = "article_id, writer_id, title, slug, category, tags, featured_image_url, excerpt, content, is_published, published_at, created_at, updated_at"
+# List views leave content out, it is most of the row
+_ARTICLE_SUMMARY_COLUMNS = "article_id, writer_id, title, slug, category, tags, featured_image_url, excerpt, published_at"
+
+# Same predicate as the partial feed indexes, every feed query repeats it so the planner can use them
+_PUBLISHED = "is_published AND published_at IS NOT NULL"
+_FEED_ORDER = "ORDER BY published_at DESC, article_id DESC"
+
+def _after(first: int) -> str:
+    return f"AND (published_at, article_id) < (${first}, ${first + 1})"
+
+# One index range per wanted category through LATERAL, each stops after limit rows and a top-N
+# sort merges them. category = ANY(...) would read every match in the window before sorting.
+def _categories_feed(after: str, limit: str) -> str:
+    return f"""
+        SELECT picked.* FROM unnest($1::article_category[]) AS wanted(category)
+        CROSS JOIN LATERAL (
+            SELECT {_ARTICLE_SUMMARY_COLUMNS} FROM articles
+            WHERE {_PUBLISHED} AND articles.category = wanted.category {after}
+            {_FEED_ORDER} LIMIT {limit}
+        ) AS picked"""
+
+# SQL Queries for Media Repository
+GET_MEDIA_BY_ID = f"SELECT {_MEDIA_COLUMNS} FROM media WHERE media_id = $1"
+LIST_MEDIA_BY_ARTICLE = f"SELECT {_MEDIA_COLUMNS} FROM media WHERE article_id = $1 ORDER BY created_at, media_id"
+CREATE_MEDIA = f"""
+        INSERT INTO media (article_id, url, mime_type, alt_text)
+        VALUES ($1, $2, $3, $4)
+        RETURNING {_MEDIA_COLUMNS};
+        """
+DELETE_MEDIA_BY_ID = "DELETE FROM media WHERE media_id = $1"
+LIST_MEDIA_URLS_IN_USE = "SELECT url FROM media WHERE url = ANY($1::text[])"
+
+# SQL Queries for Article Repository
+GET_ARTICLE_BY_ID = f"SELECT {_ARTICLE_COLUMNS} FROM articles WHERE article_id = $1"
+GET_ARTICLE_BY_SLUG = f"SELECT {_ARTICLE_COLUMNS} FROM articles WHERE slug = $1"
+CREATE_ARTICLE = f"""
+        INSERT INTO articles (writer_id, title, slug, category, tags, featured_image_url, excerpt, content)
+        VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+        RETURNING {_ARTICLE_COLUMNS};
+        """
+# Publishing, unpublishing and deleting return the summary so feed caches know what to drop
+PUBLISH_ARTICLE = f"""
+        UPDATE articles SET is_published = TRUE, published_at = COALESCE($2, published_at, CURRENT_TIMESTAMP)
+        WHERE article_id = $1
+        RETURNING {_ARTICLE_SUMMARY_COLUMNS}
+        """
+UNPUBLISH_ARTICLE = f"UPDATE articles SET is_published = FALSE WHERE article_id = $1 RETURNING {_ARTICLE_SUMMARY_COLUMNS}"
+DELETE_ARTICLE_BY_ID = f"DELETE FROM articles WHERE article_id = $1 RETURNING {_ARTICLE_SUMMARY_COLUMNS}"
+# Reader feeds, keyset pagination on (published_at, article_id), the *_AFTER variants take the decoded cursor
+LIST_FEED = f"SELECT {_ARTICLE_SUMMARY_COLUMNS} FROM articles WHERE {_PUBLISHED} {_FEED_ORDER} LIMIT $1"
+LIST_FEED_AFTER = f"SELECT {_ARTICLE_SUMMARY_COLUMNS} FROM articles WHERE {_PUBLISHED} {_after(1)} {_FEED_ORDER} LIMIT $3"
+LIST_FEED_CATEGORIES = f"{_categories_feed('', '$2')} {_FEED_ORDER} LIMIT $2"
+LIST_FEED_CATEGORIES_AFTER = f"{_categories_feed(_after(2), '$4')} {_FEED_ORDER} LIMIT $4"
+LIST_FEED_TAGS = f"SELECT {_ARTICLE_SUMMARY_COLUMNS} FROM articles WHERE {_PUBLISHED} AND tags && $1::citext[] {_FEED_ORDER} LIMIT $2"
+LIST_FEED_TAGS_AFTER = f"""
+        SELECT {_ARTICLE_SUMMARY_COLUMNS} FROM articles
+        WHERE {_PUBLISHED} AND tags && $1::citext[] {_after(2)}
+        {_FEED_ORDER} LIMIT $4
+        """
+# Either a wanted category or a wanted tag, UNION drops articles matching both
+LIST_FEED_MIXED = f"""
+        SELECT * FROM (
+            ({_categories_feed('', '$3')})
+            UNION
+            (SELECT {_ARTICLE_SUMMARY_COLUMNS} FROM articles
+            WHERE {_PUBLISHED} AND tags && $2::citext[]
+            {_FEED_ORDER} LIMIT $3)
+        ) AS merged
+        {_FEED_ORDER} LIMIT $3
+        """
+LIST_FEED_MIXED_AFTER = f"""
+        SELECT * FROM (
+            ({_categories_feed(_after(3), '$5')})
+            UNION
+            (SELECT {_ARTICLE_SUMMARY_COLUMNS} FROM articles
+            WHERE {_PUBLISHED} AND tags && $2::citext[] {_after(3)}
+            {_FEED_ORDER} LIMIT $5)
+        ) AS merged
+        {_FEED_ORDER} LIMIT $5
+        """
+
+# Full-text search over the generated search_vector, served by its GIN index. $1 is the reader's
+# query in websearch syntax (quoted phrases, or, -exclusions), $2 an optional category and $3 an
+# optional published state, NULL meaning any. Every match is ranked, only the returned page is
+# joined back to its content for ts_headline, the expensive part.
+_SEARCH_ARTICLES_MATCHES = f"""
+        SELECT {_ARTICLE_SUMMARY_COLUMNS}, ts_rank(search_vector, query) AS rank
+        FROM articles, websearch_to_tsquery('english', $1) AS query
+        WHERE search_vector @@ query
+        AND ($2::article_category IS NULL OR category = $2::article_category)
+        AND ($3::boolean IS NULL OR is_published = $3::boolean)
+        """
+_SEARCH_HEADLINE = "ts_headline('english', articles.content, websearch_to_tsquery('english', $1), 'StartSel=<mark>, StopSel=</mark>, MaxWords=35, MinWords=15, MaxFragments=2')"
+SEARCH_ARTICLES = f"""
+        SELECT page.*, {_SEARCH_HEADLINE} AS headline
+        FROM (
+            SELECT * FROM ({_SEARCH_ARTICLES_MATCHES}) AS matches
+            ORDER BY rank DESC, article_id DESC LIMIT $4
+        ) AS page
+        JOIN articles USING (article_id)
+        ORDER BY rank DESC, article_id DESC
+        """
+SEARCH_ARTICLES_AFTER = f"""
+        SELECT page.*, {_SEARCH_HEADLINE} AS headline
+        FROM (
+            SELECT * FROM ({_SEARCH_ARTICLES_MATCHES}) AS matches
+            WHERE (rank, article_id) < ($4::real, $5)
+            ORDER BY rank DESC, article_id DESC LIMIT $6
+        ) AS page
+        JOIN articles USING (article_id)
+        ORDER BY rank DESC, article_id DESC
+        """
+
+HOT_QUERIES = ()
+
+BULK_QUERIES = ()
+
+UNPREPARED_QUERIES = ()
+
+# The orphan sweep deciding whether a file is still referenced must see rows committed a moment ago
+PRIMARY_QUERIES = ("LIST_MEDIA_URLS_IN_USE",)
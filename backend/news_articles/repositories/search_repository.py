@@ -0,0 +1,30 @@
+import asyncpg
+from news_backend.db import Database
+from news_backend.pagination import Page, build_page, decode_cursor
+from news_articles.data_classes.article_model import ArticleHit, ArticleSummary
+
+from .queries import (
+    SEARCH_ARTICLES,
+    SEARCH_ARTICLES_AFTER,
+)
+
+class SearchRepository:
+    def __init__(self, db: Database):
+        self.db = db
+
+    # Rows are the summary columns followed by rank and headline
+    def _to_hit(self, row: asyncpg.Record) -> ArticleHit:
+        values = tuple(row)
+        return ArticleHit(ArticleSummary(*values[:-2]), values[-1], values[-2])
+
+    # Best match first. Readers pass published=True, None searches drafts as well.
+    async def search_articles(self, search_term: str, limit: int, cursor: str | None = None, category: str | None = None, published: bool | None = True) -> Page[ArticleHit]:
+        term = search_term.strip()
+        if not term:
+            return Page()
+        if cursor is None:
+            results = await self.db.fetch_rows(SEARCH_ARTICLES, (term, category, published, limit + 1))
+        else:
+            results = await self.db.fetch_rows(SEARCH_ARTICLES_AFTER, (term, category, published, *decode_cursor(cursor, float), limit + 1))
+        hits = [self._to_hit(row) for row in results]
+        return build_page(hits, limit, lambda hit: (hit.rank, hit.article.article_id))
@@ -0,0 +1,67 @@
+import asyncio
+import os
+import time
+from uuid import UUID
+
+from news_articles.data_classes.media_model import Media
+from news_articles.repositories.media_repository import MediaRepository
+from news_backend.http import Request
+from news_backend.uploads import SpooledUpload
+
+# Streams an upload body into media_root (/app/media in the containers) and records it. The type
+# comes from the file's leading bytes, the stored name from its sha256, so the row's url is stable
+# and re-uploading the same file points at the existing copy. PayloadTooLarge and
+# UnsupportedMediaType carry their own 413/415 responses.
+# Concurrent uploads of the same bytes share one file, so a failed insert never removes it inline;
+# sweep_orphans() removes files no row points at once they are older than any upload in flight.
+class MediaUploads:
+    def __init__(
+        self,
+        media: MediaRepository,
+        media_root: str,
+        url_prefix: str = "/media/",
+        allowed: frozenset[str] | None = None,
+        spool_size: int = 1024 * 1024,
+    ):
+        self.media = media
+        self.media_root = media_root
+        self.url_prefix = url_prefix
+        self.allowed = allowed
+        self.spool_size = spool_size
+        os.makedirs(media_root, exist_ok=True)
+
+    async def upload(self, request: Request, article_id: UUID, alt_text: str | None = None) -> Media:
+        upload = SpooledUpload(self.media_root, self.allowed, self.spool_size)
+        stored = await upload.receive(request.stream(upload.max_size))
+        return await self.media.create_media(article_id, self.url_prefix + stored.name, stored.mime_type, alt_text)
+
+    # Periodic maintenance: stored files and abandoned ".upload-" temp files untouched for grace
+    # seconds with no media row, e.g. left by a failed insert or a deleted row. Returns the count.
+    async def sweep_orphans(self, grace: float = 3600.0, batch_size: int = 500) -> int:
+        cutoff = time.time() - grace
+        candidates = await asyncio.to_thread(self._stale_files, cutoff)
+        removed = 0
+        for start in range(0, len(candidates), batch_size):
+            batch = candidates[start:start + batch_size]
+            in_use = await self.media.urls_in_use([self.url_prefix + name for name in batch if not name.startswith(".")])
+            orphans = [name for name in batch if self.url_prefix + name not in in_use]
+            removed += await asyncio.to_thread(self._remove, orphans, cutoff)
+        return removed
+
+    def _stale_files(self, cutoff: float) -> list[str]:
+        with os.scandir(self.media_root) as entries:
+            return [entry.name for entry in entries if entry.is_file() and entry.stat().st_mtime < cutoff]
+
+    # Re-checked just before unlinking, an upload reusing the file since the scan refreshed its mtime
+    def _remove(self, names: list[str], cutoff: float) -> int:
+        removed = 0
+        for name in names:
+            path = os.path.join(self.media_root, name)
+            try:
+                if os.stat(path).st_mtime >= cutoff:
+                    continue
+                os.unlink(path)
+            except FileNotFoundError:
+                continue
+            removed += 1
+        return removed
@@ -0,0 +1,117 @@
+import asyncio
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from math import ceil
+
+from news_backend.http import OverloadedResponse
+
+class Priority(IntEnum):
+    CRITICAL = 0  # authentication and session lookups
+    NORMAL = 1
+    BULK = 2  # admin listings, exports, streams
+
+_REASONS = {"queue_full": "wait queue full", "timeout": "no connection in time"}
+
+# reason is "queue_full" or "timeout"
+class PoolOverloaded(Exception):
+    def __init__(self, pool: str, priority: Priority, reason: str, retry_after: float = 1.0):
+        super().__init__(f"Database pool {pool} is overloaded ({priority.name.lower()} lane, {_REASONS.get(reason, reason)}).")
+        self.pool = pool
+        self.priority = priority
+        self.reason = reason
+        self.retry_after = retry_after
+
+    def to_response(self) -> OverloadedResponse:
+        return OverloadedResponse(retry_after=ceil(self.retry_after))
+
+class AcquireTimeout(PoolOverloaded):
+    pass
+
+# Explicit lane for everything in the block, otherwise the statement registry decides
+_priority: ContextVar[Priority | None] = ContextVar("db_priority", default=None)
+
+@contextmanager
+def lane(priority: Priority):
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+def current_priority() -> Priority | None:
+    return _priority.get()
+
+# Admission control in front of one pool. Connections are handed out highest priority first,
+# lower lanes may only hold part of the pool so critical lookups always find a free slot, and
+# each lane's wait queue is bounded so a spike fails fast instead of queueing until timeouts.
+# Bulk is also guaranteed bulk_share connections: while it holds fewer, its next waiter takes the
+# next free connection ahead of every lane, so saturated critical and normal lanes keep the pool
+# above the bulk limit without starving bulk until its short queue sheds.
+class PoolGate:
+    def __init__(self, name: str, permits: int, reserved: int = 2, max_waiters: int = 100, timeout: float = 5.0, bulk_share: int = 1):
+        self.name = name
+        self.permits = permits
+        self.timeout = timeout
+        self.bulk_share = bulk_share
+        self.in_use = 0
+        normal = max(1, permits - reserved)
+        self.limits = {Priority.CRITICAL: permits, Priority.NORMAL: normal, Priority.BULK: max(1, normal // 2)}
+        self.max_waiters = {Priority.CRITICAL: max_waiters, Priority.NORMAL: max_waiters, Priority.BULK: max(1, max_waiters // 4)}
+        self.waiting = {priority: 0 for priority in Priority}
+        self.held = {priority: 0 for priority in Priority}
+        # Per lane FIFO, cancelled waiters are dropped when they reach the head
+        self._queues: dict[Priority, deque[asyncio.Future]] = {priority: deque() for priority in Priority}
+
+    async def acquire(self, priority: Priority) -> None:
+        if self.in_use < self.limits[priority] and not self._queued_ahead(priority):
+            self._grant(priority)
+            return
+        if self.waiting[priority] >= self.max_waiters[priority]:
+            raise PoolOverloaded(self.name, priority, "queue_full")
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues[priority].append(waiter)
+        self.waiting[priority] += 1
+        try:
+            async with asyncio.timeout(self.timeout):
+                await waiter
+        except BaseException as exc:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just as we gave up, hand the slot on
+                self.release(priority)
+            else:
+                waiter.cancel()
+                self.waiting[priority] -= 1
+            if isinstance(exc, TimeoutError):
+                raise AcquireTimeout(self.name, priority, "timeout") from None
+            raise
+
+    def release(self, priority: Priority) -> None:
+        self.in_use -= 1
+        self.held[priority] -= 1
+        while (priority := self._next()) is not None:
+            waiter = self._queues[priority].popleft()
+            self.waiting[priority] -= 1
+            self._grant(priority)
+            waiter.set_result(None)
+
+    def _grant(self, priority: Priority) -> None:
+        self.in_use += 1
+        self.held[priority] += 1
+
+    # The lane whose head takes the next free connection, None when nobody can go yet
+    def _next(self) -> Priority | None:
+        for queue in self._queues.values():
+            while queue and queue[0].done():
+                queue.popleft()
+        if self._queues[Priority.BULK] and self.held[Priority.BULK] < self.bulk_share and self.in_use < self.permits:
+            return Priority.BULK
+        for priority, queue in self._queues.items():
+            if queue:
+                # Lower lanes have lower limits, if this head cannot go nobody behind it can
+                return priority if self.in_use < self.limits[priority] else None
+        return None
+
+    def _queued_ahead(self, priority: Priority) -> bool:
+        return any(self.waiting[other] for other in Priority if other <= priority)
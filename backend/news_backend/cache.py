@@ -0,0 +1,109 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Generic, Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+_MISSING = object()
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+# Bounded LRU with a per-entry deadline, single event loop only (no locking)
+class TTLCache(Generic[K, V]):
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K, default: Any = None) -> V | Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return default
+        deadline, value = entry
+        if deadline <= time.monotonic():
+            del self._entries[key]
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return value
+
+    def set(self, key: K, value: V, ttl: float | None = None) -> None:
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            self.pop(key)
+            return
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def pop(self, key: K) -> V | None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        self.stats.invalidations += 1
+        return entry[1]
+
+    def clear(self) -> None:
+        self.stats.invalidations += len(self._entries)
+        self._entries.clear()
+
+    def items(self) -> list[tuple[K, V]]:
+        return [(key, value) for key, (_, value) in self._entries.items()]
+
+async def memoize(cache: TTLCache[K, V], key: K, load: Callable[[], Awaitable[V]]) -> V:
+    value = cache.get(key, _MISSING)
+    if value is _MISSING:
+        value = await load()
+        cache.set(key, value)
+    return value
+
+# One load per key at a time: callers arriving while a load is in flight share its result
+# instead of each hitting the database when a hot entry expires
+class SingleFlight(Generic[K, V]):
+    def __init__(self):
+        self._inflight: dict[K, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def run(self, key: K, load: Callable[[], Awaitable[V]]) -> V:
+        future = self._inflight.get(key)
+        if future is None:
+            future = self._inflight[key] = asyncio.ensure_future(load())
+            future.add_done_callback(lambda done: self._done(key, done))
+        # Shielded so one cancelled caller does not cancel the load for the others
+        return await asyncio.shield(future)
+
+    # Later callers start a fresh load, ones already waiting still get the old result
+    def forget(self) -> None:
+        self._inflight.clear()
+
+    def _done(self, key: K, future: asyncio.Future) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not future.cancelled():
+            # Marks the exception retrieved when every caller was cancelled
+            future.exception()
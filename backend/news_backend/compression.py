@@ -0,0 +1,56 @@
+import asyncio
+import gzip
+from functools import lru_cache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Dynamic content, so mid-range levels: most of the ratio for a fraction of the CPU
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml", "image/svg+xml")
+
+def is_compressible(content_type: str | None) -> bool:
+    return content_type is not None and content_type.startswith(COMPRESSIBLE_TYPES)
+
+def _supported() -> tuple[str, ...]:
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+# Picks the coding for an Accept-Encoding value, brotli over gzip at equal q. None means identity
+@lru_cache(maxsize=256)
+def negotiate(accept_encoding: str | None) -> str | None:
+    if not accept_encoding:
+        return None
+    weights: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[coding] = weight
+    best, best_weight = None, 0.0
+    for coding in _supported():
+        weight = weights.get(coding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+def compress(body: bytes, coding: str) -> bytes:
+    if coding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+# Small bodies compress inline, big ones in a worker thread so the event loop keeps serving.
+# zlib and brotli release the GIL while they work.
+async def compress_async(body: bytes, coding: str, offload_size: int = 64 * 1024) -> bytes:
+    if len(body) < offload_size:
+        return compress(body, coding)
+    return await asyncio.to_thread(compress, body, coding)
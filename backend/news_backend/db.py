@@ -1,83 +1,406 @@
+import asyncio
+import importlib
+import logging
 from uuid import UUID
-from contextlib import asynccontextmanager
+from contextlib import AbstractContextManager, asynccontextmanager
+from functools import lru_cache
+from time import perf_counter
+from typing import TYPE_CHECKING, AsyncIterator, Awaitable, Callable, Iterable
 import asyncpg
+from news_backend.backpressure import AcquireTimeout, PoolGate, PoolOverloaded, Priority, current_priority
+from news_backend.metrics import DatabaseMetrics
+from news_backend.replicas import ReplicaSet, is_read_only, is_stuck_to_primary, stick_to_primary, use_primary
+from news_backend.statements import PreparedConnection, StatementRegistry
 from settings import DB_DSN
 
+if TYPE_CHECKING:
+    from news_backend.write_behind import WriteBehindBuffer
+
+logger = logging.getLogger("news_backend.db")
+
+# Fallback metric label for SQL that is not in the statement registry
+@lru_cache(maxsize=1024)
+def _normalize_sql(sql: str) -> str:
+    return " ".join(sql.split())[:120]
+
+# Statement modules registered by every Database. Registration has to happen before the pool
+# opens its first connection, the pool's init hook prepares the hot set on each one as it opens.
+QUERY_MODULES = ("news_users.repositories.queries", "news_articles.repositories.queries")
+
+# Writes, transactions and raw acquires go to the primary. Plain reads go to a healthy replica
+# unless the current request wrote within sticky_seconds, which keeps reads-your-writes, or the
+# statement is in its module's PRIMARY_QUERIES (lookups that must see a write from any request).
+# Pointing replica_dsns at the primary's own DSN exercises the routing locally.
+# Every checkout passes a PoolGate first: bounded per-lane wait queues and acquire_timeout turn
+# overload into PoolOverloaded (a 503 via to_response()) instead of an unbounded queue.
 class Database:
-    def __init__(self):
+    def __init__(
+        self,
+        pgbouncer: bool = False,
+        metrics: DatabaseMetrics | None = None,
+        replica_dsns: list[str] | None = None,
+        max_replica_lag: float = 5.0,
+        sticky_seconds: float = 2.0,
+        min_size: int = 2,
+        max_size: int = 10,
+        command_timeout: float = 60.0,
+        acquire_timeout: float = 5.0,
+        max_waiters: int = 100,
+        reserved_connections: int = 2,
+        bulk_share: int = 1,
+        transaction_idle_timeout: float | None = 30.0,
+        query_modules: Iterable[str] = QUERY_MODULES,
+    ):
         self.pool: asyncpg.Pool | None = None
+        self.pgbouncer = pgbouncer
+        self.min_size = min_size
+        self.max_size = max_size
+        self.command_timeout = command_timeout
+        self.acquire_timeout = acquire_timeout
+        self.max_waiters = max_waiters
+        self.reserved_connections = reserved_connections
+        self.bulk_share = bulk_share
+        self.transaction_idle_timeout = transaction_idle_timeout
+        self.gates: dict[str, PoolGate] = {}
+        self.statements = StatementRegistry(enabled=not pgbouncer)
+        for module_name in query_modules:
+            module = importlib.import_module(module_name)
+            self.statements.register_module(
+                module, hot=module.HOT_QUERIES, exclude=module.UNPREPARED_QUERIES, bulk=module.BULK_QUERIES, primary=module.PRIMARY_QUERIES
+            )
+        self.metrics = metrics or DatabaseMetrics()
+        self.sticky_seconds = sticky_seconds
+        self.replicas = ReplicaSet(replica_dsns or [], self._pool_options(), self.metrics, max_lag=max_replica_lag)
+        self._listener: asyncpg.Connection | None = None
+        self._listeners: list[tuple[str, Callable]] = []
+        self._listener_task: asyncio.Task | None = None
+        # Run after the LISTEN connection is re-established, notifications sent while it was down are lost
+        self._resync_hooks: list[Callable[[], Awaitable[None]]] = []
+        self._disconnect_hooks: list[Callable[[], Awaitable[None]]] = []
+        # One per name for the life of the Database, see WriteBehindBuffer.shared()
+        self.write_behind: dict[str, "WriteBehindBuffer"] = {}
+        # Callbacks waiting for the commit of an open transaction(), keyed by its connection
+        self._after_commit: dict[asyncpg.Connection, list[Callable[[], None]]] = {}
+
+    # Shared by the primary and replica pools
+    def _pool_options(self) -> dict:
+        options = {"min_size": self.min_size, "max_size": self.max_size, "command_timeout": self.command_timeout}
+        if self.pgbouncer:
+            # Transaction pooling cannot keep named statements or session settings, disable every
+            # statement cache. The idle-in-transaction limit is set per transaction instead.
+            options["statement_cache_size"] = 0
+        else:
+            options["connection_class"] = PreparedConnection
+            options["init"] = self.statements.warm_up
+            if self.transaction_idle_timeout is not None:
+                options["server_settings"] = {"idle_in_transaction_session_timeout": str(int(self.transaction_idle_timeout * 1000))}
+        return options
 
     async def connect(self):
         if(self.pool is None):
-            self.pool = await asyncpg.create_pool(
-                dsn=DB_DSN, min_size=2, 
-                max_size=10, command_timeout=60 # Initial connection pool settings
-            )
+            self.pool = await asyncpg.create_pool(dsn=DB_DSN, **self._pool_options())
+            self.metrics.track_pool("primary", self.pool)
+            if self.replicas:
+                await self.replicas.start()
     def safe(self) -> None:
         if self.pool is None:
             raise RuntimeError("Database connection is not established.")
     
+    # Run before the pool closes, e.g. so write-behind buffers get a final flush
+    def on_disconnect(self, hook: Callable[[], Awaitable[None]]) -> None:
+        self._disconnect_hooks.append(hook)
+
     async def disconnect(self):
+        for hook in self._disconnect_hooks:
+            try:
+                await hook()
+            except Exception:
+                logger.exception("Disconnect hook %r failed", hook)
+        if self._listener_task is not None:
+            self._listener_task.cancel()
+            self._listener_task = None
+        if(self._listener):
+            listener, self._listener = self._listener, None
+            listener.remove_termination_listener(self._on_listener_lost)
+            for channel, handler in self._listeners:
+                await listener.remove_listener(channel, handler)
+            await self.pool.release(listener)
+        self._listeners.clear()
+        self._resync_hooks.clear()
+        await self.replicas.close()
         if(self.pool):
             await self.pool.close()
             self.pool = None
 
-    @asynccontextmanager
-    async def transaction(self):
-        connection = await self.pool.acquire()
+    # LISTEN/NOTIFY, all channels share one dedicated connection held from the pool. If that
+    # connection drops it is replaced in the background and every resync hook runs once the
+    # channels are listened to again, so subscribers can reload whatever they missed.
+    async def listen(self, channel: str, callback: Callable[[str], None], resync: Callable[[], Awaitable[None]] | None = None) -> None:
+        self.safe()
+        if self._listener is None and self._listener_task is None:
+            self._listener = await self.pool.acquire()
+            self._listener.add_termination_listener(self._on_listener_lost)
+        def handler(connection, pid, channel, payload):
+            callback(payload)
+        if self._listener is not None:
+            await self._listener.add_listener(channel, handler)
+        self._listeners.append((channel, handler))
+        if resync is not None:
+            self._resync_hooks.append(resync)
+
+    def _on_listener_lost(self, connection: asyncpg.Connection) -> None:
+        if self._listener is None or self.pool is None:
+            return
+        logger.warning("LISTEN connection lost, reconnecting")
+        lost, self._listener = self._listener, None
+        self._listener_task = asyncio.get_running_loop().create_task(self._relisten(lost))
+
+    async def _relisten(self, lost: asyncpg.Connection) -> None:
         try:
-            tx = connection.transaction()
-            await tx.start()
+            await self.pool.release(lost)
+        except Exception:
+            pass
+        delay = 0.5
+        while True:
+            listener = None
+            try:
+                listener = await self.pool.acquire(timeout=self.acquire_timeout)
+                for channel, handler in self._listeners:
+                    await listener.add_listener(channel, handler)
+            except (OSError, asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError) as exc:
+                if listener is not None:
+                    await self.pool.release(listener)
+                logger.warning("LISTEN reconnect failed, retrying in %.1fs: %s", delay, exc)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+                continue
+            break
+        listener.add_termination_listener(self._on_listener_lost)
+        self._listener = listener
+        self._listener_task = None
+        for resync in self._resync_hooks:
+            try:
+                await resync()
+            except Exception:
+                logger.exception("Resync hook %r failed", resync)
+
+    async def notify(self, channel: str, payload: str) -> None:
+        await self.execute("SELECT pg_notify($1, $2)", (channel, payload))
+
+    # Delivered only when the surrounding transaction commits
+    async def notify_conn(self, connection: asyncpg.Connection, channel: str, payload: str) -> None:
+        await self.execute_conn(connection, "SELECT pg_notify($1, $2)", (channel, payload))
+
+    # Passing the statement lets a read-only one run on a replica, without it the primary is used.
+    # The lane comes from an enclosing backpressure.lane() block, else from the statement registry.
+    @asynccontextmanager
+    async def acquire(self, sql: str | None = None) -> AsyncIterator[asyncpg.Connection]:
+        self.safe()
+        name, pool = self._route(sql)
+        priority = explicit if (explicit := current_priority()) is not None else (self.statements.priority_for(sql) if sql is not None else Priority.NORMAL)
+        async with self._checkout(name, pool, priority) as connection:
             yield connection
-            await tx.commit()
-        except:
-            await tx.rollback()
+
+    @asynccontextmanager
+    async def _checkout(self, name: str, pool: asyncpg.Pool, priority: Priority) -> AsyncIterator[asyncpg.Connection]:
+        gate = self._gate(name)
+        start = perf_counter()
+        try:
+            await gate.acquire(priority)
+        except PoolOverloaded as exc:
+            self.metrics.observe_shed(name, priority.name.lower(), exc.reason)
             raise
+        try:
+            try:
+                # The LISTEN connection sits outside the gate, so the pool itself can still be empty
+                connection = await pool.acquire(timeout=self.acquire_timeout)
+            except asyncio.TimeoutError:
+                self.metrics.observe_shed(name, priority.name.lower(), "timeout")
+                raise AcquireTimeout(name, priority, "timeout") from None
+            self.metrics.observe_acquire(name, perf_counter() - start)
+            try:
+                yield connection
+            finally:
+                await pool.release(connection)
         finally:
-            await self.pool.release(connection)
+            gate.release(priority)
+
+    def _gate(self, name: str) -> PoolGate:
+        gate = self.gates.get(name)
+        if gate is None:
+            gate = self.gates[name] = PoolGate(
+                name, self.max_size, reserved=self.reserved_connections, max_waiters=self.max_waiters,
+                timeout=self.acquire_timeout, bulk_share=self.bulk_share,
+            )
+            self.metrics.track_gate(name, gate)
+        return gate
+
+    def _route(self, sql: str | None) -> tuple[str, asyncpg.Pool]:
+        if not self.replicas:
+            return "primary", self.pool
+        if sql is not None and is_read_only(sql):
+            if not is_stuck_to_primary() and not self.statements.is_primary_only(sql):
+                replica = self.replicas.choose()
+                if replica is not None:
+                    return replica.name, replica.pool
+        else:
+            stick_to_primary(self.sticky_seconds)
+        return "primary", self.pool
+
+    # Pins every read in the block to the primary, e.g. around SELECTs of side-effecting functions
+    def primary(self) -> AbstractContextManager[None]:
+        return use_primary()
+
+    def _observe(self, sql: str, start: float, rows: int | None) -> None:
+        name = self.statements.name_for(sql) or _normalize_sql(sql)
+        self.metrics.observe_query(name, perf_counter() - start, rows)
+
+    # The server ends transactions left idle for transaction_idle_timeout, so a stuck handler
+    # cannot pin a connection and its locks forever
+    @asynccontextmanager
+    async def transaction(self, isolation: str | None = None):
+        self.safe()
+        if self.replicas:
+            stick_to_primary(self.sticky_seconds)
+        async with self._checkout("primary", self.pool, explicit if (explicit := current_priority()) is not None else Priority.NORMAL) as connection:
+            callbacks = self._after_commit[connection] = []
+            try:
+                async with connection.transaction(isolation=isolation):
+                    if self.pgbouncer and self.transaction_idle_timeout is not None:
+                        await connection.execute(f"SET LOCAL idle_in_transaction_session_timeout = {int(self.transaction_idle_timeout * 1000)}")
+                    yield connection
+            finally:
+                del self._after_commit[connection]
+        for callback in callbacks:
+            callback()
+
+    # Cache invalidation for _conn operations: runs once the transaction() holding connection has
+    # committed, never on rollback, and right away for a connection outside transaction()
+    def after_commit(self, connection: asyncpg.Connection, callback: Callable[[], None]) -> None:
+        callbacks = self._after_commit.get(connection)
+        if callbacks is None:
+            callback()
+        else:
+            callbacks.append(callback)
     
     # Non-transactional Operations
     async def fetch_value(self, sql: str, params: tuple | None = None) -> str | int | bool | UUID | bytes | None:
-        self.safe()
-        params = params or ()
-        async with self.pool.acquire() as connection:
-            return await connection.fetchval(sql, *params)
+        async with self.acquire(sql) as connection:
+            return await self.fetch_value_conn(connection, sql, params)
 
     async def fetch_one(self, sql: str, params: tuple | None = None) -> dict | None:
-        self.safe()
-        params = params or ()
-        async with self.pool.acquire() as connection:
-            row = await connection.fetchrow(sql, *params)
-            return dict(row) if row else None
+        async with self.acquire(sql) as connection:
+            return await self.fetch_one_conn(connection, sql, params)
 
     async def fetch_all(self, sql: str, params: tuple | None = None) -> list[dict]:
-        self.safe()
-        params = params or ()
-        async with self.pool.acquire() as connection:
-            rows = await connection.fetch(sql, *params)
-            return [dict(r) for r in rows]
+        async with self.acquire(sql) as connection:
+            return await self.fetch_all_conn(connection, sql, params)
+
+    # Raw records, for repositories that map columns straight onto their models
+    async def fetch_row(self, sql: str, params: tuple | None = None) -> asyncpg.Record | None:
+        async with self.acquire(sql) as connection:
+            return await self.fetch_row_conn(connection, sql, params)
+
+    async def fetch_rows(self, sql: str, params: tuple | None = None) -> list[asyncpg.Record]:
+        async with self.acquire(sql) as connection:
+            return await self.fetch_rows_conn(connection, sql, params)
+
+    # Server-side cursor, yields the result set in batches of at most batch_size records
+    async def stream_rows(self, sql: str, params: tuple | None = None, batch_size: int = 500) -> AsyncIterator[list[asyncpg.Record]]:
+        async with self.acquire(sql) as connection:
+            async with connection.transaction(readonly=True):
+                async for rows in self.stream_rows_conn(connection, sql, params, batch_size):
+                    yield rows
     
     async def execute(self, sql: str, params: tuple | None = None) -> str:
-        self.safe()
-        params = params or ()
-        async with self.pool.acquire() as connection:
-            return await connection.execute(sql, *params)
+        async with self.acquire() as connection:
+            return await self.execute_conn(connection, sql, params)
+
+    async def execute_many(self, sql: str, params: list[tuple]) -> None:
+        async with self.acquire() as connection:
+            await self.execute_many_conn(connection, sql, params)
         
-    # Transactional Operations
+    # Transactional Operations, registered statements run through the connection's prepared handle
     async def fetch_value_conn(self, connection: asyncpg.Connection, sql: str, params: tuple | None = None) -> str | int | bool | UUID | bytes | None:
         params = params or ()
-        return await connection.fetchval(sql, *params)
+        start = perf_counter()
+        try:
+            statement = await self.statements.get(connection, sql)
+            if statement is not None:
+                value = await statement.fetchval(*params)
+            else:
+                value = await connection.fetchval(sql, *params)
+        except BaseException:
+            self._observe(sql, start, None)
+            raise
+        self._observe(sql, start, 0 if value is None else 1)
+        return value
     
     async def fetch_one_conn(self, connection: asyncpg.Connection, sql: str, params: tuple | None = None) -> dict | None:
-        params = params or ()
-        row = await connection.fetchrow(sql, *params)
+        row = await self.fetch_row_conn(connection, sql, params)
         return dict(row) if row else None
-    
+
     async def fetch_all_conn(self, connection: asyncpg.Connection, sql: str, params: tuple | None = None) -> list[dict]:
-        params = params or ()
-        rows = await connection.fetch(sql, *params)
+        rows = await self.fetch_rows_conn(connection, sql, params)
         return [dict(r) for r in rows]
     
+    async def fetch_row_conn(self, connection: asyncpg.Connection, sql: str, params: tuple | None = None) -> asyncpg.Record | None:
+        params = params or ()
+        start = perf_counter()
+        try:
+            statement = await self.statements.get(connection, sql)
+            if statement is not None:
+                row = await statement.fetchrow(*params)
+            else:
+                row = await connection.fetchrow(sql, *params)
+        except BaseException:
+            self._observe(sql, start, None)
+            raise
+        self._observe(sql, start, 0 if row is None else 1)
+        return row
+    
+    async def fetch_rows_conn(self, connection: asyncpg.Connection, sql: str, params: tuple | None = None) -> list[asyncpg.Record]:
+        params = params or ()
+        start = perf_counter()
+        try:
+            statement = await self.statements.get(connection, sql)
+            if statement is not None:
+                rows = await statement.fetch(*params)
+            else:
+                rows = await connection.fetch(sql, *params)
+        except BaseException:
+            self._observe(sql, start, None)
+            raise
+        self._observe(sql, start, len(rows))
+        return rows
+
+    # Must be called inside a transaction, cursors cannot outlive it
+    async def stream_rows_conn(self, connection: asyncpg.Connection, sql: str, params: tuple | None = None, batch_size: int = 500) -> AsyncIterator[list[asyncpg.Record]]:
+        params = params or ()
+        cursor = await connection.cursor(sql, *params)
+        while rows := await cursor.fetch(batch_size):
+            yield rows
+    
     async def execute_conn(self, connection: asyncpg.Connection, sql: str, params: tuple | None = None) -> str:
         params = params or ()
-        return await connection.execute(sql, *params)
\ No newline at end of file
+        start = perf_counter()
+        try:
+            status = await connection.execute(sql, *params)
+        except BaseException:
+            self._observe(sql, start, None)
+            raise
+        self._observe(sql, start, 0)
+        return status
+
+    async def execute_many_conn(self, connection: asyncpg.Connection, sql: str, params: list[tuple]) -> None:
+        start = perf_counter()
+        try:
+            await connection.executemany(sql, params)
+        except BaseException:
+            self._observe(sql, start, None)
+            raise
+        self._observe(sql, start, 0)
+
+    # Binary COPY, a single round trip regardless of the number of records
+    async def copy_records_conn(self, connection: asyncpg.Connection, table: str, columns: list[str], records: list[tuple]) -> str:
+        return await connection.copy_records_to_table(table, columns=columns, records=records)
@@ -0,0 +1,60 @@
+import base64
+import dataclasses
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+from typing import Any
+from uuid import UUID
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Field names written for each dataclass, computed once per class. Fields declared with
+# metadata={"serialize": False} (password hashes, token hashes) are never written.
+_plans: dict[type, tuple[str, ...]] = {}
+
+def _plan(cls: type) -> tuple[str, ...]:
+    plan = _plans.get(cls)
+    if plan is None:
+        plan = _plans[cls] = tuple(
+            field.name for field in dataclasses.fields(cls) if field.metadata.get("serialize", True)
+        )
+    return plan
+
+def _default(value: Any) -> Any:
+    cls = type(value)
+    if cls in _plans or dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return {name: getattr(value, name) for name in _plan(cls)}
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return base64.b64encode(value).decode("ascii")
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {cls.__name__} is not JSON serializable")
+
+_stdlib = json.JSONEncoder(default=_default, ensure_ascii=False, separators=(",", ":"))
+
+# orjson when installed, it encodes UUIDs and datetimes natively and hands dataclasses to
+# _default so field plans still apply. Otherwise the stdlib C encoder with the same default.
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS
+
+    def dumps(data: Any) -> bytes:
+        return orjson.dumps(data, default=_default, option=_ORJSON_OPTIONS)
+
+    loads = orjson.loads
+else:
+    def dumps(data: Any) -> bytes:
+        return _stdlib.encode(data).encode("utf-8")
+
+    loads = json.loads
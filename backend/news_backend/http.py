@@ -1,22 +1,143 @@
-import json
-from typing import Any, Optional
+import hashlib
+from typing import AbstractSet, Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Optional
 
+from news_backend.compression import compress_async, is_compressible, negotiate
+from news_backend.encoding import dumps, loads
+
+Send = Callable[[dict], Awaitable[None]]
+Receive = Callable[[], Awaitable[dict]]
+
+_UNSET = object()
+_NO_PERMISSIONS: frozenset[str] = frozenset()
+
+# Built straight from the ASGI scope with from_scope(). Headers, cookies and the JSON body are
+# decoded on first use, most handlers only ever look at one or two headers.
 class Request:
-    def __init__(self, method: str, path: str, headers: dict[str, str], cookies: dict[str, str], body: bytes, 
-                 user: Optional[Any] = None, permissions: Optional[set[str]] = None, session: Optional[dict[str, Any]] = None,):
+    __slots__ = ("method", "path", "query_string", "body", "user", "permissions", "session", "_raw_headers", "_headers", "_cookies", "_json", "_receive")
+
+    def __init__(self, method: str, path: str, headers: dict[str, str], cookies: dict[str, str] | None, body: bytes, 
+                 user: Optional[Any] = None, permissions: Optional[AbstractSet[str]] = None, session: Optional[Any] = None,):
         self.method = method.upper() 
         self.path = path 
-        self.headers = headers 
-        self.cookies = cookies 
+        self.query_string = b""
         self.body = body 
         self.user = user 
-        self.permissions = permissions or set() 
+        self.permissions = permissions or _NO_PERMISSIONS
         self.session = session
-    
+        self._raw_headers = ()
+        self._headers = {key.lower(): value for key, value in headers.items()}
+        self._cookies = cookies
+        self._json = _UNSET
+        self._receive = None
+
+    # With receive the body is not read up front, use stream() or read()
+    @classmethod
+    def from_scope(cls, scope: dict, body: bytes = b"", receive: Receive | None = None) -> "Request":
+        request = cls.__new__(cls)
+        request.method = scope["method"]
+        request.path = scope["path"]
+        request.query_string = scope.get("query_string", b"")
+        request.body = body
+        request.user = None
+        request.permissions = _NO_PERMISSIONS
+        request.session = None
+        request._raw_headers = scope["headers"]
+        request._headers = None
+        request._cookies = None
+        request._json = _UNSET
+        request._receive = receive
+        return request
+
+    # Lowercased names, repeated headers joined the way RFC 9110 allows
+    @property
+    def headers(self) -> dict[str, str]:
+        headers = self._headers
+        if headers is None:
+            headers = self._headers = {}
+            for raw_name, raw_value in self._raw_headers:
+                name, value = raw_name.decode("latin-1"), raw_value.decode("latin-1")
+                if name in headers:
+                    value = f"{headers[name]}{'; ' if name == 'cookie' else ', '}{value}"
+                headers[name] = value
+        return headers
+
+    @property
+    def cookies(self) -> dict[str, str]:
+        cookies = self._cookies
+        if cookies is None:
+            cookies = self._cookies = {}
+            for pair in (self.header("cookie") or "").split(";"):
+                name, sep, value = pair.partition("=")
+                if sep:
+                    cookies.setdefault(name.strip(), value.strip().strip('"'))
+        return cookies
+
+    # Yields the body as the server delivers it, never holding more than one chunk. Can run once.
+    async def stream(self, max_size: int | None = None) -> AsyncIterator[bytes]:
+        if max_size is not None:
+            declared = self.header("content-length")
+            if declared is not None and declared.isdigit() and int(declared) > max_size:
+                raise PayloadTooLarge(max_size)
+        receive = self._receive
+        if receive is None:
+            if max_size is not None and len(self.body) > max_size:
+                raise PayloadTooLarge(max_size)
+            if self.body:
+                yield self.body
+            return
+        self._receive = None
+        received = 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                raise ClientDisconnected()
+            chunk = message.get("body", b"")
+            received += len(chunk)
+            # Chunked uploads carry no Content-Length, so the limit is enforced as bytes arrive
+            if max_size is not None and received > max_size:
+                raise PayloadTooLarge(max_size)
+            if chunk:
+                yield chunk
+            if not message.get("more_body", False):
+                return
+
+    async def read(self, max_size: int | None = None) -> bytes:
+        if self._receive is not None:
+            self.body = b"".join([chunk async for chunk in self.stream(max_size)])
+        elif max_size is not None and len(self.body) > max_size:
+            raise PayloadTooLarge(max_size)
+        return self.body
+
+    # Reads self.body, await read() first when the request came with a receive channel
     def json(self) -> Any:
-        if not self.body: 
-            return None 
-        return json.loads(self.body.decode("utf-8"))
+        if self._json is _UNSET:
+            self._json = loads(self.body) if self.body else None
+        return self._json
+
+    # A lookup before the headers dict exists scans the raw pairs instead of decoding all of them
+    def header(self, name: str, default: str | None = None) -> str | None:
+        name = name.lower()
+        if self._headers is None:
+            target = name.encode("latin-1")
+            found = None
+            for raw_name, raw_value in self._raw_headers:
+                if raw_name == target:
+                    if found is not None:
+                        return self.headers.get(name, default)
+                    found = raw_value
+            return default if found is None else found.decode("latin-1")
+        return self._headers.get(name, default)
+
+class ClientDisconnected(Exception):
+    pass
+
+class PayloadTooLarge(Exception):
+    def __init__(self, max_size: int):
+        super().__init__(f"Request body exceeds {max_size} bytes.")
+        self.max_size = max_size
+
+    def to_response(self) -> "JSONResponse":
+        return JSONResponse({"error": str(self)}, status=413)
 
 class Response:
     def __init__(self, body: bytes, status: int = 200, headers: Optional[dict[str, str]] = None):
@@ -24,6 +145,10 @@ class Response:
         self.status = status
         self.headers = headers or {}
 
+    def with_cache(self, **directives) -> "Response":
+        self.headers["Cache-Control"] = cache_control(**directives)
+        return self
+
     def as_wsgi(self):
         return self.status, self.headers, [self.body]
 
@@ -35,10 +160,140 @@ class Response:
             "body": self.body,
         }
 
+    async def send_asgi(self, send: Send) -> None:
+        message = self.as_asgi()
+        await send({"type": "http.response.start", "status": message["status"], "headers": message["headers"]})
+        await send({"type": "http.response.body", "body": message["body"]})
+
 
 class JSONResponse(Response):
     def __init__(self, data: Any, status: int = 200, headers: Optional[dict[str, str]] = None):
-        body = json.dumps(data).encode("utf-8")
+        body = dumps(data)
         headers = headers or {}
         headers.setdefault("Content-Type", "application/json")
-        super().__init__(body=body, status=status, headers=headers)
\ No newline at end of file
+        super().__init__(body=body, status=status, headers=headers)
+
+# Database pool shedding load, Retry-After tells well-behaved clients when to come back
+class OverloadedResponse(JSONResponse):
+    def __init__(self, retry_after: int = 1):
+        super().__init__(
+            {"error": "Service temporarily overloaded, please retry."},
+            status=503,
+            headers={"Retry-After": str(retry_after)},
+        )
+
+# Writes a JSON array as items arrive, e.g. from a repository stream_* generator, so the first
+# bytes go out before the query finishes and memory stays flat. Items are batched into chunks of
+# roughly chunk_size bytes. ASGI only, the iterator is closed if the client goes away.
+class StreamingJSONResponse(Response):
+    def __init__(self, items: AsyncIterable[Any], status: int = 200, headers: Optional[dict[str, str]] = None, chunk_size: int = 64 * 1024):
+        headers = headers or {}
+        headers.setdefault("Content-Type", "application/json")
+        super().__init__(body=b"", status=status, headers=headers)
+        self.items = items
+        self.chunk_size = chunk_size
+
+    def as_wsgi(self):
+        raise TypeError("StreamingJSONResponse needs an ASGI server, use send_asgi().")
+
+    def as_asgi(self):
+        raise TypeError("StreamingJSONResponse needs an ASGI server, use send_asgi().")
+
+    async def send_asgi(self, send: Send) -> None:
+        headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in self.headers.items()]
+        await send({"type": "http.response.start", "status": self.status, "headers": headers})
+        buffer = bytearray(b"[")
+        first = True
+        try:
+            async for item in self.items:
+                if not first:
+                    buffer += b","
+                first = False
+                buffer += dumps(item)
+                if len(buffer) >= self.chunk_size:
+                    await send({"type": "http.response.body", "body": bytes(buffer), "more_body": True})
+                    buffer.clear()
+        finally:
+            close = getattr(self.items, "aclose", None)
+            if close is not None:
+                await close()
+        buffer += b"]"
+        await send({"type": "http.response.body", "body": bytes(buffer), "more_body": False})
+
+class NotModifiedResponse(Response):
+    def __init__(self, headers: Optional[dict[str, str]] = None):
+        super().__init__(body=b"", status=304, headers=headers)
+
+def cache_control(
+    max_age: int | None = None,
+    s_maxage: int | None = None,
+    stale_while_revalidate: int | None = None,
+    public: bool = False,
+    private: bool = False,
+    no_cache: bool = False,
+    no_store: bool = False,
+    must_revalidate: bool = False,
+    immutable: bool = False,
+) -> str:
+    directives = [name for name, enabled in (
+        ("public", public), ("private", private), ("no-cache", no_cache), ("no-store", no_store),
+        ("must-revalidate", must_revalidate), ("immutable", immutable),
+    ) if enabled]
+    for name, seconds in (("max-age", max_age), ("s-maxage", s_maxage), ("stale-while-revalidate", stale_while_revalidate)):
+        if seconds is not None:
+            directives.append(f"{name}={seconds}")
+    return ", ".join(directives)
+
+# Strong validator from a cheap hash of the uncompressed body
+def compute_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+_CODING_SUFFIXES = ("-gzip", "-br")
+
+# Opaque tag without W/, quotes or the coding suffix finalize_response appends. Only that exact
+# suffix goes, handler-supplied tags may contain "-" themselves ("42-7" must not match "42-9").
+def _etag_base(etag: str) -> str:
+    tag = etag.strip().removeprefix("W/").strip('"')
+    for suffix in _CODING_SUFFIXES:
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)]
+    return tag
+
+# If-None-Match uses weak comparison, and a compressed variant's tag ("<hash>-gzip") matches its base
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    base = _etag_base(etag)
+    return any(_etag_base(candidate) == base for candidate in if_none_match.split(","))
+
+_REVALIDATION_HEADERS = ("ETag", "Cache-Control", "Vary", "Expires", "Content-Location")
+
+# Last step before sending: adds an ETag to successful GET/HEAD responses and answers a matching
+# If-None-Match with 304, then compresses compressible bodies of at least min_size bytes for the
+# negotiated Accept-Encoding. Bodies of offload_size or more are compressed off the event loop.
+async def finalize_response(request: Request, response: Response, min_size: int = 1024, offload_size: int = 64 * 1024) -> Response:
+    if isinstance(response, StreamingJSONResponse):
+        return response
+    headers = response.headers
+    coding = None
+    if is_compressible(headers.get("Content-Type")) and "Content-Encoding" not in headers:
+        vary = headers.get("Vary")
+        if vary is None:
+            headers["Vary"] = "Accept-Encoding"
+        elif "accept-encoding" not in vary.lower():
+            headers["Vary"] = f"{vary}, Accept-Encoding"
+        if len(response.body) >= min_size:
+            coding = negotiate(request.header("accept-encoding"))
+    if response.status == 200 and request.method in ("GET", "HEAD"):
+        etag = headers.get("ETag") or compute_etag(response.body)
+        if coding is not None and not etag.startswith("W/"):
+            # Each representation needs its own strong validator
+            etag = f'{etag[:-1]}-{coding}"'
+        headers["ETag"] = etag
+        if_none_match = request.header("if-none-match")
+        if if_none_match and etag_matches(if_none_match, etag):
+            return NotModifiedResponse({name: headers[name] for name in _REVALIDATION_HEADERS if name in headers})
+    if coding is not None:
+        response.body = await compress_async(response.body, coding, offload_size)
+        headers["Content-Encoding"] = coding
+    return response
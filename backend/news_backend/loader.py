@@ -0,0 +1,74 @@
+import asyncio
+from contextlib import nullcontext
+from typing import Awaitable, Callable, Generic, Hashable, Iterable, TypeVar
+
+from news_backend.replicas import is_stuck_to_primary, use_primary
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+# Coalesces every load() made in the same event-loop iteration into one batch_fn call.
+# Keys already in flight share the pending future, so duplicates never hit the database twice.
+# Batches run in their own task, outside any caller's replica routing, so callers pinned to the
+# primary (a recent write, Database.primary()) are batched apart from the rest and their batch
+# reads the primary. They never share a future with an unpinned caller's replica read.
+class BatchLoader(Generic[K, V]):
+    def __init__(self, batch_fn: Callable[[list[K]], Awaitable[dict[K, V]]], max_batch_size: int = 500):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        # Keyed by (pinned to the primary, key)
+        self._pending: dict[tuple[bool, K], asyncio.Future] = {}
+        self._queues: dict[bool, list[K]] = {False: [], True: []}
+        self._scheduled = False
+        self._tasks: set[asyncio.Task] = set()
+
+    def load(self, key: K) -> Awaitable[V | None]:
+        primary = is_stuck_to_primary()
+        future = self._pending.get((primary, key))
+        if future is not None:
+            return asyncio.shield(future)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending[primary, key] = future
+        self._queues[primary].append(key)
+        if not self._scheduled:
+            self._scheduled = True
+            loop.call_soon(self._dispatch)
+        # Shielded so one cancelled caller does not cancel the result for the others
+        return asyncio.shield(future)
+
+    async def load_many(self, keys: Iterable[K]) -> list[V | None]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def _dispatch(self) -> None:
+        self._scheduled = False
+        for primary, queue in self._queues.items():
+            if not queue:
+                continue
+            self._queues[primary] = []
+            for start in range(0, len(queue), self.max_batch_size):
+                task = asyncio.ensure_future(self._run(queue[start:start + self.max_batch_size], primary))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    # Every key leaves _pending however the batch ends, a cancelled batch cancels its futures
+    # rather than leaving later load()s of the same keys waiting on them forever
+    async def _run(self, keys: list[K], primary: bool) -> None:
+        results: dict[K, V] | None = None
+        error: Exception | None = None
+        try:
+            with use_primary() if primary else nullcontext():
+                results = await self.batch_fn(keys)
+        except Exception as exc:
+            error = exc
+        finally:
+            for key in keys:
+                future = self._pending.pop((primary, key))
+                if future.done():
+                    continue
+                if results is not None:
+                    future.set_result(results.get(key))
+                elif error is not None:
+                    future.set_exception(error)
+                else:
+                    future.cancel()
@@ -0,0 +1,140 @@
+import logging
+from bisect import bisect_left
+from typing import Callable
+
+from news_backend.http import Response
+
+logger = logging.getLogger("news_backend.db")
+
+Labels = tuple[tuple[str, str], ...]
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
+
+# Plain-dict metrics store, cheap enough to update on every query from a single event loop
+class Metrics:
+    def __init__(self):
+        self._meta: dict[str, tuple[str, str]] = {}
+        self._counters: dict[str, dict[Labels, float]] = {}
+        self._histograms: dict[str, dict[Labels, Histogram]] = {}
+        self._gauges: dict[str, Callable[[], dict[Labels, float]]] = {}
+
+    def counter(self, name: str, help: str) -> dict[Labels, float]:
+        self._meta.setdefault(name, ("counter", help))
+        return self._counters.setdefault(name, {})
+
+    def histogram(self, name: str, help: str) -> dict[Labels, Histogram]:
+        self._meta.setdefault(name, ("histogram", help))
+        return self._histograms.setdefault(name, {})
+
+    # Gauges are sampled when rendered, collect returns the current value per label set
+    def gauge(self, name: str, help: str, collect: Callable[[], dict[Labels, float]]) -> None:
+        self._meta[name] = ("gauge", help)
+        self._gauges[name] = collect
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for name, (kind, help) in self._meta.items():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "counter":
+                for labels, value in self._counters[name].items():
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+            elif kind == "gauge":
+                for labels, value in self._gauges[name]().items():
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+            else:
+                for labels, histogram in self._histograms[name].items():
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(labels + (('le', repr(bound)),))} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def to_response(self) -> Response:
+        return Response(body=self.render().encode("utf-8"), headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+class DatabaseMetrics:
+    def __init__(self, metrics: Metrics | None = None, slow_query_seconds: float | None = 0.5):
+        self.metrics = metrics or Metrics()
+        self.slow_query_seconds = slow_query_seconds
+        self._latency = self.metrics.histogram("db_query_duration_seconds", "Statement execution time, excluding pool acquire.")
+        self._rows = self.metrics.counter("db_rows_returned_total", "Rows returned per statement.")
+        self._errors = self.metrics.counter("db_query_errors_total", "Statements that raised.")
+        self._acquire = self.metrics.histogram("db_pool_acquire_seconds", "Time spent waiting for a pool connection.")
+        self._shed = self.metrics.counter("db_pool_shed_total", "Acquires refused by pool admission control.")
+        self._statement_labels: dict[str, Labels] = {}
+        self._pools: dict[str, object] = {}
+        self._gates: dict[str, object] = {}
+
+    def track_pool(self, name: str, pool) -> None:
+        if not self._pools:
+            self.metrics.gauge("db_pool_connections", "Open pool connections by state.", self._collect_pools)
+        self._pools[name] = pool
+
+    def track_gate(self, name: str, gate) -> None:
+        if not self._gates:
+            self.metrics.gauge("db_pool_waiters", "Callers queued for a pool connection by lane.", self._collect_gates)
+        self._gates[name] = gate
+
+    def observe_shed(self, pool_name: str, lane: str, reason: str) -> None:
+        labels = (("pool", pool_name), ("lane", lane), ("reason", reason))
+        self._shed[labels] = self._shed.get(labels, 0) + 1
+
+    def observe_acquire(self, pool_name: str, seconds: float) -> None:
+        labels = (("pool", pool_name),)
+        histogram = self._acquire.get(labels)
+        if histogram is None:
+            histogram = self._acquire[labels] = Histogram()
+        histogram.observe(seconds)
+
+    def observe_query(self, statement: str, seconds: float, rows: int | None) -> None:
+        labels = self._statement_labels.get(statement)
+        if labels is None:
+            labels = self._statement_labels[statement] = (("statement", statement),)
+            self._latency[labels] = Histogram()
+            self._rows[labels] = 0
+        self._latency[labels].observe(seconds)
+        if rows is None:
+            self._errors[labels] = self._errors.get(labels, 0) + 1
+        else:
+            self._rows[labels] += rows
+        if self.slow_query_seconds is not None and seconds >= self.slow_query_seconds:
+            logger.warning("Slow query %s took %.1fms", statement, seconds * 1000)
+
+    def _collect_gates(self) -> dict[Labels, float]:
+        return {
+            (("pool", name), ("lane", priority.name.lower())): waiting
+            for name, gate in self._gates.items()
+            for priority, waiting in gate.waiting.items()
+        }
+
+    def _collect_pools(self) -> dict[Labels, float]:
+        values: dict[Labels, float] = {}
+        for name, pool in self._pools.items():
+            size, idle = pool.get_size(), pool.get_idle_size()
+            values[(("pool", name), ("state", "in_use"))] = size - idle
+            values[(("pool", name), ("state", "idle"))] = idle
+        return values
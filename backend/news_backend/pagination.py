@@ -0,0 +1,54 @@
+import base64
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Generic, TypeVar
+from uuid import UUID
+
+T = TypeVar("T")
+
+@dataclass
+class Page(Generic[T]):
+    items: list[T] = field(default_factory=list)
+    next_cursor: str | None = None
+
+CursorKey = datetime | float | str
+
+# Cursors are opaque to clients: base64 of the last row's (sort key, id). Timestamps are
+# written bare, ranks and strings carry a tag so the key decodes back to its own type.
+def encode_cursor(key: CursorKey, row_id: UUID) -> str:
+    # A NULL key would make a cursor the (key, id) < ($1, $2) comparison never matches
+    if key is None:
+        raise ValueError("Keyset pagination needs a non-NULL sort key.")
+    if isinstance(key, datetime):
+        text = key.isoformat()
+    elif isinstance(key, float):
+        text = f"r:{key!r}"
+    else:
+        text = f"s:{key}"
+    raw = f"{text}|{row_id.hex}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+# kind is the sort key type of the endpoint the cursor is for, a cursor taken from another
+# listing is rejected here rather than failing as a type error in the query
+def decode_cursor(cursor: str, kind: type[CursorKey]) -> tuple[CursorKey, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        text, row_id = raw.rsplit("|", 1)
+        if text.startswith("r:"):
+            key: CursorKey = float(text[2:])
+        elif text.startswith("s:"):
+            key = text[2:]
+        else:
+            key = datetime.fromisoformat(text)
+        if not isinstance(key, kind):
+            raise ValueError(f"expected a {kind.__name__} key")
+        return key, UUID(row_id)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ValueError("Invalid pagination cursor.") from exc
+
+def build_page(items: list[T], limit: int, key: Callable[[T], tuple[CursorKey, UUID]]) -> Page[T]:
+    # Queries fetch limit + 1 rows so we know whether another page exists without a COUNT
+    if len(items) <= limit:
+        return Page(items=items)
+    items = items[:limit]
+    return Page(items=items, next_cursor=encode_cursor(*key(items[-1])))
@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from itertools import count
+from time import monotonic
+
+import asyncpg
+from news_backend.metrics import DatabaseMetrics
+
+logger = logging.getLogger("news_backend.db")
+
+# Seconds behind the primary. An idle primary stops advancing the replay timestamp, so a replica
+# that has replayed everything it received counts as current. A primary (local testing) is 0.
+REPLICA_LAG = """
+        SELECT CASE
+            WHEN NOT pg_is_in_recovery() THEN 0
+            WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+        END::float8
+        """
+
+_WRITE_WORDS = re.compile(
+    r"\b(INSERT|UPDATE|DELETE|MERGE|SHARE|nextval|setval|pg_notify|pg_(try_)?advisory\w*)\b",
+    re.IGNORECASE,
+)
+
+# Only plain reads may leave the primary: a SELECT/WITH that neither writes nor locks rows.
+# Functions with side effects called from a SELECT must be run through Database.primary().
+@lru_cache(maxsize=1024)
+def is_read_only(sql: str) -> bool:
+    words = sql.split(None, 1)
+    if not words or words[0].upper() not in ("SELECT", "WITH"):
+        return False
+    return _WRITE_WORDS.search(sql) is None
+
+# Monotonic deadline until which reads in this context stay on the primary. Every request runs
+# in its own task with its own copy of the context, so a write only pins the request that made it.
+_primary_until: ContextVar[float] = ContextVar("primary_until", default=0.0)
+
+def stick_to_primary(seconds: float) -> None:
+    deadline = monotonic() + seconds
+    if deadline > _primary_until.get():
+        _primary_until.set(deadline)
+
+def is_stuck_to_primary() -> bool:
+    return _primary_until.get() > monotonic()
+
+@contextmanager
+def use_primary():
+    token = _primary_until.set(float("inf"))
+    try:
+        yield
+    finally:
+        _primary_until.reset(token)
+
+class Replica:
+    __slots__ = ("name", "dsn", "pool", "healthy", "lag")
+
+    def __init__(self, name: str, dsn: str):
+        self.name = name
+        self.dsn = dsn
+        self.pool: asyncpg.Pool | None = None
+        self.healthy = False
+        self.lag: float | None = None
+
+# Read replicas behind one primary. A background task polls each replica's lag and only healthy
+# replicas within max_lag seconds take reads, round robin. Pools that failed to open are retried.
+class ReplicaSet:
+    def __init__(
+        self,
+        dsns: list[str],
+        pool_options: dict,
+        metrics: DatabaseMetrics,
+        max_lag: float = 5.0,
+        check_interval: float = 5.0,
+        check_timeout: float = 2.0,
+    ):
+        self.replicas = [Replica(f"replica{index}", dsn) for index, dsn in enumerate(dsns)]
+        self.pool_options = pool_options
+        self.metrics = metrics
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.check_timeout = check_timeout
+        self._healthy: list[Replica] = []
+        self._next = count()
+        self._task: asyncio.Task | None = None
+        if self.replicas:
+            metrics.metrics.gauge("db_replica_lag_seconds", "Replication lag at the last health check.", self._collect_lag)
+            metrics.metrics.gauge("db_replica_healthy", "1 while the replica is taking reads.", self._collect_healthy)
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    async def start(self) -> None:
+        await self.check()
+        for replica in self.replicas:
+            if not replica.healthy:
+                logger.warning("Replica %s is not taking reads", replica.name)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for replica in self.replicas:
+            if replica.pool is not None:
+                await replica.pool.close()
+                replica.pool = None
+            replica.healthy = False
+        self._healthy = []
+
+    def choose(self) -> Replica | None:
+        healthy = self._healthy
+        if not healthy:
+            return None
+        return healthy[next(self._next) % len(healthy)]
+
+    async def check(self) -> None:
+        await asyncio.gather(*(self._check(replica) for replica in self.replicas))
+        self._healthy = [replica for replica in self.replicas if replica.healthy]
+
+    async def _check(self, replica: Replica) -> None:
+        try:
+            if replica.pool is None:
+                replica.pool = await asyncpg.create_pool(dsn=replica.dsn, **self.pool_options)
+                self.metrics.track_pool(replica.name, replica.pool)
+            replica.lag = await replica.pool.fetchval(REPLICA_LAG, timeout=self.check_timeout)
+        except (OSError, asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError) as exc:
+            if replica.healthy:
+                logger.warning("Replica %s failed its health check: %s", replica.name, exc)
+            replica.healthy = False
+            replica.lag = None
+            return
+        healthy = replica.lag <= self.max_lag
+        if replica.healthy and not healthy:
+            logger.warning("Replica %s is lagging (%.1fs), taking it out of rotation", replica.name, replica.lag)
+        replica.healthy = healthy
+
+    def _collect_lag(self) -> dict:
+        return {(("replica", replica.name),): replica.lag for replica in self.replicas if replica.lag is not None}
+
+    def _collect_healthy(self) -> dict:
+        return {(("replica", replica.name),): int(replica.healthy) for replica in self.replicas}
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_interval)
+            await self.check()
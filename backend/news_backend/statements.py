@@ -0,0 +1,79 @@
+from collections import Counter
+from types import ModuleType
+from typing import Iterable
+
+import asyncpg
+from asyncpg.prepared_stmt import PreparedStatement
+from news_backend.backpressure import Priority
+
+# asyncpg.Connection is slotted, the subclass gives each pooled connection a handle map
+class PreparedConnection(asyncpg.Connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared: dict[str, PreparedStatement] = {}
+
+# Maps registered SQL text to a statement name. Hot statements are prepared when the pool
+# opens a connection, the rest on first use, so no request pays parse/plan on a warm pool.
+class StatementRegistry:
+    def __init__(self, enabled: bool = True):
+        # Disabled for PgBouncer transaction pooling, where named statements do not survive
+        self.enabled = enabled
+        self.hits: Counter[str] = Counter()
+        self.misses: Counter[str] = Counter()
+        self._names: dict[str, str] = {}
+        self._hot: dict[str, str] = {}
+        self._priorities: dict[str, Priority] = {}
+        self._primary: set[str] = set()
+
+    # Hot statements are the authentication path, they also get the critical pool lane
+    # primary statements are reads that must see the latest commit, they never go to a replica
+    def register(self, name: str, sql: str, hot: bool = False, priority: Priority | None = None, primary: bool = False) -> None:
+        self._names[sql] = name
+        if primary:
+            self._primary.add(sql)
+        if hot:
+            self._hot[name] = sql
+            priority = priority or Priority.CRITICAL
+        if priority is not None:
+            self._priorities[sql] = priority
+
+    def register_module(self, module: ModuleType, hot: Iterable[str] = (), exclude: Iterable[str] = (), bulk: Iterable[str] = (), primary: Iterable[str] = ()) -> None:
+        hot, exclude, bulk, primary = set(hot), set(exclude), set(bulk), set(primary)
+        for name, value in vars(module).items():
+            if name.isupper() and not name.startswith("_") and isinstance(value, str) and name not in exclude:
+                self.register(name, value, hot=name in hot, priority=Priority.BULK if name in bulk else None, primary=name in primary)
+
+    def name_for(self, sql: str) -> str | None:
+        return self._names.get(sql)
+
+    def priority_for(self, sql: str) -> Priority:
+        return self._priorities.get(sql, Priority.NORMAL)
+
+    def is_primary_only(self, sql: str) -> bool:
+        return sql in self._primary
+
+    # Pool init hook
+    async def warm_up(self, connection: asyncpg.Connection) -> None:
+        if not self.enabled or not isinstance(connection, PreparedConnection):
+            return
+        for sql in self._hot.values():
+            connection.prepared[sql] = await connection.prepare(sql)
+
+    async def get(self, connection: asyncpg.Connection, sql: str) -> PreparedStatement | None:
+        if not self.enabled:
+            return None
+        name = self._names.get(sql)
+        # Pool proxies forward attribute access to the underlying PreparedConnection
+        handles = getattr(connection, "prepared", None) if name is not None else None
+        if handles is None:
+            return None
+        statement = handles.get(sql)
+        if statement is None:
+            self.misses[name] += 1
+            statement = handles[sql] = await connection.prepare(sql)
+        else:
+            self.hits[name] += 1
+        return statement
+
+    def stats(self) -> dict[str, tuple[int, int]]:
+        return {name: (self.hits[name], self.misses[name]) for name in sorted(set(self._names.values()))}
@@ -0,0 +1,182 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from typing import AsyncIterable
+
+from news_backend.http import JSONResponse, PayloadTooLarge
+
+# Leading bytes that identify each accepted type, checked against the upload itself rather than
+# the client's Content-Type. ftyp boxes (mp4, avif) carry the brand at offset 8.
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"\x1aE\xdf\xa3", "video/webm"),
+)
+# Major brands only, anything else in an ftyp box (QuickTime, HEIC, 3GP, M4A audio) is rejected
+_FTYP_BRANDS = {
+    b"avif": "image/avif",
+    b"avis": "image/avif",
+    **dict.fromkeys((b"isom", b"iso2", b"iso4", b"iso5", b"iso6", b"mp41", b"mp42", b"avc1", b"dash", b"M4V ", b"mmp4"), "video/mp4"),
+}
+
+EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+    "image/avif": ".avif",
+    "video/mp4": ".mp4",
+    "video/webm": ".webm",
+}
+
+# Per type upper bounds, the request limit is the largest of the allowed ones
+MAX_SIZES = {
+    "image/jpeg": 10 * 1024 * 1024,
+    "image/png": 10 * 1024 * 1024,
+    "image/gif": 10 * 1024 * 1024,
+    "image/webp": 10 * 1024 * 1024,
+    "image/avif": 10 * 1024 * 1024,
+    "video/mp4": 200 * 1024 * 1024,
+    "video/webm": 200 * 1024 * 1024,
+}
+
+SNIFF_SIZE = 16
+
+def sniff(head: bytes) -> str | None:
+    for signature, mime_type in _SIGNATURES:
+        if head.startswith(signature):
+            return mime_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[4:8] == b"ftyp":
+        return _FTYP_BRANDS.get(head[8:12])
+    return None
+
+class UnsupportedMediaType(Exception):
+    def __init__(self, mime_type: str | None):
+        super().__init__(f"Unsupported media type {mime_type}." if mime_type else "Unrecognised media type.")
+        self.mime_type = mime_type
+
+    def to_response(self) -> JSONResponse:
+        return JSONResponse({"error": str(self)}, status=415)
+
+class StoredFile:
+    __slots__ = ("path", "name", "mime_type", "size", "sha256")
+
+    def __init__(self, path: str, name: str, mime_type: str, size: int, sha256: str):
+        self.path = path
+        self.name = name
+        self.mime_type = mime_type
+        self.size = size
+        self.sha256 = sha256
+
+# Receives one upload. Small bodies stay in memory, once spool_size is crossed the buffer goes to
+# a temp file inside the target directory, so the finished file is renamed into place rather than
+# copied. Disk writes are batched to write_size and run in a worker thread. The sha256 is updated
+# per chunk as it arrives, and names the stored file so identical uploads share one file.
+class SpooledUpload:
+    def __init__(
+        self,
+        directory: str,
+        allowed: frozenset[str] | None = None,
+        spool_size: int = 1024 * 1024,
+        write_size: int = 1024 * 1024,
+    ):
+        self.directory = directory
+        self.allowed = frozenset(MAX_SIZES) if allowed is None else allowed
+        self.spool_size = spool_size
+        self.write_size = write_size
+        self.max_size = max(MAX_SIZES[mime_type] for mime_type in self.allowed)
+        self.mime_type: str | None = None
+        self.size = 0
+        self._hash = hashlib.sha256()
+        self._buffer = bytearray()
+        self._file = None
+        self._path: str | None = None
+
+    async def receive(self, chunks: AsyncIterable[bytes]) -> StoredFile:
+        try:
+            async for chunk in chunks:
+                await self._write(chunk)
+            if self.mime_type is None:
+                self._check_type(bytes(self._buffer[:SNIFF_SIZE]))
+            return await self._store()
+        except BaseException:
+            await asyncio.to_thread(self._discard)
+            raise
+
+    async def _write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.size > self.max_size:
+            raise PayloadTooLarge(self.max_size)
+        self._hash.update(chunk)
+        self._buffer += chunk
+        if self.mime_type is None and len(self._buffer) >= SNIFF_SIZE:
+            self._check_type(bytes(self._buffer[:SNIFF_SIZE]))
+        if self._file is None:
+            if len(self._buffer) < self.spool_size:
+                return
+            await asyncio.to_thread(self._open)
+        if len(self._buffer) >= self.write_size:
+            await self._drain()
+
+    def _check_type(self, head: bytes) -> None:
+        mime_type = sniff(head)
+        if mime_type not in self.allowed:
+            raise UnsupportedMediaType(mime_type)
+        self.mime_type = mime_type
+        # Narrow the limit once the type is known, a 50 MiB "image" is refused mid-stream
+        self.max_size = MAX_SIZES[mime_type]
+        if self.size > self.max_size:
+            raise PayloadTooLarge(self.max_size)
+
+    async def _drain(self) -> None:
+        data, self._buffer = self._buffer, bytearray()
+        await asyncio.to_thread(self._file.write, data)
+
+    def _open(self) -> None:
+        descriptor, self._path = tempfile.mkstemp(prefix=".upload-", dir=self.directory)
+        self._file = os.fdopen(descriptor, "wb")
+
+    async def _store(self) -> StoredFile:
+        digest = self._hash.hexdigest()
+        name = digest + EXTENSIONS[self.mime_type]
+        path = os.path.join(self.directory, name)
+        if self._file is not None:
+            await self._drain()
+        await asyncio.to_thread(self._finish, path)
+        return StoredFile(path, name, self.mime_type, self.size, digest)
+
+    # Every stored file ends up with a fresh mtime, reused copies included, which is what keeps an
+    # orphan sweep's grace period from removing a file whose row is about to be inserted
+    def _finish(self, path: str) -> None:
+        if self._file is None:
+            # Never spooled, one write straight to the final name unless the same content is there
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                self._open()
+                self._file.write(self._buffer)
+            self._buffer = bytearray()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            os.chmod(self._path, 0o644)
+            # Same content hashes to the same name, replacing an existing copy is harmless
+            os.replace(self._path, path)
+            self._path = None
+
+    def _discard(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._path is not None:
+            try:
+                os.unlink(self._path)
+            except FileNotFoundError:
+                pass
+            self._path = None
+        self._buffer = bytearray()
@@ -0,0 +1,128 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Hashable
+
+from news_backend.db import Database
+
+logger = logging.getLogger("news_backend.write_behind")
+
+# Coalesces timestamp touches per key and writes them as one statement per flush. sql takes
+# two parallel arrays, keys and timestamps, e.g. UPDATE ... FROM unnest($1::uuid[], $2::timestamptz[]).
+# Timestamps are floored to precision seconds so repeated touches within a window collapse to one.
+# Memory is bounded: reaching max_pending hands the batch to a background write, new keys
+# arriving while that write is in flight and the next batch is full again are dropped and counted.
+class WriteBehindBuffer:
+    def __init__(
+        self,
+        db: Database,
+        name: str,
+        sql: str,
+        interval: float = 5.0,
+        max_pending: int = 10_000,
+        precision: int = 60,
+    ):
+        self.db = db
+        self.name = name
+        self.sql = sql
+        self.interval = interval
+        self.max_pending = max_pending
+        self.precision = precision
+        self._pending: dict[Hashable, datetime] = {}
+        self._task: asyncio.Task | None = None
+        self._flushing: asyncio.Task | None = None
+        self._labels = (("buffer", name),)
+        metrics = db.metrics.metrics
+        self._flushed = metrics.counter("write_behind_flushed_total", "Coalesced rows written by write-behind buffers.")
+        self._dropped = metrics.counter("write_behind_dropped_total", "Touches dropped because a buffer was full.")
+        self._flushed.setdefault(self._labels, 0)
+        self._dropped.setdefault(self._labels, 0)
+        db.on_disconnect(self.stop)
+
+    # The buffer registered under name on db, created on first use. Repositories built per request
+    # share it, so touches still coalesce across them and only one disconnect hook is added.
+    @classmethod
+    def shared(cls, db: Database, name: str, sql: str, **options) -> "WriteBehindBuffer":
+        buffer = db.write_behind.get(name)
+        if buffer is None:
+            buffer = db.write_behind[name] = cls(db, name, sql, **options)
+        elif buffer.sql != sql:
+            raise ValueError(f"Write-behind buffer {name} is already registered with a different statement.")
+        return buffer
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def touch(self, key: Hashable, at: datetime | None = None) -> None:
+        at = self._floor(at or datetime.now(timezone.utc))
+        current = self._pending.get(key)
+        if current is not None:
+            if current < at:
+                self._pending[key] = at
+            return
+        if len(self._pending) >= self.max_pending:
+            if self._flushing is not None and not self._flushing.done():
+                self._dropped[self._labels] += 1
+                return
+            batch, self._pending = self._pending, {}
+            self._flushing = asyncio.get_running_loop().create_task(self._write_logged(batch))
+        self._pending[key] = at
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def flush(self) -> int:
+        if not self._pending:
+            return 0
+        # Swap first, touches made while the statement runs go into the next batch
+        batch, self._pending = self._pending, {}
+        return await self._write(batch)
+
+    async def _write(self, batch: dict[Hashable, datetime]) -> int:
+        # Sorted, so flushes from several workers lock overlapping rows in the same order
+        keys = sorted(batch)
+        try:
+            await self.db.execute(self.sql, (keys, [batch[key] for key in keys]))
+        except BaseException:
+            # Put the batch back, keeping whichever touch is newer, and retry next flush. Cancellation
+            # too: stop() cancels the timer mid-flush and its final flush() must still see the batch.
+            # Touches are idempotent, rewriting rows the cancelled statement did update is harmless.
+            for key, at in batch.items():
+                current = self._pending.get(key)
+                if current is None and len(self._pending) >= self.max_pending:
+                    self._dropped[self._labels] += 1
+                elif current is None or current < at:
+                    self._pending[key] = at
+            raise
+        self._flushed[self._labels] += len(batch)
+        return len(batch)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._flushing is not None:
+            await self._flushing
+            self._flushing = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Write-behind flush for %s failed", self.name)
+
+    async def _write_logged(self, batch: dict[Hashable, datetime]) -> None:
+        try:
+            await self._write(batch)
+        except Exception:
+            logger.exception("Write-behind flush for %s failed", self.name)
+
+    def _floor(self, at: datetime) -> datetime:
+        timestamp = at.timestamp()
+        return datetime.fromtimestamp(timestamp - timestamp % self.precision, timezone.utc)
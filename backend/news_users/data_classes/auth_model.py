@@ -0,0 +1,12 @@
+from dataclasses import dataclass
+from news_users.data_classes.permissions_model import Role
+from news_users.data_classes.session_model import Session
+from news_users.data_classes.user_model import User
+
+# Everything a request needs about its caller, resolved from the session token in one query
+@dataclass(slots=True)
+class AuthContext:
+    session: Session
+    user: User
+    role: Role
+    permissions: frozenset[str]
@@ -1,19 +1,19 @@
 from dataclasses import dataclass
 from uuid import UUID
 
-@dataclass
+@dataclass(slots=True)
 class Permission:
     permission_id: UUID
     permission_code: str
     description: str
 
-@dataclass
+@dataclass(slots=True)
 class Role:
     role_id: UUID
     role_name: str
     description: str
 
-@dataclass
+@dataclass(slots=True)
 class RolePermission:
     role_id: UUID
     permission_id: UUID
\ No newline at end of file
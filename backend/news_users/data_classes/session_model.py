@@ -1,11 +1,11 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 from uuid import UUID
 
-@dataclass
+@dataclass(slots=True)
 class Session:
     session_id: UUID
     user_id: UUID
-    token_hash: bytes
+    token_hash: bytes = field(metadata={"serialize": False}) # never written by news_backend.encoding
     created_at: datetime
     expires_at: datetime
\ No newline at end of file
@@ -1,19 +1,59 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 from uuid import UUID
 
-@dataclass
+@dataclass(slots=True)
 class User:
     user_id: UUID
     email: str
     username: str
     first_name: str
     last_name: str
-    password_hash: bytes
-    password_salt: bytes
+    # Never written by news_backend.encoding
+    password_hash: bytes = field(metadata={"serialize": False})
+    password_salt: bytes = field(metadata={"serialize": False})
+    password_params: str | None = field(metadata={"serialize": False})
     user_role: UUID
     status_type: str
     created_at: datetime
     updated_at: datetime | None
     last_login: datetime | None
     deleted_at: datetime | None
+
+# Listing projection, never carries the password columns
+@dataclass(slots=True)
+class UserSummary:
+    user_id: UUID
+    email: str
+    username: str
+    first_name: str
+    last_name: str
+    user_role: UUID
+    status_type: str
+    created_at: datetime
+    updated_at: datetime | None
+    last_login: datetime | None
+    deleted_at: datetime | None
+
+@dataclass(slots=True)
+class NewUser:
+    email: str
+    username: str
+    first_name: str
+    last_name: str
+    password_hash: bytes = field(metadata={"serialize": False})
+    password_salt: bytes = field(metadata={"serialize": False})
+    user_role: UUID
+    password_params: str | None = field(default=None, metadata={"serialize": False})
+
+@dataclass(slots=True)
+class UserConflict:
+    index: int
+    email: str
+    username: str
+    constraint: str # 'email' or 'username'
+
+@dataclass(slots=True)
+class BulkUserResult:
+    user_ids: list[UUID | None] # input order, None where the row conflicted
+    conflicts: list[UserConflict]
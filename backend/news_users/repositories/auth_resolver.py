@@ -0,0 +1,51 @@
+from dataclasses import fields
+
+import asyncpg
+from news_backend.db import Database
+from news_backend.http import Request
+from news_users.data_classes.auth_model import AuthContext
+from news_users.data_classes.permissions_model import Role
+from news_users.data_classes.session_model import Session
+from news_users.data_classes.user_model import User
+
+from .queries import RESOLVE_SESSION
+
+# Row layout of RESOLVE_SESSION: session, user and role columns in field order, then the codes.
+# Counted from the dataclasses, so a column added to a model and its query shifts the slices too.
+_SESSION_END = len(fields(Session))
+_USER_END = _SESSION_END + len(fields(User))
+_ROLE_END = _USER_END + len(fields(Role))
+
+# Per-request authentication in one round trip and one pool checkout, replacing
+# get_session_by_hash -> get_user_by_id -> get_permissions_for_user. A token that resolves to
+# nothing (unknown, expired, or a banned/deleted user) gives None and the request stays anonymous.
+class AuthResolver:
+    def __init__(self, db: Database):
+        self.db = db
+
+    def _to_context(self, row: asyncpg.Record | None) -> AuthContext | None:
+        if not row:
+            return None
+        return AuthContext(
+            Session(*row[:_SESSION_END]),
+            User(*row[_SESSION_END:_USER_END]),
+            Role(*row[_USER_END:_ROLE_END]),
+            frozenset(row[_ROLE_END]),
+        )
+
+    async def resolve(self, token_hash: bytes) -> AuthContext | None:
+        result = await self.db.fetch_row(RESOLVE_SESSION, (token_hash,))
+        return self._to_context(result)
+
+    async def resolve_conn(self, connection: asyncpg.Connection, token_hash: bytes) -> AuthContext | None:
+        result = await self.db.fetch_row_conn(connection, RESOLVE_SESSION, (token_hash,))
+        return self._to_context(result)
+
+    # Fills in request.user, request.session and request.permissions, leaves them unset on a miss
+    async def authenticate(self, request: Request, token_hash: bytes) -> AuthContext | None:
+        context = await self.resolve(token_hash)
+        if context is not None:
+            request.user = context.user
+            request.session = context.session
+            request.permissions = context.permissions
+        return context
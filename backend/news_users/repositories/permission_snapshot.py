@@ -0,0 +1,166 @@
+import asyncio
+import json
+from uuid import UUID
+
+import asyncpg
+from news_backend.db import Database
+from news_users.data_classes.permissions_model import Permission
+
+from .queries import (
+    LIST_PERMISSIONS,
+    LIST_ROLES,
+    LIST_ROLE_PERMISSIONS,
+)
+
+PERMISSIONS_CHANNEL = "permission_snapshot"
+
+# Immutable view of one role's permissions, membership is a dict lookup and a bitwise AND
+class PermissionSet:
+    __slots__ = ("mask", "_flags")
+
+    def __init__(self, mask: int, flags: dict[str, int]):
+        self.mask = mask
+        self._flags = flags
+
+    def __contains__(self, permission_code: str) -> bool:
+        return self.mask & self._flags.get(permission_code, 0) != 0
+
+    def __iter__(self):
+        return (code for code, flag in self._flags.items() if self.mask & flag)
+
+    def __len__(self) -> int:
+        return self.mask.bit_count()
+
+    def to_frozenset(self) -> frozenset[str]:
+        return frozenset(self)
+
+# In-process role -> permission map. Loaded once at startup and kept current through
+# NOTIFY messages published in the same transaction as each role/permission change.
+class PermissionSnapshot:
+    def __init__(self, db: Database):
+        self.db = db
+        self._flags: dict[str, int] = {}
+        self._codes: dict[UUID, str] = {}
+        self._permissions: dict[str, Permission] = {}
+        self._free_flags: list[int] = []
+        self._next_bit = 0
+        self._role_masks: dict[UUID, int] = {}
+        self._sets: dict[UUID, PermissionSet] = {}
+        self._empty = PermissionSet(0, self._flags)
+        self._tasks: set[asyncio.Task] = set()
+        # Every NOTIFY runs in its own task. Loads and incremental updates take turns, otherwise a
+        # revoke landing while a load is between its snapshot and the swap is overwritten by it.
+        self._lock = asyncio.Lock()
+
+    # One repeatable-read transaction on the primary: the three lists come from the same snapshot,
+    # and a reload after a NOTIFY never reads a replica that has not replayed the grant yet
+    async def load(self) -> None:
+        async with self._lock:
+            await self._load()
+
+    async def _load(self) -> None:
+        async with self.db.transaction(isolation="repeatable_read") as connection:
+            permissions = await self.db.fetch_rows_conn(connection, LIST_PERMISSIONS)
+            roles = await self.db.fetch_rows_conn(connection, LIST_ROLES)
+            grants = await self.db.fetch_rows_conn(connection, LIST_ROLE_PERMISSIONS)
+        # Rebuild into fresh containers and swap, readers never see a half-built snapshot
+        self._flags = {}
+        self._codes = {}
+        self._permissions = {}
+        self._free_flags = []
+        self._next_bit = 0
+        for row in permissions:
+            self._add_permission(Permission(*row))
+        self._role_masks = {row["role_id"]: 0 for row in roles}
+        for row in grants:
+            code = self._codes.get(row["perm_id"])
+            if code is not None:
+                self._role_masks[row["role_id"]] = self._role_masks.get(row["role_id"], 0) | self._flags[code]
+        self._empty = PermissionSet(0, self._flags)
+        self._sets = {role_id: PermissionSet(mask, self._flags) for role_id, mask in self._role_masks.items()}
+
+    # A dropped LISTEN connection triggers a full reload, grants made while it was down were missed
+    async def listen(self) -> None:
+        await self.db.listen(PERMISSIONS_CHANNEL, self._on_notify, resync=self.load)
+
+    # Read Operations
+    def for_role(self, role_id: UUID) -> PermissionSet:
+        return self._sets.get(role_id, self._empty)
+
+    def has_permission(self, role_id: UUID, permission_code: str) -> bool:
+        return permission_code in self._sets.get(role_id, self._empty)
+
+    def permissions_for_role(self, role_id: UUID) -> list[Permission]:
+        permissions = self._permissions
+        return [permissions[code] for code in self.for_role(role_id)]
+
+    # Incremental Updates, all idempotent so replaying our own notifications is harmless
+    async def grant(self, role_id: UUID, permission_id: UUID) -> None:
+        async with self._lock:
+            code = self._codes.get(permission_id)
+            if code is None:
+                # Permission created after the last load, its code is not known yet
+                await self._load()
+                return
+            self._set_mask(role_id, self._role_masks.get(role_id, 0) | self._flags[code])
+
+    async def revoke(self, role_id: UUID, permission_id: UUID) -> None:
+        async with self._lock:
+            code = self._codes.get(permission_id)
+            if code is not None and role_id in self._role_masks:
+                self._set_mask(role_id, self._role_masks[role_id] & ~self._flags[code])
+
+    async def drop_role(self, role_id: UUID) -> None:
+        async with self._lock:
+            self._role_masks.pop(role_id, None)
+            self._sets.pop(role_id, None)
+
+    async def drop_permission(self, permission_id: UUID) -> None:
+        async with self._lock:
+            code = self._codes.pop(permission_id, None)
+            if code is None:
+                return
+            self._permissions.pop(code, None)
+            flag = self._flags.pop(code)
+            for role_id, mask in list(self._role_masks.items()):
+                if mask & flag:
+                    self._set_mask(role_id, mask & ~flag)
+            self._free_flags.append(flag)
+
+    # Cross-worker Invalidation
+    async def publish_conn(self, connection: asyncpg.Connection, op: str, **ids: UUID) -> None:
+        payload = json.dumps({"op": op, **{key: str(value) for key, value in ids.items()}})
+        await self.db.notify_conn(connection, PERMISSIONS_CHANNEL, payload)
+
+    async def apply(self, op: str, role_id: UUID | None = None, permission_id: UUID | None = None) -> None:
+        if op == "grant":
+            await self.grant(role_id, permission_id)
+        elif op == "revoke":
+            await self.revoke(role_id, permission_id)
+        elif op == "drop_role":
+            await self.drop_role(role_id)
+        elif op == "drop_permission":
+            await self.drop_permission(permission_id)
+        else:
+            await self.load()
+
+    def _on_notify(self, payload: str) -> None:
+        message = json.loads(payload)
+        ids = {key: UUID(message[key]) for key in ("role_id", "permission_id") if key in message}
+        task = asyncio.get_running_loop().create_task(self.apply(message.get("op", "reload"), **ids))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _add_permission(self, permission: Permission) -> None:
+        if self._free_flags:
+            flag = self._free_flags.pop()
+        else:
+            flag = 1 << self._next_bit
+            self._next_bit += 1
+        self._flags[permission.permission_code] = flag
+        self._codes[permission.permission_id] = permission.permission_code
+        self._permissions[permission.permission_code] = permission
+
+    def _set_mask(self, role_id: UUID, mask: int) -> None:
+        self._role_masks[role_id] = mask
+        self._sets[role_id] = PermissionSet(mask, self._flags)
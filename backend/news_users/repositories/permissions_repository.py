@@ -1,18 +1,22 @@
 import asyncpg
 from news_backend.db import Database
+from news_backend.loader import BatchLoader
 from news_users.data_classes.permissions_model import Permission, Role, RolePermission
+from news_users.repositories.permission_snapshot import PermissionSet, PermissionSnapshot
 from uuid import UUID
 
 from .queries import (
     GET_PERMISSION_BY_ID,
-    GET_ROLE_BY_ID,
+    GET_ROLES_BY_IDS,
     GET_PERMISSIONS_BY_ROLE,
     GET_ROLE_BY_NAME,
     GET_PERMISSION_BY_CODE,
     GET_PERMISSIONS_FOR_USER,
+    GET_USER_ROLE,
     CREATE_PERMISSION,
     CREATE_ROLE,
     CREATE_ROLE_PERMISSION,
+    CREATE_ROLE_PERMISSION_IF_MISSING,
     DELETE_ROLE_PERMISSION,
     DELETE_ROLE_BY_ID,
     DELETE_PERMISSION_BY_ID,
@@ -21,84 +25,142 @@ from .queries import (
 )
 
 class Permissions:
-    def __init__(self, db: Database):
+    def __init__(self, db: Database, snapshot: PermissionSnapshot | None = None):
         self.db = db
+        self.snapshot = snapshot
+        self.roles_by_id: BatchLoader[UUID, Role] = BatchLoader(self.get_roles_by_ids)
 
-    def _to_permission(self, row: dict | None) -> Permission | None:
-        return Permission(**row) if row else None
+    def _to_permission(self, row: asyncpg.Record | None) -> Permission | None:
+        return Permission(*row) if row else None
     
-    def _to_role(self, row: dict | None) -> Role | None:
-        return Role(**row) if row else None
+    def _to_role(self, row: asyncpg.Record | None) -> Role | None:
+        return Role(*row) if row else None
     
-    def _to_role_permission(self, row: dict | None) -> RolePermission | None:
-        return RolePermission(**row) if row else None
+    def _to_role_permission(self, row: asyncpg.Record | None) -> RolePermission | None:
+        return RolePermission(*row) if row else None
 
     # Read Operations
     async def get_permission_by_id(self, permission_id: UUID) -> Permission | None:
-        record = await self.db.fetch_one(GET_PERMISSION_BY_ID, (permission_id,))
+        record = await self.db.fetch_row(GET_PERMISSION_BY_ID, (permission_id,))
         return self._to_permission(record)
     
     async def get_role_by_id(self, role_id: UUID) -> Role | None:
-        record = await self.db.fetch_one(GET_ROLE_BY_ID, (role_id,))
-        return self._to_role(record)
+        return await self.roles_by_id.load(role_id)
+
+    async def get_roles_by_ids(self, role_ids: list[UUID]) -> dict[UUID, Role]:
+        records = await self.db.fetch_rows(GET_ROLES_BY_IDS, (role_ids,))
+        roles = [self._to_role(record) for record in records]
+        return {role.role_id: role for role in roles}
     
     async def get_permissions_by_role(self, role_id: UUID) -> list[Permission]:
-        records = await self.db.fetch_all(GET_PERMISSIONS_BY_ROLE, (role_id,))
-        return [self._to_role_permission(record) for record in records]
+        records = await self.db.fetch_rows(GET_PERMISSIONS_BY_ROLE, (role_id,))
+        return [self._to_permission(record) for record in records]
     
     async def get_role_by_name(self, role_name: str) -> Role | None:
-        record = await self.db.fetch_one(GET_ROLE_BY_NAME, (role_name,))
+        record = await self.db.fetch_row(GET_ROLE_BY_NAME, (role_name,))
         return self._to_role(record)
     
     async def get_permission_by_code(self, permission_code: str) -> Permission | None:
-        record = await self.db.fetch_one(GET_PERMISSION_BY_CODE, (permission_code,))
+        record = await self.db.fetch_row(GET_PERMISSION_BY_CODE, (permission_code,))
         return self._to_permission(record)
     
-    async def get_permissions_for_user(self, user_id: UUID) -> list[Permission]:
-        records = await self.db.fetch_all(GET_PERMISSIONS_FOR_USER, (user_id,))
-        return [self._to_permission(record) for record in records]
+    # With a snapshot only the user's role is read, and nothing at all when the caller passes it
+    async def get_permissions_for_user(self, user_id: UUID, role_id: UUID | None = None) -> list[Permission]:
+        if self.snapshot is None:
+            records = await self.db.fetch_rows(GET_PERMISSIONS_FOR_USER, (user_id,))
+            return [self._to_permission(record) for record in records]
+        if role_id is None:
+            role_id = await self.db.fetch_value(GET_USER_ROLE, (user_id,))
+            if role_id is None:
+                return []
+        return self.snapshot.permissions_for_role(role_id)
+
+    # Served from the in-process snapshot when one is configured
+    async def get_permission_set_for_role(self, role_id: UUID) -> PermissionSet:
+        if self.snapshot is not None:
+            return self.snapshot.for_role(role_id)
+        permissions = await self.get_permissions_by_role(role_id)
+        flags = {permission.permission_code: 1 << bit for bit, permission in enumerate(permissions)}
+        return PermissionSet((1 << len(flags)) - 1, flags)
     
     # Create Operations
     async def create_permission(self, permission_code: str, description: str) -> Permission:
-        record = await self.db.fetch_one(CREATE_PERMISSION, (permission_code, description))
+        record = await self.db.fetch_row(CREATE_PERMISSION, (permission_code, description))
         return self._to_permission(record)
     
     async def create_role(self, role_name: str, description: str) -> Role:
-        record = await self.db.fetch_one(CREATE_ROLE, (role_name, description))
+        record = await self.db.fetch_row(CREATE_ROLE, (role_name, description))
         return self._to_role(record)
 
     async def create_role_permission(self, role_id: UUID, permission_id: UUID) -> RolePermission:
-        record = await self.db.fetch_one(CREATE_ROLE_PERMISSION, (role_id, permission_id))
-        return self._to_role_permission(record)
+        if self.snapshot is None:
+            record = await self.db.fetch_row(CREATE_ROLE_PERMISSION, (role_id, permission_id))
+            return self._to_role_permission(record)
+        async with self.db.transaction() as connection:
+            role_permission = await self.create_role_permission_conn(connection, role_id, permission_id)
+        await self.snapshot.grant(role_id, permission_id)
+        return role_permission
     
     # Transactional Create Operations
     async def create_permission_conn(self, connection: asyncpg.Connection, permission_code: str, description: str) -> Permission:
-            record = await self.db.fetch_one_conn(connection, CREATE_PERMISSION, (permission_code, description))
+            record = await self.db.fetch_row_conn(connection, CREATE_PERMISSION, (permission_code, description))
             return self._to_permission(record)
     
     async def create_role_conn(self, connection: asyncpg.Connection, role_name: str, description: str) -> Role:
-            record = await self.db.fetch_one_conn(connection, CREATE_ROLE, (role_name, description))
+            record = await self.db.fetch_row_conn(connection, CREATE_ROLE, (role_name, description))
             return self._to_role(record)
     
     async def create_role_permission_conn(self, connection: asyncpg.Connection, role_id: UUID, permission_id: UUID) -> RolePermission:
-            record = await self.db.fetch_one_conn(connection, CREATE_ROLE_PERMISSION, (role_id, permission_id))
+            record = await self.db.fetch_row_conn(connection, CREATE_ROLE_PERMISSION, (role_id, permission_id))
+            if self.snapshot is not None:
+                await self.snapshot.publish_conn(connection, "grant", role_id=role_id, permission_id=permission_id)
             return self._to_role_permission(record)
     
+    # Bulk Create Operations, existing grants are skipped
+    async def create_role_permissions(self, grants: list[tuple[UUID, UUID]]) -> None:
+        async with self.db.transaction() as connection:
+            await self.create_role_permissions_conn(connection, grants)
+        if self.snapshot is not None:
+            await self.snapshot.load()
+
+    async def create_role_permissions_conn(self, connection: asyncpg.Connection, grants: list[tuple[UUID, UUID]]) -> None:
+        await self.db.execute_many_conn(connection, CREATE_ROLE_PERMISSION_IF_MISSING, grants)
+        if self.snapshot is not None:
+            await self.snapshot.publish_conn(connection, "reload")
+    
     # Delete Operations
     async def delete_role_permission(self, role_id: UUID, permission_id: UUID) -> None:
-        await self.db.execute(DELETE_ROLE_PERMISSION, (role_id, permission_id))
+        if self.snapshot is None:
+            await self.db.execute(DELETE_ROLE_PERMISSION, (role_id, permission_id))
+            return
+        async with self.db.transaction() as connection:
+            await self.db.execute_conn(connection, DELETE_ROLE_PERMISSION, (role_id, permission_id))
+            await self.snapshot.publish_conn(connection, "revoke", role_id=role_id, permission_id=permission_id)
+        await self.snapshot.revoke(role_id, permission_id)
 
     async def delete_role_by_id(self, role_id: UUID) -> None:
-        await self.db.execute(DELETE_ROLE_BY_ID, (role_id,))
+        if self.snapshot is None:
+            await self.db.execute(DELETE_ROLE_BY_ID, (role_id,))
+            return
+        async with self.db.transaction() as connection:
+            await self.db.execute_conn(connection, DELETE_ROLE_BY_ID, (role_id,))
+            await self.snapshot.publish_conn(connection, "drop_role", role_id=role_id)
+        await self.snapshot.drop_role(role_id)
 
     async def delete_permission_by_id(self, permission_id: UUID) -> None:
-        await self.db.execute(DELETE_PERMISSION_BY_ID, (permission_id,))
+        if self.snapshot is None:
+            await self.db.execute(DELETE_PERMISSION_BY_ID, (permission_id,))
+            return
+        async with self.db.transaction() as connection:
+            await self.db.execute_conn(connection, DELETE_PERMISSION_BY_ID, (permission_id,))
+            await self.snapshot.publish_conn(connection, "drop_permission", permission_id=permission_id)
+        await self.snapshot.drop_permission(permission_id)
 
     # Pagination Operations
     async def list_roles(self) -> list[Role]:
-        records = await self.db.fetch_all(LIST_ROLES)
+        records = await self.db.fetch_rows(LIST_ROLES)
         return [self._to_role(record) for record in records]
     
     async def list_permissions(self) -> list[Permission]:
-        records = await self.db.fetch_all(LIST_PERMISSIONS)
+        records = await self.db.fetch_rows(LIST_PERMISSIONS)
         return [self._to_permission(record) for record in records]
\ No newline at end of file
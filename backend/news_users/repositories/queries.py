@@ -1,83 +1,329 @@
+from functools import lru_cache
+
+# Explicit column projections in dataclass field order, for both query modules. Repositories
+# build models positionally, Model(*record), with no dict in between.
+_USER_COLUMNS = "user_id, email, username, first_name, last_name, password_hash, password_salt, password_params, user_role, status_type, created_at, updated_at, last_login, deleted_at"
+_USER_SUMMARY_COLUMNS = "user_id, email, username, first_name, last_name, user_role, status_type, created_at, updated_at, last_login, deleted_at"
+_SESSION_COLUMNS = "session_id, user_id, token_hash, created_at, expires_at"
+_PERMISSION_COLUMNS = "perm_id AS permission_id, perm_code AS permission_code, descr AS description"
+_ROLE_COLUMNS = "role_id, role_name, descr AS description"
+
+# One UPDATE per combination of patched columns, built on first use. columns must come from
+# PATCHABLE_USER_COLUMNS, $1 is the user id and the values follow in column order.
+@lru_cache(maxsize=256)
+def patch_user_sql(columns: tuple[str, ...], returning: bool = False) -> str:
+    assignments = ", ".join(f"{column} = ${index}" for index, column in enumerate(columns, start=2))
+    sql = f"UPDATE users SET {assignments} WHERE user_id = $1"
+    return f"{sql} RETURNING {_USER_COLUMNS}" if returning else sql
+
 # SQL Queries for User Repository
-GET_USER_BY_ID = "SELECT * FROM users WHERE user_id = $1"
-GET_USER_BY_EMAIL = "SELECT * FROM users WHERE email = $1"
-GET_USER_BY_USERNAME = "SELECT * FROM users WHERE username = $1"
-UPDATE_EMAIL = "UPDATE users SET email = $1 WHERE user_id = $2"
-UPDATE_USERNAME = "UPDATE users SET username = $1 WHERE user_id = $2"
-UPDATE_PASSWORD = "UPDATE users SET password_hash = $1, password_salt = $2 WHERE user_id = $3"
+GET_USER_BY_EMAIL = f"SELECT {_USER_COLUMNS} FROM users WHERE email = $1"
+GET_USERS_BY_IDS = f"SELECT {_USER_COLUMNS} FROM users WHERE user_id = ANY($1::uuid[])"
+GET_USERS_BY_USERNAMES = f"SELECT {_USER_COLUMNS} FROM users WHERE username = ANY($1::text[]::citext[])"
 UPDATE_LAST_LOGIN = "UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE user_id = $1"
-UPDATE_STATUS = "UPDATE users SET status_type = $1 WHERE user_id = $2"
-UPDATE_ROLE = "UPDATE users SET user_role = $1 WHERE user_id = $2"
-UPDATE_NAME = "UPDATE users SET first_name = $1, last_name = $2 WHERE user_id = $3"
-CREATE_USER = """
-        INSERT INTO users (email, username, first_name, last_name, password_hash, password_salt, user_role)
-        VALUES ($1, $2, $3, $4, $5, $6, $7)
-        RETURNING *;
+# Columns patch_user may set, in the order they appear in generated statements
+PATCHABLE_USER_COLUMNS = ("email", "username", "first_name", "last_name", "password_hash", "password_salt", "password_params", "status_type", "user_role")
+# Write-behind flush of coalesced login touches, rows already at or past the touch are left alone
+TOUCH_LAST_LOGINS = """
+        UPDATE users SET last_login = touched.at
+        FROM unnest($1::uuid[], $2::timestamptz[]) AS touched(user_id, at)
+        WHERE users.user_id = touched.user_id
+        AND (users.last_login IS NULL OR users.last_login < touched.at)
+        """
+CREATE_USER = f"""
+        INSERT INTO users (email, username, first_name, last_name, password_hash, password_salt, user_role, password_params)
+        VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+        RETURNING {_USER_COLUMNS};
+        """
+# Bulk user import, rows are COPY'd into a staging table then inserted skipping unique conflicts
+CREATE_USERS_STAGING = """
+        CREATE TEMP TABLE users_import (
+            ord INT NOT NULL,
+            email TEXT NOT NULL,
+            username TEXT NOT NULL,
+            first_name TEXT NOT NULL,
+            last_name TEXT NOT NULL,
+            password_hash BYTEA NOT NULL,
+            password_salt BYTEA NOT NULL,
+            user_role UUID NOT NULL,
+            password_params TEXT
+        ) ON COMMIT DROP
         """
+INSERT_USERS_FROM_STAGING = """
+        INSERT INTO users (email, username, first_name, last_name, password_hash, password_salt, user_role, password_params)
+        SELECT email, username, first_name, last_name, password_hash, password_salt, user_role, password_params
+        FROM users_import
+        ORDER BY ord
+        ON CONFLICT DO NOTHING
+        RETURNING user_id, email
+        """
+DROP_USERS_STAGING = "DROP TABLE users_import"
+GET_EXISTING_EMAILS = "SELECT email FROM users WHERE email = ANY($1::text[]::citext[])"
 SOFT_DELETE_USER_BY_ID = "UPDATE users SET status_type = 'deleted', deleted_at = CURRENT_TIMESTAMP WHERE user_id = $1"
 HARD_DELETE_USER_BY_ID = "DELETE FROM users WHERE user_id = $1"
-LIST_USERS = "SELECT * FROM users ORDER BY created_at DESC LIMIT $1 OFFSET $2"
-LIST_USERS_ROLE = "SELECT * FROM users WHERE user_role = $1 ORDER BY created_at DESC LIMIT $2 OFFSET $3"
-LIST_USERS_BY_STATUS = "SELECT * FROM users WHERE status_type = $1 LIMIT $2 OFFSET $3"
-COUNT_USERS = "SELECT COUNT(*) AS count FROM users"
-COUNT_USERS_BY_ROLE = "SELECT COUNT(*) FROM users WHERE user_role = $1"
-SEARCH_USERS = "SELECT * FROM users WHERE email ILIKE $1 OR username ILIKE $1 LIMIT $2 OFFSET $3"
+# Keyset pagination on (created_at, user_id), the *_AFTER variants take the decoded cursor
+LIST_USERS = f"SELECT {_USER_SUMMARY_COLUMNS} FROM users ORDER BY created_at DESC, user_id DESC LIMIT $1"
+LIST_USERS_AFTER = f"""
+        SELECT {_USER_SUMMARY_COLUMNS} FROM users
+        WHERE (created_at, user_id) < ($1, $2)
+        ORDER BY created_at DESC, user_id DESC LIMIT $3
+        """
+LIST_USERS_ROLE = f"SELECT {_USER_SUMMARY_COLUMNS} FROM users WHERE user_role = $1 ORDER BY created_at DESC, user_id DESC LIMIT $2"
+LIST_USERS_ROLE_AFTER = f"""
+        SELECT {_USER_SUMMARY_COLUMNS} FROM users
+        WHERE user_role = $1 AND (created_at, user_id) < ($2, $3)
+        ORDER BY created_at DESC, user_id DESC LIMIT $4
+        """
+LIST_USERS_BY_STATUS = f"SELECT {_USER_SUMMARY_COLUMNS} FROM users WHERE status_type = $1 ORDER BY created_at DESC, user_id DESC LIMIT $2"
+LIST_USERS_BY_STATUS_AFTER = f"""
+        SELECT {_USER_SUMMARY_COLUMNS} FROM users
+        WHERE status_type = $1 AND (created_at, user_id) < ($2, $3)
+        ORDER BY created_at DESC, user_id DESC LIMIT $4
+        """
+STREAM_USERS = f"SELECT {_USER_SUMMARY_COLUMNS} FROM users"
+# Exact user totals come from the trigger-maintained counter tables
+COUNT_USERS = "SELECT COALESCE(SUM(user_count), 0) AS count FROM user_status_counts"
+COUNT_USERS_BY_ROLE = "SELECT COALESCE(SUM(user_count), 0) AS count FROM user_role_counts WHERE user_role = $1"
+COUNT_USERS_BY_STATUS = "SELECT COALESCE(SUM(user_count), 0) AS count FROM user_status_counts WHERE status_type = $1"
+# Substring search, served by the pg_trgm GIN indexes on lower(email)/lower(username).
+# $1 is the lowered term used for ranking, $2 the escaped '%term%' LIKE pattern.
+_SEARCH_USERS_MATCHES = f"""
+        SELECT {_USER_SUMMARY_COLUMNS},
+            GREATEST(similarity(lower(email::text), $1), similarity(lower(username::text), $1)) AS rank
+        FROM users
+        WHERE lower(email::text) LIKE $2 OR lower(username::text) LIKE $2
+        """
+SEARCH_USERS = f"""
+        SELECT * FROM ({_SEARCH_USERS_MATCHES}) AS matches
+        ORDER BY rank DESC, user_id DESC LIMIT $3
+        """
+SEARCH_USERS_AFTER = f"""
+        SELECT * FROM ({_SEARCH_USERS_MATCHES}) AS matches
+        WHERE (rank, user_id) < ($3::real, $4)
+        ORDER BY rank DESC, user_id DESC LIMIT $5
+        """
+# Prefix lookups walk the btree on lower(username) COLLATE "C" in order. The collation has to
+# match the index everywhere: under the database's own collation the LIKE still uses the index
+# but the ORDER BY and keyset comparison do not, and a short prefix sorts every match.
+_USERNAME_KEY = 'lower(username::text) COLLATE "C"'
+SEARCH_USERNAME_PREFIX = f"""
+        SELECT {_USER_SUMMARY_COLUMNS} FROM users
+        WHERE {_USERNAME_KEY} LIKE $1
+        ORDER BY {_USERNAME_KEY}, user_id LIMIT $2
+        """
+SEARCH_USERNAME_PREFIX_AFTER = f"""
+        SELECT {_USER_SUMMARY_COLUMNS} FROM users
+        WHERE {_USERNAME_KEY} LIKE $1 AND ({_USERNAME_KEY}, user_id) > ($2, $3)
+        ORDER BY {_USERNAME_KEY}, user_id LIMIT $4
+        """
 
 # SQL Queries for Session Repository
-GET_SESSION_BY_ID = "SELECT * FROM sessions WHERE session_id = $1"
-GET_SESSION_BY_USER = "SELECT * FROM sessions WHERE user_id = $1"
-GET_SESSION_BY_HASH = "SELECT * FROM sessions WHERE token_hash = $1"
-CREATE_SESSION = """
-        INSERT INTO sessions (user_id, token_hash, expires_at)
+GET_SESSION_BY_ID = f"SELECT {_SESSION_COLUMNS} FROM user_sessions WHERE session_id = $1"
+GET_SESSION_BY_USER = f"SELECT {_SESSION_COLUMNS} FROM user_sessions WHERE user_id = $1"
+GET_SESSION_BY_HASH = f"SELECT {_SESSION_COLUMNS} FROM user_sessions WHERE token_hash = $1"
+CREATE_SESSION = f"""
+        INSERT INTO user_sessions (user_id, token_hash, expires_at)
         VALUES ($1, $2, $3)
-        RETURNING *;
+        RETURNING {_SESSION_COLUMNS};
         """
-DELETE_SESSION_BY_ID = "DELETE FROM sessions WHERE session_id = $1"
+DELETE_SESSION_BY_ID = "DELETE FROM user_sessions WHERE session_id = $1"
 DELETE_SESSIONS_BY_USER = "DELETE FROM user_sessions WHERE user_id = $1"
-DELETE_EXPIRED_SESSIONS = "DELETE FROM user_sessions WHERE expires_at < CURRENT_TIMESTAMP"
-LIST_SESSIONS = "SELECT * FROM user_sessions ORDER BY created_at DESC LIMIT $1 OFFSET $2"
-LIST_ACTIVE_SESSIONS = "SELECT * FROM user_sessions WHERE expires_at > CURRENT_TIMESTAMP ORDER BY created_at DESC LIMIT $1 OFFSET $2"
-LIST_EXPIRED_SESSIONS = "SELECT * FROM user_sessions WHERE expires_at <= CURRENT_TIMESTAMP"
-COUNT_SESSIONS = "SELECT COUNT(*) AS count FROM user_sessions"
-COUNT_ACTIVE_SESSIONS = "SELECT COUNT(*) AS count FROM user_sessions WHERE expires_at > CURRENT_TIMESTAMP"
-COUNT_EXPIRED_SESSIONS = "SELECT COUNT(*) AS count FROM user_sessions WHERE expires_at <= CURRENT_TIMESTAMP"
+# Write-behind flush of sliding expiry touches, expiry only ever moves forward
+TOUCH_SESSIONS = """
+        UPDATE user_sessions SET expires_at = touched.expires_at
+        FROM unnest($1::uuid[], $2::timestamptz[]) AS touched(session_id, expires_at)
+        WHERE user_sessions.session_id = touched.session_id
+        AND user_sessions.expires_at < touched.expires_at
+        """
+# Bounded expiry delete: a ctid scan over at most $1 rows, skipping rows a login holds locked.
+# The outer predicate is repeated because ctids are only unique within one partition.
+DELETE_EXPIRED_SESSIONS_BATCH = """
+        DELETE FROM user_sessions
+        WHERE ctid = ANY(ARRAY(
+            SELECT ctid FROM user_sessions
+            WHERE expires_at < CURRENT_TIMESTAMP
+            LIMIT $1
+            FOR UPDATE SKIP LOCKED))
+        AND expires_at < CURRENT_TIMESTAMP
+        """
+# A past minute whose shards sum to zero holds no sessions, nothing can move into or out of it again
+PRUNE_SESSION_EXPIRY_BUCKETS = """
+        DELETE FROM session_expiry_buckets
+        WHERE bucket IN (
+            SELECT bucket FROM session_expiry_buckets
+            WHERE bucket < date_trunc('minute', CURRENT_TIMESTAMP)
+            GROUP BY bucket HAVING SUM(session_count) <= 0)
+        """
+# Only available once db/partitioning/user_sessions_daily.sql has been applied
+ENSURE_SESSION_PARTITIONS = "SELECT ensure_user_session_partitions($1)"
+DROP_EXPIRED_SESSION_PARTITIONS = "SELECT drop_expired_user_session_partitions()"
+# Keyset pagination on (created_at, session_id), the *_AFTER variants take the decoded cursor
+LIST_SESSIONS = f"SELECT {_SESSION_COLUMNS} FROM user_sessions ORDER BY created_at DESC, session_id DESC LIMIT $1"
+LIST_SESSIONS_AFTER = f"""
+        SELECT {_SESSION_COLUMNS} FROM user_sessions
+        WHERE (created_at, session_id) < ($1, $2)
+        ORDER BY created_at DESC, session_id DESC LIMIT $3
+        """
+LIST_ACTIVE_SESSIONS = f"""
+        SELECT {_SESSION_COLUMNS} FROM user_sessions
+        WHERE expires_at > CURRENT_TIMESTAMP
+        ORDER BY created_at DESC, session_id DESC LIMIT $1
+        """
+LIST_ACTIVE_SESSIONS_AFTER = f"""
+        SELECT {_SESSION_COLUMNS} FROM user_sessions
+        WHERE expires_at > CURRENT_TIMESTAMP AND (created_at, session_id) < ($1, $2)
+        ORDER BY created_at DESC, session_id DESC LIMIT $3
+        """
+LIST_EXPIRED_SESSIONS = f"""
+        SELECT {_SESSION_COLUMNS} FROM user_sessions
+        WHERE expires_at <= CURRENT_TIMESTAMP
+        ORDER BY created_at DESC, session_id DESC LIMIT $1
+        """
+LIST_EXPIRED_SESSIONS_AFTER = f"""
+        SELECT {_SESSION_COLUMNS} FROM user_sessions
+        WHERE expires_at <= CURRENT_TIMESTAMP AND (created_at, session_id) < ($1, $2)
+        ORDER BY created_at DESC, session_id DESC LIMIT $3
+        """
+STREAM_SESSIONS = f"SELECT {_SESSION_COLUMNS} FROM user_sessions"
+STREAM_EXPIRED_SESSIONS = f"SELECT {_SESSION_COLUMNS} FROM user_sessions WHERE expires_at <= CURRENT_TIMESTAMP"
+# Session totals sum the per-minute expiry buckets, only the current minute is counted row by row
+COUNT_SESSIONS = "SELECT COALESCE(SUM(session_count), 0) AS count FROM session_expiry_buckets"
+COUNT_ACTIVE_SESSIONS = """
+        SELECT (SELECT COALESCE(SUM(session_count), 0) FROM session_expiry_buckets
+                WHERE bucket > date_trunc('minute', CURRENT_TIMESTAMP))
+            + (SELECT COUNT(*) FROM user_sessions
+                WHERE expires_at > CURRENT_TIMESTAMP
+                AND expires_at < date_trunc('minute', CURRENT_TIMESTAMP) + INTERVAL '1 minute') AS count
+        """
+COUNT_EXPIRED_SESSIONS = """
+        SELECT (SELECT COALESCE(SUM(session_count), 0) FROM session_expiry_buckets
+                WHERE bucket < date_trunc('minute', CURRENT_TIMESTAMP))
+            + (SELECT COUNT(*) FROM user_sessions
+                WHERE expires_at <= CURRENT_TIMESTAMP
+                AND expires_at >= date_trunc('minute', CURRENT_TIMESTAMP)) AS count
+        """
+
+# Session-level advisory locks, held by whichever worker currently leads a background job
+TRY_ADVISORY_LOCK = "SELECT pg_try_advisory_lock($1)"
+ADVISORY_UNLOCK = "SELECT pg_advisory_unlock($1)"
+
+# Planner statistics, refreshed by (auto)ANALYZE. -1 until the table has been analyzed
+ESTIMATE_ROW_COUNT = "SELECT reltuples::bigint FROM pg_class WHERE oid = $1::regclass"
 
 # SQL Queries for Permission Repository
-GET_PERMISSION_BY_ID = "SELECT * FROM permissions WHERE perm_id = $1"
-GET_ROLE_BY_ID = "SELECT * FROM roles WHERE role_id = $1"
-GET_ROLE_BY_NAME = "SELECT * FROM roles WHERE role_name = $1"
-GET_PERMISSION_BY_CODE = "SELECT * FROM permissions WHERE perm_code = $1"
+GET_PERMISSION_BY_ID = f"SELECT {_PERMISSION_COLUMNS} FROM perms WHERE perm_id = $1"
+GET_ROLES_BY_IDS = f"SELECT {_ROLE_COLUMNS} FROM roles WHERE role_id = ANY($1::uuid[])"
+GET_ROLE_BY_NAME = f"SELECT {_ROLE_COLUMNS} FROM roles WHERE role_name = $1"
+GET_PERMISSION_BY_CODE = f"SELECT {_PERMISSION_COLUMNS} FROM perms WHERE perm_code = $1"
 GET_PERMISSIONS_BY_ROLE = """
-        SELECT p.perm_code
+        SELECT p.perm_id AS permission_id, p.perm_code AS permission_code, p.descr AS description
         FROM role_perms rp
         JOIN perms p ON rp.perm_id = p.perm_id
         WHERE rp.role_id = $1
         """
+# Primary key probe, the snapshot answers the rest of get_permissions_for_user
+GET_USER_ROLE = "SELECT user_role FROM users WHERE user_id = $1"
 GET_PERMISSIONS_FOR_USER = """
-        SELECT p.perm_code
+        SELECT p.perm_id AS permission_id, p.perm_code AS permission_code, p.descr AS description
         FROM users u
         JOIN roles r ON u.user_role = r.role_id
         JOIN role_perms rp ON r.role_id = rp.role_id
         JOIN perms p ON rp.perm_id = p.perm_id
         WHERE u.user_id = $1;
         """
-CREATE_PERMISSION = """
+CREATE_PERMISSION = f"""
         INSERT INTO perms (perm_code, descr)
         VALUES ($1, $2)
-        RETURNING *;
+        RETURNING {_PERMISSION_COLUMNS};
         """
-CREATE_ROLE = """
+CREATE_ROLE = f"""
         INSERT INTO roles (role_name, descr)
         VALUES ($1, $2)
-        RETURNING *;
+        RETURNING {_ROLE_COLUMNS};
         """
 CREATE_ROLE_PERMISSION = """
         INSERT INTO role_perms (role_id, perm_id)
         VALUES ($1, $2)
-        RETURNING *;
+        RETURNING role_id, perm_id;
+        """
+CREATE_ROLE_PERMISSION_IF_MISSING = """
+        INSERT INTO role_perms (role_id, perm_id)
+        VALUES ($1, $2)
+        ON CONFLICT DO NOTHING
         """
 DELETE_ROLE_PERMISSION = "DELETE FROM role_perms WHERE role_id = $1 AND perm_id = $2"
 DELETE_ROLE_BY_ID = "DELETE FROM roles WHERE role_id = $1"
 DELETE_PERMISSION_BY_ID = "DELETE FROM perms WHERE perm_id = $1"
-LIST_ROLES = "SELECT * FROM roles ORDER BY role_name"
-LIST_PERMISSIONS = "SELECT * FROM perms ORDER BY perm_code"
\ No newline at end of file
+LIST_ROLES = f"SELECT {_ROLE_COLUMNS} FROM roles ORDER BY role_name"
+LIST_PERMISSIONS = f"SELECT {_PERMISSION_COLUMNS} FROM perms ORDER BY perm_code"
+LIST_ROLE_PERMISSIONS = "SELECT role_id, perm_id FROM role_perms"
+
+# SQL Queries for Auth Resolver
+def _qualify(columns: str, alias: str) -> str:
+    return ", ".join(f"{alias}.{column.strip()}" for column in columns.split(","))
+
+# Session, user, role and the role's permission codes for a live token in one round trip. Expired
+# sessions and banned or deleted users match nothing. The codes are aggregated in a lateral
+# subquery so there is no GROUP BY over the wide user row, and a role without grants gives '{}'.
+RESOLVE_SESSION = f"""
+        SELECT {_qualify(_SESSION_COLUMNS, "s")}, {_qualify(_USER_COLUMNS, "u")}, {_qualify(_ROLE_COLUMNS, "r")},
+            granted.permission_codes
+        FROM user_sessions s
+        JOIN users u ON u.user_id = s.user_id
+        JOIN roles r ON r.role_id = u.user_role
+        CROSS JOIN LATERAL (
+            SELECT COALESCE(array_agg(p.perm_code::text), '{{}}') AS permission_codes
+            FROM role_perms rp
+            JOIN perms p ON p.perm_id = rp.perm_id
+            WHERE rp.role_id = r.role_id
+        ) AS granted
+        WHERE s.token_hash = $1
+        AND s.expires_at > CURRENT_TIMESTAMP
+        AND u.status_type NOT IN ('banned', 'deleted')
+        AND u.deleted_at IS NULL
+        """
+
+# Prepared on every new pool connection, these sit on the per-request authentication path
+HOT_QUERIES = (
+    "GET_SESSION_BY_HASH",
+    "RESOLVE_SESSION",
+    "GET_USERS_BY_IDS",
+    "GET_USER_BY_EMAIL",
+    "GET_ROLES_BY_IDS",
+    "GET_PERMISSIONS_FOR_USER",
+    "GET_USER_ROLE",
+    "CREATE_SESSION",
+)
+# Authentication reads, always answered by the primary. A session or password change made by
+# one request must hold for the next one, which a lagging replica would miss for up to
+# max_replica_lag and SessionCache would then remember as a negative entry.
+PRIMARY_QUERIES = (
+    "GET_SESSION_BY_HASH",
+    "RESOLVE_SESSION",
+    "GET_USER_BY_EMAIL",
+    "GET_USER_ROLE",
+)
+# Admin listings, exports and background jobs, limited to a share of the pool so they never starve logins
+BULK_QUERIES = (
+    "LIST_USERS",
+    "LIST_USERS_AFTER",
+    "LIST_USERS_ROLE",
+    "LIST_USERS_ROLE_AFTER",
+    "LIST_USERS_BY_STATUS",
+    "LIST_USERS_BY_STATUS_AFTER",
+    "STREAM_USERS",
+    "LIST_SESSIONS",
+    "LIST_SESSIONS_AFTER",
+    "LIST_ACTIVE_SESSIONS",
+    "LIST_ACTIVE_SESSIONS_AFTER",
+    "LIST_EXPIRED_SESSIONS",
+    "LIST_EXPIRED_SESSIONS_AFTER",
+    "STREAM_SESSIONS",
+    "STREAM_EXPIRED_SESSIONS",
+)
+# Never prepared, they reference the per-transaction users_import temp table
+UNPREPARED_QUERIES = (
+    "CREATE_USERS_STAGING",
+    "INSERT_USERS_FROM_STAGING",
+    "DROP_USERS_STAGING",
+)
\ No newline at end of file
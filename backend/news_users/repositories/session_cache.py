@@ -0,0 +1,69 @@
+from datetime import datetime, timezone
+from uuid import UUID
+
+from news_backend.cache import CacheStats, TTLCache
+from news_users.data_classes.session_model import Session
+
+_MISSING = object()
+
+# Per-worker cache in front of get_session_by_hash. Invalidation is local to the worker,
+# so ttl bounds how long a session deleted through another worker can still resolve here.
+# Every invalidation bumps generation, a lookup that read the database before one must not
+# store what it read, or a session deleted mid-lookup would come back for the full ttl.
+class SessionCache:
+    def __init__(self, maxsize: int = 10_000, ttl: float = 30.0, negative_ttl: float = 2.0):
+        self.negative_ttl = negative_ttl
+        self.negative_hits = 0
+        self.generation = 0
+        self._entries: TTLCache[bytes, Session | None] = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._entries.stats
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # Returns (found, session), a found None is a cached negative lookup
+    def get(self, token_hash: bytes) -> tuple[bool, Session | None]:
+        session = self._entries.get(token_hash, _MISSING)
+        if session is _MISSING:
+            return False, None
+        if session is None:
+            self.negative_hits += 1
+        return True, session
+
+    # generation is the value read before the lookup went to the database
+    def put(self, token_hash: bytes, session: Session | None, generation: int) -> None:
+        if generation != self.generation:
+            return
+        if session is None:
+            self._entries.set(token_hash, None, ttl=self.negative_ttl)
+            return
+        if session.expires_at is None:
+            self._entries.set(token_hash, session)
+            return
+        # Positive entries never outlive the session itself
+        remaining = (session.expires_at - datetime.now(timezone.utc)).total_seconds()
+        self._entries.set(token_hash, session, ttl=remaining)
+
+    def invalidate_hash(self, token_hash: bytes) -> None:
+        self.generation += 1
+        self._entries.pop(token_hash)
+
+    def invalidate_session(self, session_id: UUID) -> None:
+        self._invalidate_where(lambda session: session.session_id == session_id)
+
+    def invalidate_user(self, user_id: UUID) -> None:
+        self._invalidate_where(lambda session: session.user_id == user_id)
+
+    def invalidate_expired(self) -> None:
+        now = datetime.now(timezone.utc)
+        self._invalidate_where(lambda session: session.expires_at is not None and session.expires_at <= now)
+
+    # Deletes are rare compared to lookups, a scan keeps the hot path free of index bookkeeping
+    def _invalidate_where(self, predicate) -> None:
+        self.generation += 1
+        for token_hash, session in self._entries.items():
+            if session is not None and predicate(session):
+                self._entries.pop(token_hash)
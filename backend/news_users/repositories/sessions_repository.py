@@ -1,7 +1,12 @@
 import asyncpg
+from news_backend.cache import TTLCache, memoize
 from news_backend.db import Database
+from news_backend.write_behind import WriteBehindBuffer
+from news_backend.pagination import Page, build_page, decode_cursor
 from news_users.data_classes.session_model import Session
-from datetime import datetime
+from news_users.repositories.session_cache import SessionCache
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator
 from uuid import UUID
 
 from .queries import (
@@ -9,90 +14,185 @@ from .queries import (
     GET_SESSION_BY_USER,
     GET_SESSION_BY_HASH,
     CREATE_SESSION,
+    TOUCH_SESSIONS,
     DELETE_SESSION_BY_ID,
     DELETE_SESSIONS_BY_USER,
-    DELETE_EXPIRED_SESSIONS,
+    DELETE_EXPIRED_SESSIONS_BATCH,
+    PRUNE_SESSION_EXPIRY_BUCKETS,
+    ENSURE_SESSION_PARTITIONS,
+    DROP_EXPIRED_SESSION_PARTITIONS,
     LIST_SESSIONS,
+    LIST_SESSIONS_AFTER,
     LIST_ACTIVE_SESSIONS,
+    LIST_ACTIVE_SESSIONS_AFTER,
     LIST_EXPIRED_SESSIONS,
+    LIST_EXPIRED_SESSIONS_AFTER,
+    STREAM_SESSIONS,
+    STREAM_EXPIRED_SESSIONS,
     COUNT_SESSIONS,
     COUNT_ACTIVE_SESSIONS,
     COUNT_EXPIRED_SESSIONS,
+    ESTIMATE_ROW_COUNT,
 )
 
 class SessionsRepository:
-    def __init__(self, db: Database):
+    def __init__(self, db: Database, cache: SessionCache | None = None, count_ttl: float = 2.0):
         self.db = db
+        self.cache = cache
+        self._counts: TTLCache[tuple, int] = TTLCache(maxsize=64, ttl=count_ttl)
+        self.touches = WriteBehindBuffer.shared(db, "session_touch", TOUCH_SESSIONS)
     
-    def _to_session(self, row: dict | None) -> Session | None:
-        return Session(**row) if row else None
+    def _to_session(self, row: asyncpg.Record | None) -> Session | None:
+        return Session(*row) if row else None
 
     # Read Operations
     async def get_session_by_id(self, session_id: UUID) -> Session | None:
-        result = await self.db.fetch_one(GET_SESSION_BY_ID, (session_id,))
+        result = await self.db.fetch_row(GET_SESSION_BY_ID, (session_id,))
         return self._to_session(result)
     
     async def get_session_by_user(self, user_id: UUID) -> Session | None:
-        result = await self.db.fetch_one(GET_SESSION_BY_USER, (user_id,))
+        result = await self.db.fetch_row(GET_SESSION_BY_USER, (user_id,))
         return self._to_session(result)
     
     async def get_session_by_hash(self, token_hash: bytes) -> Session | None:
-        result = await self.db.fetch_one(GET_SESSION_BY_HASH, (token_hash,))
-        return self._to_session(result)
+        if self.cache is None:
+            return self._to_session(await self.db.fetch_row(GET_SESSION_BY_HASH, (token_hash,)))
+        found, session = self.cache.get(token_hash)
+        if found:
+            return session
+        generation = self.cache.generation
+        session = self._to_session(await self.db.fetch_row(GET_SESSION_BY_HASH, (token_hash,)))
+        self.cache.put(token_hash, session, generation)
+        return session
     
     # Create Operation
     async def create_session(self, user_id: UUID, token_hash: bytes, expires_at: datetime) -> Session:
-        result = await self.db.fetch_one(CREATE_SESSION, (user_id, token_hash, expires_at))
+        result = await self.db.fetch_row(CREATE_SESSION, (user_id, token_hash, expires_at))
+        if self.cache is not None:
+            self.cache.invalidate_hash(token_hash)
         return self._to_session(result)
     
     # Transactional Create Operation
     async def create_session_conn(self, connection: asyncpg.Connection, user_id: UUID, token_hash: bytes, expires_at: datetime) -> Session:
-        result = await self.db.fetch_one_conn(connection, CREATE_SESSION, (user_id, token_hash, expires_at))
+        result = await self.db.fetch_row_conn(connection, CREATE_SESSION, (user_id, token_hash, expires_at))
+        if self.cache is not None:
+            self.db.after_commit(connection, lambda: self.cache.invalidate_hash(token_hash))
         return self._to_session(result)
     
+    # Sliding expiry, buffered per session and written to minute precision on the next flush
+    async def touch_session(self, session_id: UUID, ttl: timedelta = timedelta(hours=24)) -> None:
+        self.touches.touch(session_id, datetime.now(timezone.utc) + ttl)
+
     # Delete Operation
     async def delete_session_by_id(self, session_id: UUID) -> None:
         await self.db.execute(DELETE_SESSION_BY_ID, (session_id,))
+        if self.cache is not None:
+            self.cache.invalidate_session(session_id)
 
     async def delete_sessions_by_user(self, user_id: UUID) -> None:
         await self.db.execute(DELETE_SESSIONS_BY_USER, (user_id,))
+        if self.cache is not None:
+            self.cache.invalidate_user(user_id)
 
-    async def delete_expired_sessions(self) -> None:
-        await self.db.execute(DELETE_EXPIRED_SESSIONS)
+    # Drains in bounded batches, background reaping goes through SessionReaper instead
+    async def delete_expired_sessions(self, batch_size: int = 1000) -> int:
+        deleted = 0
+        async with self.db.acquire() as connection:
+            while True:
+                count = await self.delete_expired_sessions_batch_conn(connection, batch_size)
+                deleted += count
+                if count < batch_size:
+                    break
+        return deleted
 
     # Transactional Delete Operation
     async def delete_session_by_id_conn(self, connection: asyncpg.Connection, session_id: UUID) -> None:
         await self.db.execute_conn(connection, DELETE_SESSION_BY_ID, (session_id,))
+        if self.cache is not None:
+            self.db.after_commit(connection, lambda: self.cache.invalidate_session(session_id))
+
+    async def delete_expired_sessions_batch_conn(self, connection: asyncpg.Connection, batch_size: int) -> int:
+        status = await self.db.execute_conn(connection, DELETE_EXPIRED_SESSIONS_BATCH, (batch_size,))
+        if self.cache is not None:
+            self.db.after_commit(connection, self.cache.invalidate_expired)
+        return int(status.split()[-1])
+
+    async def prune_expiry_buckets_conn(self, connection: asyncpg.Connection) -> None:
+        await self.db.execute_conn(connection, PRUNE_SESSION_EXPIRY_BUCKETS)
+
+    # Partitioned layout only, see db/partitioning/user_sessions_daily.sql
+    async def ensure_partitions_conn(self, connection: asyncpg.Connection, days_ahead: int = 3) -> int:
+        return await self.db.fetch_value_conn(connection, ENSURE_SESSION_PARTITIONS, (days_ahead,))
+
+    async def drop_expired_partitions_conn(self, connection: asyncpg.Connection) -> int:
+        dropped = await self.db.fetch_value_conn(connection, DROP_EXPIRED_SESSION_PARTITIONS)
+        if dropped and self.cache is not None:
+            self.db.after_commit(connection, self.cache.invalidate_expired)
+        return dropped
+
+    def _to_page(self, rows: list[asyncpg.Record], limit: int) -> Page[Session]:
+        return build_page([self._to_session(row) for row in rows], limit, lambda session: (session.created_at, session.session_id))
+
+    async def _list_page(self, first_sql: str, after_sql: str, limit: int, cursor: str | None) -> Page[Session]:
+        if cursor is None:
+            rows = await self.db.fetch_rows(first_sql, (limit + 1,))
+        else:
+            rows = await self.db.fetch_rows(after_sql, (*decode_cursor(cursor, datetime), limit + 1))
+        return self._to_page(rows, limit)
 
     # Pagination Operations
-    async def list_sessions(self) -> list[Session]:
-        rows = await self.db.fetch_all(LIST_SESSIONS)
-        return [self._to_session(row) for row in rows]
+    async def list_sessions(self, limit: int, cursor: str | None = None) -> Page[Session]:
+        return await self._list_page(LIST_SESSIONS, LIST_SESSIONS_AFTER, limit, cursor)
 
-    async def list_active_sessions(self) -> list[Session]:
-        rows = await self.db.fetch_all(LIST_ACTIVE_SESSIONS)
-        return [self._to_session(row) for row in rows]
+    async def list_active_sessions(self, limit: int, cursor: str | None = None) -> Page[Session]:
+        return await self._list_page(LIST_ACTIVE_SESSIONS, LIST_ACTIVE_SESSIONS_AFTER, limit, cursor)
     
-    async def list_expired_sessions(self) -> list[Session]:
-        rows = await self.db.fetch_all(LIST_EXPIRED_SESSIONS)
-        return [self._to_session(row) for row in rows]
+    async def list_expired_sessions(self, limit: int, cursor: str | None = None) -> Page[Session]:
+        return await self._list_page(LIST_EXPIRED_SESSIONS, LIST_EXPIRED_SESSIONS_AFTER, limit, cursor)
+
+    # Streaming Operations
+    async def stream_sessions(self, batch_size: int = 500) -> AsyncIterator[Session]:
+        async for rows in self.db.stream_rows(STREAM_SESSIONS, batch_size=batch_size):
+            for row in rows:
+                yield self._to_session(row)
+
+    async def stream_expired_sessions(self, batch_size: int = 500) -> AsyncIterator[Session]:
+        async for rows in self.db.stream_rows(STREAM_EXPIRED_SESSIONS, batch_size=batch_size):
+            for row in rows:
+                yield self._to_session(row)
     
-    async def count_sessions(self) -> int:
-        result = await self.db.fetch_value(COUNT_SESSIONS)
-        return int(result) if result else 0
+    # Count Operations, memoized for count_ttl seconds
+    async def _count(self, sql: str, params: tuple = ()) -> int:
+        async def load() -> int:
+            result = await self.db.fetch_value(sql, params)
+            return int(result) if result else 0
+        return await memoize(self._counts, (sql, params), load)
+
+    async def count_sessions(self, approximate: bool = False) -> int:
+        if approximate:
+            estimate = await self._count(ESTIMATE_ROW_COUNT, ("user_sessions",))
+            if estimate >= 0:
+                return estimate
+        return await self._count(COUNT_SESSIONS)
     
     async def count_active_sessions(self) -> int:
-        result = await self.db.fetch_value(COUNT_ACTIVE_SESSIONS)
-        return int(result) if result else 0
+        return await self._count(COUNT_ACTIVE_SESSIONS)
     
     async def count_expired_sessions(self) -> int:
-        result = await self.db.fetch_value(COUNT_EXPIRED_SESSIONS)
-        return int(result) if result else 0
+        return await self._count(COUNT_EXPIRED_SESSIONS)
     
     # Transactional Pagination Operations
-    async def list_expired_sessions_conn(self, connection: asyncpg.Connection) -> list[Session]:
-        rows = await self.db.fetch_all_conn(connection, LIST_EXPIRED_SESSIONS)
-        return [self._to_session(row) for row in rows]
+    async def list_expired_sessions_conn(self, connection: asyncpg.Connection, limit: int, cursor: str | None = None) -> Page[Session]:
+        if cursor is None:
+            rows = await self.db.fetch_rows_conn(connection, LIST_EXPIRED_SESSIONS, (limit + 1,))
+        else:
+            rows = await self.db.fetch_rows_conn(connection, LIST_EXPIRED_SESSIONS_AFTER, (*decode_cursor(cursor, datetime), limit + 1))
+        return self._to_page(rows, limit)
+
+    async def stream_expired_sessions_conn(self, connection: asyncpg.Connection, batch_size: int = 500) -> AsyncIterator[Session]:
+        async for rows in self.db.stream_rows_conn(connection, STREAM_EXPIRED_SESSIONS, batch_size=batch_size):
+            for row in rows:
+                yield self._to_session(row)
     
     async def count_expired_sessions_conn(self, connection: asyncpg.Connection) -> int:
         result = await self.db.fetch_value_conn(connection, COUNT_EXPIRED_SESSIONS)
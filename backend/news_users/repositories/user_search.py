@@ -0,0 +1,43 @@
+import asyncio
+
+from news_users.data_classes.user_model import UserSummary
+from news_users.repositories.users_repository import UserRepository
+
+# Trigrams need at least three characters before the GIN index can narrow anything
+MIN_TRIGRAM_LENGTH = 3
+
+# Search-as-you-type for one client (e.g. one admin user-picker websocket). Each keystroke
+# cancels the query it supersedes; asyncpg forwards the cancellation to the server.
+class TypeaheadSearch:
+    def __init__(self, users: UserRepository, limit: int = 10):
+        self.users = users
+        self.limit = limit
+        self._current: asyncio.Task | None = None
+
+    # Returns None when a newer search superseded this one before it finished
+    async def search(self, term: str) -> list[UserSummary] | None:
+        if self._current is not None and not self._current.done():
+            self._current.cancel()
+        term = term.strip()
+        if not term:
+            self._current = None
+            return []
+        self._current = task = asyncio.ensure_future(self._run(term))
+        try:
+            return await task
+        except asyncio.CancelledError:
+            if asyncio.current_task().cancelling():
+                raise
+            return None
+
+    def cancel(self) -> None:
+        if self._current is not None:
+            self._current.cancel()
+            self._current = None
+
+    async def _run(self, term: str) -> list[UserSummary]:
+        if len(term) < MIN_TRIGRAM_LENGTH:
+            page = await self.users.search_usernames_by_prefix(term, self.limit)
+        else:
+            page = await self.users.search_users(term, self.limit)
+        return page.items
@@ -1,104 +1,213 @@
 import asyncpg
+from news_backend.cache import TTLCache, memoize
 from news_backend.db import Database
+from news_backend.write_behind import WriteBehindBuffer
+from news_backend.loader import BatchLoader
+from news_backend.pagination import Page, build_page, decode_cursor
+from datetime import datetime
+from typing import AsyncIterator
 from uuid import UUID
-from news_users.data_classes.user_model import User
+from news_users.data_classes.user_model import BulkUserResult, NewUser, User, UserConflict, UserSummary
 
 from .queries import (
-    GET_USER_BY_ID,
     GET_USER_BY_EMAIL,
-    GET_USER_BY_USERNAME,
-    UPDATE_EMAIL,
-    UPDATE_USERNAME,
-    UPDATE_PASSWORD,
+    GET_USERS_BY_IDS,
+    GET_USERS_BY_USERNAMES,
     UPDATE_LAST_LOGIN,
-    UPDATE_STATUS,
-    UPDATE_ROLE,
-    UPDATE_NAME,
+    TOUCH_LAST_LOGINS,
+    PATCHABLE_USER_COLUMNS,
+    patch_user_sql,
     CREATE_USER,
+    CREATE_USERS_STAGING,
+    INSERT_USERS_FROM_STAGING,
+    DROP_USERS_STAGING,
+    GET_EXISTING_EMAILS,
     SOFT_DELETE_USER_BY_ID,
     HARD_DELETE_USER_BY_ID,
     LIST_USERS,
+    LIST_USERS_AFTER,
     LIST_USERS_ROLE,
+    LIST_USERS_ROLE_AFTER,
     LIST_USERS_BY_STATUS,
+    LIST_USERS_BY_STATUS_AFTER,
+    STREAM_USERS,
     COUNT_USERS,
     COUNT_USERS_BY_ROLE,
+    COUNT_USERS_BY_STATUS,
+    ESTIMATE_ROW_COUNT,
     SEARCH_USERS,
+    SEARCH_USERS_AFTER,
+    SEARCH_USERNAME_PREFIX,
+    SEARCH_USERNAME_PREFIX_AFTER,
 )
 
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+_STAGING_COLUMNS = ["ord", "email", "username", "first_name", "last_name", "password_hash", "password_salt", "user_role", "password_params"]
+
 class UserRepository:
-    def __init__(self, db: Database):
+    def __init__(self, db: Database, count_ttl: float = 2.0):
         self.db = db
+        self._counts: TTLCache[tuple, int] = TTLCache(maxsize=256, ttl=count_ttl)
+        self.users_by_id: BatchLoader[UUID, User] = BatchLoader(self.get_users_by_ids)
+        self.users_by_username: BatchLoader[str, User] = BatchLoader(self.get_users_by_usernames)
+        self.last_logins = WriteBehindBuffer.shared(db, "last_login", TOUCH_LAST_LOGINS)
     
-    def _to_user(self, row: dict | None) -> User | None:
-        return User(**row) if row else None
+    def _to_user(self, row: asyncpg.Record | None) -> User | None:
+        return User(*row) if row else None
+
+    def _to_summary(self, row: asyncpg.Record) -> UserSummary:
+        return UserSummary(*row)
 
     # Read Operations
+    # Single lookups are batched with any others issued in the same event-loop tick
     async def get_user_by_id(self, uuid: UUID) -> User | None:
-        result = await self.db.fetch_one(GET_USER_BY_ID, (uuid,))
-        return self._to_user(result)
+        return await self.users_by_id.load(uuid)
     
     async def get_user_by_email(self, email: str) -> User | None:
-        result = await self.db.fetch_one(GET_USER_BY_EMAIL, (email,))
+        result = await self.db.fetch_row(GET_USER_BY_EMAIL, (email,))
         return self._to_user(result)
     
     async def get_user_by_username(self, username: str) -> User | None:
-        result = await self.db.fetch_one(GET_USER_BY_USERNAME, (username,))
-        return self._to_user(result)
+        # Usernames are CITEXT, key the batch case-insensitively
+        return await self.users_by_username.load(username.lower())
+
+    async def get_users_by_ids(self, user_ids: list[UUID]) -> dict[UUID, User]:
+        results = await self.db.fetch_rows(GET_USERS_BY_IDS, (user_ids,))
+        users = [self._to_user(row) for row in results]
+        return {user.user_id: user for user in users}
+
+    async def get_users_by_usernames(self, usernames: list[str]) -> dict[str, User]:
+        results = await self.db.fetch_rows(GET_USERS_BY_USERNAMES, (usernames,))
+        users = [self._to_user(row) for row in results]
+        return {user.username.lower(): user for user in users}
     
+    # Patch Operations, one UPDATE for any combination of PATCHABLE_USER_COLUMNS
+    def _patch(self, user_id: UUID, fields: dict, returning: bool) -> tuple[str, tuple]:
+        unknown = fields.keys() - set(PATCHABLE_USER_COLUMNS)
+        if unknown:
+            raise ValueError(f"Cannot patch user columns: {', '.join(sorted(unknown))}.")
+        columns = tuple(column for column in PATCHABLE_USER_COLUMNS if column in fields)
+        sql = patch_user_sql(columns, returning)
+        if self.db.statements.name_for(sql) is None:
+            self.db.statements.register(f"PATCH_USER({','.join(columns)}){'_RETURNING' if returning else ''}", sql)
+        return sql, (user_id, *(fields[column] for column in columns))
+
+    async def patch_user(self, user_id: UUID, returning: bool = False, **fields) -> User | None:
+        if not fields:
+            return await self.get_user_by_id(user_id) if returning else None
+        sql, params = self._patch(user_id, fields, returning)
+        if returning:
+            return self._to_user(await self.db.fetch_row(sql, params))
+        await self.db.execute(sql, params)
+        return None
+
+    async def patch_user_conn(self, connection: asyncpg.Connection, user_id: UUID, returning: bool = False, **fields) -> User | None:
+        if not fields:
+            if not returning:
+                return None
+            rows = await self.db.fetch_rows_conn(connection, GET_USERS_BY_IDS, ([user_id],))
+            return self._to_user(rows[0]) if rows else None
+        sql, params = self._patch(user_id, fields, returning)
+        if returning:
+            return self._to_user(await self.db.fetch_row_conn(connection, sql, params))
+        await self.db.execute_conn(connection, sql, params)
+        return None
+
     # Update Operations
     async def update_user_email(self, user_id: UUID, new_email: str) -> None:
-        await self.db.execute(UPDATE_EMAIL, (new_email, user_id))
+        await self.patch_user(user_id, email=new_email)
 
     async def update_user_username(self, user_id: UUID, new_username: str) -> None:
-        await self.db.execute(UPDATE_USERNAME, (new_username, user_id))
+        await self.patch_user(user_id, username=new_username)
     
-    async def update_user_password(self, user_id: UUID, new_password: bytes, new_salt: bytes) -> None:
-        await self.db.execute(UPDATE_PASSWORD, (new_password, new_salt, user_id))
+    async def update_user_password(self, user_id: UUID, new_password: bytes, new_salt: bytes, new_params: str | None = None) -> None:
+        await self.patch_user(user_id, password_hash=new_password, password_salt=new_salt, password_params=new_params)
     
+    # Buffered to minute precision and written on the next flush, use the _conn variant to write now
     async def update_user_last_login(self, user_id: UUID) -> None:
-        await self.db.execute(UPDATE_LAST_LOGIN, (user_id,))
+        self.last_logins.touch(user_id)
 
     async def update_user_status(self, user_id: UUID, new_status: str) -> None:
-        await self.db.execute(UPDATE_STATUS, (new_status, user_id))
+        await self.patch_user(user_id, status_type=new_status)
     
     async def update_user_role(self, user_id: UUID, new_role_id: UUID) -> None:
-        await self.db.execute(UPDATE_ROLE, (new_role_id, user_id))
+        await self.patch_user(user_id, user_role=new_role_id)
 
     async def update_user_name(self, user_id: UUID, first_name: str, last_name: str) -> None:
-        await self.db.execute(UPDATE_NAME, (first_name, last_name, user_id))
+        await self.patch_user(user_id, first_name=first_name, last_name=last_name)
     
     # Transactional Update Operations
     async def update_user_email_conn(self, connection: asyncpg.Connection, user_id: UUID, new_email: str) -> None:
-        await self.db.execute_conn(connection, UPDATE_EMAIL, (new_email, user_id))
+        await self.patch_user_conn(connection, user_id, email=new_email)
 
     async def update_user_username_conn(self, connection: asyncpg.Connection, user_id: UUID, new_username: str) -> None:
-        await self.db.execute_conn(connection, UPDATE_USERNAME, (new_username, user_id))
+        await self.patch_user_conn(connection, user_id, username=new_username)
 
-    async def update_user_password_conn(self, connection: asyncpg.Connection, user_id: UUID, new_password: bytes, new_salt: bytes) -> None:
-        await self.db.execute_conn(connection, UPDATE_PASSWORD, (new_password, new_salt, user_id))
+    async def update_user_password_conn(self, connection: asyncpg.Connection, user_id: UUID, new_password: bytes, new_salt: bytes, new_params: str | None = None) -> None:
+        await self.patch_user_conn(connection, user_id, password_hash=new_password, password_salt=new_salt, password_params=new_params)
     
     async def update_user_last_login_conn(self, connection: asyncpg.Connection, user_id: UUID) -> None:
         await self.db.execute_conn(connection, UPDATE_LAST_LOGIN, (user_id,))
     
     async def update_user_status_conn(self, connection: asyncpg.Connection, user_id: UUID, new_status: str) -> None:
-        await self.db.execute_conn(connection, UPDATE_STATUS, (new_status, user_id))
+        await self.patch_user_conn(connection, user_id, status_type=new_status)
     
     async def update_user_role_conn(self, connection: asyncpg.Connection, user_id: UUID, new_role_id: UUID) -> None:
-        await self.db.execute_conn(connection, UPDATE_ROLE, (new_role_id, user_id))
+        await self.patch_user_conn(connection, user_id, user_role=new_role_id)
     
     async def update_user_name_conn(self, connection: asyncpg.Connection, user_id: UUID, first_name: str, last_name: str) -> None:
-        await self.db.execute_conn(connection, UPDATE_NAME, (first_name, last_name, user_id))
+        await self.patch_user_conn(connection, user_id, first_name=first_name, last_name=last_name)
 
     # Create Operation
-    async def create_user(self, email: str, username: str, first_name: str, last_name: str, pw_hash: bytes, pw_salt: bytes, role_id: UUID) -> User:
-        result = await self.db.fetch_one(CREATE_USER, (email, username, first_name, last_name, pw_hash, pw_salt, role_id))
+    async def create_user(self, email: str, username: str, first_name: str, last_name: str, pw_hash: bytes, pw_salt: bytes, role_id: UUID, pw_params: str | None = None) -> User:
+        result = await self.db.fetch_row(CREATE_USER, (email, username, first_name, last_name, pw_hash, pw_salt, role_id, pw_params))
         return self._to_user(result)
 
     # Transactional Create Operation
-    async def create_user_conn(self, connection: asyncpg.Connection, email: str, username: str, first_name: str, last_name: str, pw_hash: bytes, pw_salt: bytes, role_id: UUID) -> User:
-        result = await self.db.fetch_one_conn(connection, CREATE_USER, (email, username, first_name, last_name, pw_hash, pw_salt, role_id))
+    async def create_user_conn(self, connection: asyncpg.Connection, email: str, username: str, first_name: str, last_name: str, pw_hash: bytes, pw_salt: bytes, role_id: UUID, pw_params: str | None = None) -> User:
+        result = await self.db.fetch_row_conn(connection, CREATE_USER, (email, username, first_name, last_name, pw_hash, pw_salt, role_id, pw_params))
         return self._to_user(result)
 
+    # Bulk Create Operations
+    async def create_users(self, users: list[NewUser]) -> BulkUserResult:
+        async with self.db.transaction() as connection:
+            return await self.create_users_conn(connection, users)
+
+    async def create_users_conn(self, connection: asyncpg.Connection, users: list[NewUser]) -> BulkUserResult:
+        await self.db.execute_conn(connection, CREATE_USERS_STAGING)
+        await self.db.copy_records_conn(connection, "users_import", _STAGING_COLUMNS, [
+            (index, user.email, user.username, user.first_name, user.last_name, user.password_hash, user.password_salt, user.user_role, user.password_params)
+            for index, user in enumerate(users)
+        ])
+        inserted = await self.db.fetch_rows_conn(connection, INSERT_USERS_FROM_STAGING)
+        await self.db.execute_conn(connection, DROP_USERS_STAGING)
+
+        ids_by_email = {row["email"].lower(): row["user_id"] for row in inserted}
+        user_ids: list[UUID | None] = []
+        rejected: list[int] = []
+        for index, user in enumerate(users):
+            # Pop so an in-batch duplicate email is reported as a conflict, not given the first row's id
+            user_id = ids_by_email.pop(user.email.lower(), None)
+            user_ids.append(user_id)
+            if user_id is None:
+                rejected.append(index)
+        if not rejected:
+            return BulkUserResult(user_ids=user_ids, conflicts=[])
+
+        # Anything rejected whose email now exists clashed on email, the rest clashed on username
+        taken = await self.db.fetch_rows_conn(connection, GET_EXISTING_EMAILS, ([users[index].email for index in rejected],))
+        taken_emails = {row["email"].lower() for row in taken}
+        conflicts = [
+            UserConflict(
+                index=index, email=users[index].email, username=users[index].username,
+                constraint="email" if users[index].email.lower() in taken_emails else "username",
+            )
+            for index in rejected
+        ]
+        return BulkUserResult(user_ids=user_ids, conflicts=conflicts)
+
     # Soft Delete Operation
     async def delete_user(self, user_id: UUID) -> None:
         await self.db.execute(SOFT_DELETE_USER_BY_ID, (user_id,))
@@ -115,31 +224,78 @@ class UserRepository:
     async def hard_delete_user_conn(self, connection: asyncpg.Connection, user_id: UUID) -> None:
         await self.db.execute_conn(connection, HARD_DELETE_USER_BY_ID, (user_id,))
     
+    def _to_page(self, rows: list[asyncpg.Record], limit: int) -> Page[UserSummary]:
+        return build_page([self._to_summary(row) for row in rows], limit, lambda user: (user.created_at, user.user_id))
+
     # Pagination Operations
-    async def list_users(self, limit: int, offset: int) -> list[User]:
-        results = await self.db.fetch_all(LIST_USERS, (limit, offset))
-        return [self._to_user(row) for row in results]
+    async def list_users(self, limit: int, cursor: str | None = None) -> Page[UserSummary]:
+        if cursor is None:
+            results = await self.db.fetch_rows(LIST_USERS, (limit + 1,))
+        else:
+            results = await self.db.fetch_rows(LIST_USERS_AFTER, (*decode_cursor(cursor, datetime), limit + 1))
+        return self._to_page(results, limit)
     
-    async def list_users_by_role(self, role_id: UUID, limit: int, offset: int) -> list[User]:
-        results = await self.db.fetch_all(LIST_USERS_ROLE, (role_id, limit, offset))
-        return [self._to_user(row) for row in results]
+    async def list_users_by_role(self, role_id: UUID, limit: int, cursor: str | None = None) -> Page[UserSummary]:
+        if cursor is None:
+            results = await self.db.fetch_rows(LIST_USERS_ROLE, (role_id, limit + 1))
+        else:
+            results = await self.db.fetch_rows(LIST_USERS_ROLE_AFTER, (role_id, *decode_cursor(cursor, datetime), limit + 1))
+        return self._to_page(results, limit)
     
-    async def list_users_by_status(self, status: str, limit: int, offset: int) -> list[User]:
-        results = await self.db.fetch_all(LIST_USERS_BY_STATUS, (status, limit, offset))
-        return [self._to_user(row) for row in results]
+    async def list_users_by_status(self, status: str, limit: int, cursor: str | None = None) -> Page[UserSummary]:
+        if cursor is None:
+            results = await self.db.fetch_rows(LIST_USERS_BY_STATUS, (status, limit + 1))
+        else:
+            results = await self.db.fetch_rows(LIST_USERS_BY_STATUS_AFTER, (status, *decode_cursor(cursor, datetime), limit + 1))
+        return self._to_page(results, limit)
+
+    # Streaming Operations
+    async def stream_users(self, batch_size: int = 500) -> AsyncIterator[UserSummary]:
+        async for rows in self.db.stream_rows(STREAM_USERS, batch_size=batch_size):
+            for row in rows:
+                yield self._to_summary(row)
     
-    async def count_users(self) -> int:
-        result = await self.db.fetch_value(COUNT_USERS)
-        return int(result) if result else 0
+    # Count Operations, memoized for count_ttl seconds
+    async def _count(self, sql: str, params: tuple = ()) -> int:
+        async def load() -> int:
+            result = await self.db.fetch_value(sql, params)
+            return int(result) if result else 0
+        return await memoize(self._counts, (sql, params), load)
+
+    async def count_users(self, approximate: bool = False) -> int:
+        if approximate:
+            estimate = await self._count(ESTIMATE_ROW_COUNT, ("users",))
+            if estimate >= 0:
+                return estimate
+        return await self._count(COUNT_USERS)
     
     async def count_users_by_role(self, role_id: UUID) -> int:
-        result = await self.db.fetch_value(COUNT_USERS_BY_ROLE, (role_id,))
-        return int(result) if result else 0
+        return await self._count(COUNT_USERS_BY_ROLE, (role_id,))
+
+    async def count_users_by_status(self, status: str) -> int:
+        return await self._count(COUNT_USERS_BY_STATUS, (status,))
     
-    async def search_users(self, search_term: str, limit: int, offset: int) -> list[User]:
-        like_pattern = f"%{search_term}%"
-        results = await self.db.fetch_all(SEARCH_USERS, (like_pattern, limit, offset))
-        return [self._to_user(row) for row in results]
+    # Ranked by trigram similarity, best match first
+    async def search_users(self, search_term: str, limit: int, cursor: str | None = None) -> Page[UserSummary]:
+        term = search_term.lower()
+        like_pattern = f"%{_escape_like(term)}%"
+        if cursor is None:
+            results = await self.db.fetch_rows(SEARCH_USERS, (term, like_pattern, limit + 1))
+        else:
+            results = await self.db.fetch_rows(SEARCH_USERS_AFTER, (term, like_pattern, *decode_cursor(cursor, float), limit + 1))
+        # The trailing rank column only feeds the cursor
+        ranked = [(self._to_summary(values[:-1]), values[-1]) for values in map(tuple, results)]
+        page = build_page(ranked, limit, lambda match: (match[1], match[0].user_id))
+        return Page(items=[user for user, _ in page.items], next_cursor=page.next_cursor)
+
+    async def search_usernames_by_prefix(self, prefix: str, limit: int, cursor: str | None = None) -> Page[UserSummary]:
+        like_pattern = f"{_escape_like(prefix.lower())}%"
+        if cursor is None:
+            results = await self.db.fetch_rows(SEARCH_USERNAME_PREFIX, (like_pattern, limit + 1))
+        else:
+            results = await self.db.fetch_rows(SEARCH_USERNAME_PREFIX_AFTER, (like_pattern, *decode_cursor(cursor, str), limit + 1))
+        users = [self._to_summary(row) for row in results]
+        return build_page(users, limit, lambda user: (user.username.lower(), user.user_id))
     
     # May need transactional versions of pagination and count methods
     # May need the count to be accurate within a transaction for metadata purposes
\ No newline at end of file
@@ -0,0 +1,200 @@
+import asyncio
+import hmac
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from math import ceil
+from uuid import UUID
+
+try:
+    from argon2.low_level import Type, hash_secret_raw
+except ImportError:
+    hash_secret_raw = None
+
+from news_backend.http import OverloadedResponse
+from news_backend.metrics import Histogram
+from news_users.data_classes.user_model import User
+from news_users.repositories.users_repository import UserRepository
+
+# Raw argon2id cost, recorded next to every hash in users.password_params
+@dataclass(frozen=True, slots=True)
+class Argon2Params:
+    time_cost: int = 3
+    memory_cost: int = 64 * 1024  # KiB
+    parallelism: int = 4
+    hash_len: int = 32
+
+    def encode(self) -> str:
+        return f"m={self.memory_cost},t={self.time_cost},p={self.parallelism},l={self.hash_len}"
+
+    @classmethod
+    def decode(cls, text: str | None) -> "Argon2Params":
+        if text is None:
+            return LEGACY_PARAMS
+        values = dict(part.split("=", 1) for part in text.split(","))
+        return cls(int(values["t"]), int(values["m"]), int(values["p"]), int(values["l"]))
+
+# Hashes stored before password_params existed were made with argon2-cffi's defaults. Spelled out,
+# the class defaults are today's cost and may be raised without touching these rows.
+LEGACY_PARAMS = Argon2Params(time_cost=3, memory_cost=65536, parallelism=4, hash_len=32)
+
+SALT_BYTES = 32
+INACTIVE_STATUSES = ("banned", "deleted")
+
+# Run in the pool's worker processes, module level so they pickle by reference
+def _hash(password: bytes, salt: bytes, params: Argon2Params) -> bytes:
+    return hash_secret_raw(password, salt, params.time_cost, params.memory_cost, params.parallelism, params.hash_len, Type.ID)
+
+def _verify(password: bytes, salt: bytes, expected: bytes, params: Argon2Params) -> bool:
+    return hmac.compare_digest(_hash(password, salt, params), expected)
+
+def _ready() -> None:
+    pass
+
+class CredentialsBusy(Exception):
+    def __init__(self, retry_after: float = 1.0):
+        super().__init__("Too many password checks in flight.")
+        self.retry_after = retry_after
+
+    def to_response(self) -> OverloadedResponse:
+        return OverloadedResponse(retry_after=ceil(self.retry_after))
+
+# Password hashing off the event loop. argon2id runs in a process pool so a login burst costs
+# CPU on other cores instead of stalling every request on this worker; the semaphore caps hashes
+# in flight (each holds memory_cost KiB) and max_waiting bounds the queue behind it, past which
+# callers get CredentialsBusy (a 503). Each gunicorn worker has its own pool, size workers so
+# that gunicorn workers x workers fits the cores.
+class Credentials:
+    def __init__(
+        self,
+        users: UserRepository,
+        params: Argon2Params = Argon2Params(),
+        workers: int = 2,
+        max_concurrency: int | None = None,
+        max_waiting: int = 64,
+    ):
+        if hash_secret_raw is None:
+            raise RuntimeError("argon2-cffi is required for password hashing.")
+        self.users = users
+        self.params = params
+        self.workers = workers
+        self.max_waiting = max_waiting
+        self.waiting = 0
+        self.running = 0
+        self._slots = asyncio.Semaphore(max_concurrency or workers)
+        self._executor: ProcessPoolExecutor | None = None
+        # A dummy record to verify against when the account does not exist, so the response
+        # takes as long as a wrong password would
+        self._dummy = (os.urandom(SALT_BYTES), os.urandom(params.hash_len))
+        metrics = users.db.metrics.metrics
+        self._operations = metrics.counter("credentials_operations_total", "Password hashes and checks by operation and outcome.")
+        self._duration = metrics.histogram("credentials_hash_seconds", "Time in the hashing pool, excluding the queue.")
+        self._wait = metrics.histogram("credentials_queue_seconds", "Time waiting for a hashing slot.")
+        metrics.gauge(
+            "credentials_queue_depth",
+            "Password operations waiting for or holding a hashing slot.",
+            lambda: {(("state", "waiting"),): self.waiting, (("state", "running"),): self.running},
+        )
+        users.db.on_disconnect(self.close)
+
+    # Spawned rather than forked, the parent is an event loop with threads of its own
+    def start(self) -> None:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    # Starts the worker processes now rather than on the first login
+    async def warm_up(self) -> None:
+        self.start()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._executor, _ready) for _ in range(self.workers)))
+
+    async def close(self) -> None:
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.to_thread(executor.shutdown)
+
+    async def _run(self, operation: str, function, *args):
+        if self.waiting >= self.max_waiting:
+            self._count(operation, "shed")
+            raise CredentialsBusy()
+        self.start()
+        queued = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.running += 1
+        started = time.perf_counter()
+        self._observe(self._wait, operation, started - queued)
+        try:
+            future = asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+        except BaseException:
+            self._finished(operation, started)
+            raise
+        # A cancelled caller does not stop the hash already running in a worker, the slot stays
+        # taken until the worker is done so max_concurrency still bounds the pool's real load
+        future.add_done_callback(lambda _: self._finished(operation, started))
+        return await asyncio.shield(future)
+
+    def _finished(self, operation: str, started: float) -> None:
+        self.running -= 1
+        self._slots.release()
+        self._observe(self._duration, operation, time.perf_counter() - started)
+
+    # Returns (hash, salt, params) ready for create_user/update_user_password
+    async def hash_password(self, password: str) -> tuple[bytes, bytes, str]:
+        salt = os.urandom(SALT_BYTES)
+        password_hash = await self._run("hash", _hash, password.encode("utf-8"), salt, self.params)
+        self._count("hash", "ok")
+        return password_hash, salt, self.params.encode()
+
+    async def verify_password(self, user: User, password: str) -> bool:
+        params = Argon2Params.decode(user.password_params)
+        matched = await self._run("verify", _verify, password.encode("utf-8"), user.password_salt, user.password_hash, params)
+        self._count("verify", "ok" if matched else "mismatch")
+        return matched
+
+    # Legacy rows always, so their params get recorded even when they match the current cost
+    def needs_rehash(self, user: User) -> bool:
+        return user.password_params is None or Argon2Params.decode(user.password_params) != self.params
+
+    # Repository Integration
+    async def create_user(self, email: str, username: str, first_name: str, last_name: str, password: str, role_id: UUID) -> User:
+        password_hash, salt, params = await self.hash_password(password)
+        return await self.users.create_user(email, username, first_name, last_name, password_hash, salt, role_id, params)
+
+    async def set_password(self, user_id: UUID, password: str) -> None:
+        password_hash, salt, params = await self.hash_password(password)
+        await self.users.update_user_password(user_id, password_hash, salt, params)
+
+    # The whole login: lookup, check, rehash when the cost parameters changed since the hash was
+    # made, and the buffered last-login touch. None for unknown, inactive or wrong credentials.
+    async def login(self, email: str, password: str) -> User | None:
+        user = await self.users.get_user_by_email(email)
+        if user is None or user.status_type in INACTIVE_STATUSES:
+            salt, expected = self._dummy
+            await self._run("verify", _verify, password.encode("utf-8"), salt, expected, self.params)
+            self._count("verify", "unknown")
+            return None
+        if not await self.verify_password(user, password):
+            return None
+        if self.needs_rehash(user):
+            password_hash, salt, params = await self.hash_password(password)
+            await self.users.update_user_password(user.user_id, password_hash, salt, params)
+            user = replace(user, password_hash=password_hash, password_salt=salt, password_params=params)
+        await self.users.update_user_last_login(user.user_id)
+        return user
+
+    def _count(self, operation: str, outcome: str) -> None:
+        labels = (("operation", operation), ("outcome", outcome))
+        self._operations[labels] = self._operations.get(labels, 0) + 1
+
+    def _observe(self, histograms: dict, operation: str, seconds: float) -> None:
+        labels = (("operation", operation),)
+        histogram = histograms.get(labels)
+        if histogram is None:
+            histogram = histograms[labels] = Histogram()
+        histogram.observe(seconds)
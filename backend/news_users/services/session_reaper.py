@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import random
+import time
+
+from news_backend.backpressure import Priority, lane
+from news_backend.db import Database
+from news_backend.metrics import Histogram
+from news_users.repositories.queries import ADVISORY_UNLOCK, TRY_ADVISORY_LOCK
+from news_users.repositories.sessions_repository import SessionsRepository
+
+logger = logging.getLogger("news_users.session_reaper")
+
+# Advisory lock key shared by every worker, whoever holds it reaps for that cycle
+SESSION_REAPER_LOCK = 0x5E55_10E5
+
+# Background expiry for user_sessions. Every worker runs one, the advisory lock elects a single
+# leader per cycle and the others skip it. Deletes go in small batches with a pause between them
+# so login inserts never queue behind one long lock-holding statement.
+class SessionReaper:
+    def __init__(
+        self,
+        db: Database,
+        sessions: SessionsRepository,
+        batch_size: int = 1000,
+        pause: float = 0.05,
+        interval: float = 60.0,
+        jitter: float = 0.2,
+        max_batches: int = 200,
+        partitioned: bool = False,
+        lock_key: int = SESSION_REAPER_LOCK,
+    ):
+        self.db = db
+        self.sessions = sessions
+        self.batch_size = batch_size
+        self.pause = pause
+        self.interval = interval
+        self.jitter = jitter
+        self.max_batches = max_batches
+        self.partitioned = partitioned
+        self.lock_key = lock_key
+        self.last_success: float | None = None
+        self._drained = True
+        self._task: asyncio.Task | None = None
+        metrics = db.metrics.metrics
+        self._deleted = metrics.counter("session_reaper_deleted_total", "Expired sessions deleted by the reaper.")
+        self._batches = metrics.counter("session_reaper_batches_total", "Delete batches issued by the reaper.")
+        self._cycles = metrics.counter("session_reaper_cycles_total", "Reaper cycles by outcome.")
+        self._duration = metrics.histogram("session_reaper_cycle_seconds", "Wall time of cycles this worker led.")
+        metrics.gauge(
+            "session_reaper_last_success_timestamp_seconds",
+            "Unix time of the last cycle this worker completed as leader.",
+            lambda: {} if self.last_success is None else {(): self.last_success},
+        )
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    # One cycle. Returns rows deleted, or None when another worker holds the lock
+    async def run_once(self) -> int | None:
+        with lane(Priority.BULK):
+            return await self._run_once()
+
+    async def _run_once(self) -> int | None:
+        async with self.db.acquire() as connection:
+            if not await self.db.fetch_value_conn(connection, TRY_ADVISORY_LOCK, (self.lock_key,)):
+                self._count(self._cycles, "follower")
+                self._drained = True
+                return None
+            start = time.perf_counter()
+            try:
+                deleted, self._drained = await self._reap(connection)
+            finally:
+                # Session-level lock, released on this connection. Pool resets also unlock all
+                await self.db.fetch_value_conn(connection, ADVISORY_UNLOCK, (self.lock_key,))
+        self._observe(time.perf_counter() - start)
+        self._count(self._cycles, "leader")
+        self.last_success = time.time()
+        if deleted:
+            logger.info("Reaped %d expired sessions%s", deleted, "" if self._drained else ", more remain")
+        return deleted
+
+    async def _reap(self, connection) -> tuple[int, bool]:
+        if self.partitioned:
+            await self.sessions.ensure_partitions_conn(connection)
+            await self.sessions.drop_expired_partitions_conn(connection)
+        deleted = 0
+        drained = False
+        for batch in range(self.max_batches):
+            if batch:
+                await asyncio.sleep(self.pause)
+            count = await self.sessions.delete_expired_sessions_batch_conn(connection, self.batch_size)
+            deleted += count
+            self._count(self._batches)
+            self._count(self._deleted, amount=count)
+            if count < self.batch_size:
+                drained = True
+                break
+        await self.sessions.prune_expiry_buckets_conn(connection)
+        return deleted, drained
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self._drained = True
+                self._count(self._cycles, "error")
+                logger.exception("Session reaper cycle failed")
+            # A cycle cut short by max_batches resumes after a pause rather than a full interval.
+            # Jitter keeps workers started together from contending for the lock in lockstep.
+            delay = self.interval if self._drained else self.pause
+            await asyncio.sleep(delay * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    def _count(self, counter: dict, outcome: str | None = None, amount: int = 1) -> None:
+        labels = () if outcome is None else (("outcome", outcome),)
+        counter[labels] = counter.get(labels, 0) + amount
+
+    def _observe(self, seconds: float) -> None:
+        histogram = self._duration.get(())
+        if histogram is None:
+            histogram = self._duration[()] = Histogram()
+        histogram.observe(seconds)
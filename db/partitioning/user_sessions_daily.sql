@@ -0,0 +1,134 @@
+-- Optional layout: user_sessions range-partitioned by day of expires_at (UTC), expiry becomes a partition drop.
+-- Not part of the container init, apply by hand to a database created from scripts/init.sql:
+--   psql "$DB_DSN" -v ON_ERROR_STOP=1 -f db/partitioning/user_sessions_daily.sql
+-- then construct SessionReaper with partitioned=True so each cycle creates upcoming days and drops expired ones.
+--
+-- Differences from the plain table:
+--   * the primary key and token_hash uniqueness include expires_at (Postgres requires the partition key),
+--     token lookups probe each live partition's index, a handful with 24 hour sessions
+--   * only unexpired sessions are carried over
+
+BEGIN;
+
+ALTER TABLE user_sessions RENAME TO user_sessions_unpartitioned;
+
+CREATE TABLE user_sessions (
+  session_id UUID NOT NULL DEFAULT gen_random_uuid(),
+  user_id UUID NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+  -- session token is not saved only sent to user in httponly cookie
+  token_hash bytea NOT NULL, -- 32 bytes derived from a sha-256 hash of session token
+  created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  expires_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP + INTERVAL '24 hours', -- reset as needed
+  PRIMARY KEY (session_id, expires_at),
+  UNIQUE (token_hash, expires_at)
+) PARTITION BY RANGE (expires_at);
+
+-- Catches expiries beyond the pre-created days, e.g. sessions extended far ahead
+CREATE TABLE user_sessions_default PARTITION OF user_sessions DEFAULT;
+
+CREATE OR REPLACE FUNCTION ensure_user_session_partitions(days_ahead integer DEFAULT 3)
+RETURNS integer AS $$
+DECLARE
+    day date;
+    day_start timestamptz;
+    partition_name text;
+    created integer := 0;
+BEGIN
+    FOR day IN
+        SELECT generate_series(current_date - 1, current_date + days_ahead, INTERVAL '1 day')::date
+    LOOP
+        partition_name := 'user_sessions_p' || to_char(day, 'YYYYMMDD');
+        CONTINUE WHEN to_regclass(partition_name) IS NOT NULL;
+        day_start := day::timestamp AT TIME ZONE 'UTC';
+        -- A day that already has rows in the default partition cannot be attached, leave it there
+        IF EXISTS (
+            SELECT 1 FROM user_sessions_default
+            WHERE expires_at >= day_start AND expires_at < day_start + INTERVAL '1 day'
+        ) THEN
+            RAISE NOTICE 'user_sessions_default holds rows for %, not partitioning that day', day;
+            CONTINUE;
+        END IF;
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF user_sessions FOR VALUES FROM (%L) TO (%L)',
+            partition_name, day_start, day_start + INTERVAL '1 day'
+        );
+        created := created + 1;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Dropping a partition skips the delete triggers, so its expiry buckets are removed here as well.
+-- The drop briefly locks the parent table, lock_timeout keeps it from queueing behind logins.
+CREATE OR REPLACE FUNCTION drop_expired_user_session_partitions()
+RETURNS integer AS $$
+DECLARE
+    part record;
+    day_start timestamptz;
+    dropped integer := 0;
+BEGIN
+    PERFORM set_config('lock_timeout', '2s', true);
+    FOR part IN
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = 'user_sessions' AND child.relname ~ '^user_sessions_p[0-9]{8}$'
+    LOOP
+        day_start := to_date(right(part.relname, 8), 'YYYYMMDD')::timestamp AT TIME ZONE 'UTC';
+        CONTINUE WHEN day_start + INTERVAL '1 day' > CURRENT_TIMESTAMP;
+        BEGIN
+            EXECUTE format('DROP TABLE %I', part.relname);
+            DELETE FROM session_expiry_buckets
+            WHERE bucket >= day_start AND bucket < day_start + INTERVAL '1 day';
+            dropped := dropped + 1;
+        EXCEPTION WHEN lock_not_available THEN
+            RAISE NOTICE 'could not lock % in time, retrying next cycle', part.relname;
+        END;
+    END LOOP;
+    RETURN dropped;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT ensure_user_session_partitions();
+
+INSERT INTO user_sessions (session_id, user_id, token_hash, created_at, expires_at)
+SELECT session_id, user_id, token_hash, COALESCE(created_at, CURRENT_TIMESTAMP), expires_at
+FROM user_sessions_unpartitioned
+WHERE expires_at > CURRENT_TIMESTAMP;
+
+-- Drops the old table's indexes and count trigger along with it
+DROP TABLE user_sessions_unpartitioned;
+
+-- Rebuilt in one pass, the copy above ran before the count triggers existed on the new table
+TRUNCATE session_expiry_buckets;
+INSERT INTO session_expiry_buckets (bucket, shard, session_count)
+SELECT date_trunc('minute', expires_at), 0, COUNT(*)
+FROM user_sessions
+GROUP BY 1;
+
+CREATE TRIGGER trigger_session_expiry_insert
+AFTER INSERT ON user_sessions
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION session_expiry_counts();
+
+CREATE TRIGGER trigger_session_expiry_delete
+AFTER DELETE ON user_sessions
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION session_expiry_counts();
+
+CREATE TRIGGER trigger_session_expiry_update
+AFTER UPDATE ON user_sessions
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION session_expiry_counts();
+
+CREATE INDEX idx_sessions_user ON user_sessions(user_id);
+CREATE INDEX idx_sessions_created ON user_sessions(created_at DESC, session_id DESC);
+CREATE INDEX idx_sessions_expires ON user_sessions(expires_at);
+
+COMMIT;
+
+ANALYZE user_sessions;
@@ -1,5 +1,6 @@
 CREATE EXTENSION IF NOT EXISTS "pgcrypto";
 Create EXTENSION IF NOT EXISTS "citext";
+CREATE EXTENSION IF NOT EXISTS "pg_trgm";
 
 -- Enums
 CREATE TYPE user_status AS ENUM ('active', 'pending_verification', 'banned', 'deleted');
@@ -38,13 +39,14 @@ CREATE TABLE IF NOT EXISTS users (
   -- Password is never stored in plaintext set max input length to 20 chars
   password_hash bytea NOT NULL, -- 32 bytes argon2id manual output
   password_salt bytea NOT NULL, -- 32 bytes salt 2^256 possible salts
+  password_params TEXT, -- argon2id cost the hash was made with e.g. 'm=65536,t=3,p=4,l=32', NULL for hashes made before it was recorded
   -- Roles & Types
   user_role UUID NOT NULL REFERENCES roles(role_id), -- user roles enumerated above
   status_type user_status NOT NULL DEFAULT 'pending_verification',
   -- Timestamps
   created_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
   updated_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP, -- updated via trigger on row update
-  last_login TIMESTAMPTZ
+  last_login TIMESTAMPTZ,
   deleted_at TIMESTAMPTZ
 );
 
@@ -64,6 +66,13 @@ CREATE TABLE IF NOT EXISTS writer_profiles (
   profile_image_url TEXT -- referential URL pointing to image hosting solution
 );
 
+-- array_to_string is only STABLE, generated columns need an IMMUTABLE expression. Tags are
+-- plain words, no locale-dependent output is involved.
+CREATE OR REPLACE FUNCTION tags_to_text(tags CITEXT[])
+RETURNS TEXT AS $$
+    SELECT array_to_string(tags, ' ')
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
 -- Articles table
 CREATE TABLE IF NOT EXISTS articles (
   -- IDs
@@ -81,8 +90,15 @@ CREATE TABLE IF NOT EXISTS articles (
   -- Publication info
   is_published BOOLEAN DEFAULT FALSE, -- whether article is published or draft
   published_at TIMESTAMP WITH TIME ZONE,
-  created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-  updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+  created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP, -- keyset cursors need a value on every row
+  updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  -- Full-text search, weighted title > tags > excerpt > content and kept current by Postgres
+  search_vector TSVECTOR GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', title), 'A') ||
+    setweight(to_tsvector('english', coalesce(tags_to_text(tags), '')), 'B') ||
+    setweight(to_tsvector('english', coalesce(excerpt, '')), 'C') ||
+    setweight(to_tsvector('english', content), 'D')
+  ) STORED
 );
 
 -- Media table
@@ -101,14 +117,44 @@ CREATE TABLE IF NOT EXISTS user_sessions (
   user_id UUID NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
   -- session token is not saved only sent to user in httponly cookie
   token_hash bytea UNIQUE NOT NULL, -- 32 bytes derived from a sha-256 hash of session token
-  created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-  expires_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP + INTERVAL '24 hours' -- reset as needed
+  created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP, -- keyset cursors need a value on every row
+  expires_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP + INTERVAL '24 hours' -- reset as needed
+);
+
+-- Counter tables, maintained by the count triggers below so dashboards never COUNT(*) users.
+-- Each count is split over shards picked per backend (counter_shard()) so concurrent writers
+-- rarely wait on the same row lock, readers SUM the shards. A single shard can go negative.
+CREATE TABLE IF NOT EXISTS user_role_counts (
+  user_role UUID NOT NULL REFERENCES roles(role_id) ON DELETE CASCADE,
+  shard SMALLINT NOT NULL DEFAULT 0,
+  user_count BIGINT NOT NULL DEFAULT 0,
+  PRIMARY KEY (user_role, shard)
+);
+
+CREATE TABLE IF NOT EXISTS user_status_counts (
+  status_type user_status NOT NULL,
+  shard SMALLINT NOT NULL DEFAULT 0,
+  user_count BIGINT NOT NULL DEFAULT 0,
+  PRIMARY KEY (status_type, shard)
+);
+
+-- Sessions per expiry minute, active/expired totals sum the buckets either side of now
+CREATE TABLE IF NOT EXISTS session_expiry_buckets (
+  bucket TIMESTAMPTZ NOT NULL, -- expires_at truncated to the minute
+  shard SMALLINT NOT NULL DEFAULT 0,
+  session_count BIGINT NOT NULL DEFAULT 0,
+  PRIMARY KEY (bucket, shard)
 );
 
 -- Trigger functions
 CREATE OR REPLACE FUNCTION user_updated_at()
 RETURNS trigger AS $$
 BEGIN
+    -- Login touches are not profile changes, leave updated_at alone when only last_login moved
+    IF NEW.last_login IS DISTINCT FROM OLD.last_login
+       AND to_jsonb(NEW) - 'last_login' = to_jsonb(OLD) - 'last_login' THEN
+        RETURN NEW;
+    END IF;
     NEW.updated_at := CURRENT_TIMESTAMP;
     RETURN NEW;
 END;
@@ -132,11 +178,140 @@ BEFORE UPDATE ON articles
 FOR EACH ROW
 EXECUTE FUNCTION articles_updated_at();
 
+CREATE OR REPLACE FUNCTION counter_shard()
+RETURNS SMALLINT AS $$
+    SELECT (pg_backend_pid() % 16)::smallint;
+$$ LANGUAGE sql STABLE;
+
+-- Statement level with transition tables: a statement adds one upsert per distinct role and
+-- status it touched rather than one per row, so a COPY of 100k users is two small upserts.
+-- Rows are upserted in key order so concurrent statements lock them in the same order.
+CREATE OR REPLACE FUNCTION user_counts()
+RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO user_role_counts (user_role, shard, user_count)
+        SELECT user_role, counter_shard(), count(*) FROM new_rows GROUP BY user_role ORDER BY user_role
+        ON CONFLICT (user_role, shard) DO UPDATE SET user_count = user_role_counts.user_count + EXCLUDED.user_count;
+        INSERT INTO user_status_counts (status_type, shard, user_count)
+        SELECT status_type, counter_shard(), count(*) FROM new_rows GROUP BY status_type ORDER BY status_type
+        ON CONFLICT (status_type, shard) DO UPDATE SET user_count = user_status_counts.user_count + EXCLUDED.user_count;
+    ELSE
+        INSERT INTO user_role_counts (user_role, shard, user_count)
+        SELECT user_role, counter_shard(), -count(*) FROM old_rows GROUP BY user_role ORDER BY user_role
+        ON CONFLICT (user_role, shard) DO UPDATE SET user_count = user_role_counts.user_count + EXCLUDED.user_count;
+        INSERT INTO user_status_counts (status_type, shard, user_count)
+        SELECT status_type, counter_shard(), -count(*) FROM old_rows GROUP BY status_type ORDER BY status_type
+        ON CONFLICT (status_type, shard) DO UPDATE SET user_count = user_status_counts.user_count + EXCLUDED.user_count;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Role and status changes are single-row admin actions, and a statement-level UPDATE trigger
+-- would capture every row of every last_login flush, so updates stay row level behind WHEN
+CREATE OR REPLACE FUNCTION user_count_changes()
+RETURNS trigger AS $$
+BEGIN
+    IF OLD.user_role IS DISTINCT FROM NEW.user_role THEN
+        INSERT INTO user_role_counts (user_role, shard, user_count)
+        SELECT role, counter_shard(), delta FROM (VALUES (OLD.user_role, -1), (NEW.user_role, 1)) AS change(role, delta) ORDER BY role
+        ON CONFLICT (user_role, shard) DO UPDATE SET user_count = user_role_counts.user_count + EXCLUDED.user_count;
+    END IF;
+    IF OLD.status_type IS DISTINCT FROM NEW.status_type THEN
+        INSERT INTO user_status_counts (status_type, shard, user_count)
+        SELECT status, counter_shard(), delta FROM (VALUES (OLD.status_type, -1), (NEW.status_type, 1)) AS change(status, delta) ORDER BY status
+        ON CONFLICT (status_type, shard) DO UPDATE SET user_count = user_status_counts.user_count + EXCLUDED.user_count;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables allow only one event per trigger
+CREATE TRIGGER trigger_user_counts_insert
+AFTER INSERT ON users
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION user_counts();
+
+CREATE TRIGGER trigger_user_counts_delete
+AFTER DELETE ON users
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION user_counts();
+
+CREATE TRIGGER trigger_user_counts_update
+AFTER UPDATE OF user_role, status_type ON users
+FOR EACH ROW
+WHEN (OLD.user_role IS DISTINCT FROM NEW.user_role OR OLD.status_type IS DISTINCT FROM NEW.status_type)
+EXECUTE FUNCTION user_count_changes();
+
+-- Statement level as well, one upsert per expiry minute a statement moved sessions in or out of.
+-- Sliding-expiry flushes update batches of sessions at once and mostly land in a few minutes.
+CREATE OR REPLACE FUNCTION session_expiry_counts()
+RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO session_expiry_buckets (bucket, shard, session_count)
+        SELECT date_trunc('minute', expires_at), counter_shard(), count(*)
+        FROM new_rows GROUP BY 1 ORDER BY 1
+        ON CONFLICT (bucket, shard) DO UPDATE SET session_count = session_expiry_buckets.session_count + EXCLUDED.session_count;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO session_expiry_buckets (bucket, shard, session_count)
+        SELECT date_trunc('minute', expires_at), counter_shard(), -count(*)
+        FROM old_rows GROUP BY 1 ORDER BY 1
+        ON CONFLICT (bucket, shard) DO UPDATE SET session_count = session_expiry_buckets.session_count + EXCLUDED.session_count;
+    ELSE
+        INSERT INTO session_expiry_buckets (bucket, shard, session_count)
+        SELECT bucket, counter_shard(), sum(delta) FROM (
+            SELECT date_trunc('minute', expires_at) AS bucket, 1 AS delta FROM new_rows
+            UNION ALL
+            SELECT date_trunc('minute', expires_at), -1 FROM old_rows
+        ) AS moved
+        GROUP BY bucket HAVING sum(delta) <> 0 ORDER BY bucket
+        ON CONFLICT (bucket, shard) DO UPDATE SET session_count = session_expiry_buckets.session_count + EXCLUDED.session_count;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_session_expiry_insert
+AFTER INSERT ON user_sessions
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION session_expiry_counts();
+
+CREATE TRIGGER trigger_session_expiry_delete
+AFTER DELETE ON user_sessions
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION session_expiry_counts();
+
+-- Transition tables rule out UPDATE OF, expires_at is the only column sessions ever update
+CREATE TRIGGER trigger_session_expiry_update
+AFTER UPDATE ON user_sessions
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION session_expiry_counts();
+
 -- Indexes
 CREATE INDEX idx_writers_org ON writer_profiles(org_id);
 CREATE INDEX idx_articles_writer ON articles(writer_id);
-CREATE INDEX idx_articles_published ON articles(is_published, published_at DESC);
-CREATE INDEX idx_articles_category ON articles(category, published_at DESC);
+-- Feed keyset indexes, match the (published_at, article_id) ordering and the published predicate of the feed queries
+CREATE INDEX idx_articles_published ON articles(published_at DESC, article_id DESC) WHERE is_published AND published_at IS NOT NULL;
+CREATE INDEX idx_articles_category ON articles(category, published_at DESC, article_id DESC) WHERE is_published AND published_at IS NOT NULL;
 CREATE INDEX idx_articles_tags ON articles USING GIN(tags);
+CREATE INDEX idx_articles_search ON articles USING GIN(search_vector);
 CREATE INDEX idx_media_article ON media(article_id);
 CREATE INDEX idx_sessions_user ON user_sessions(user_id);
+-- Keyset pagination indexes, match the (created_at, id) ordering used by listings
+CREATE INDEX idx_users_created ON users(created_at DESC, user_id DESC);
+CREATE INDEX idx_users_role_created ON users(user_role, created_at DESC, user_id DESC);
+CREATE INDEX idx_users_status_created ON users(status_type, created_at DESC, user_id DESC);
+CREATE INDEX idx_sessions_created ON user_sessions(created_at DESC, session_id DESC);
+CREATE INDEX idx_sessions_expires ON user_sessions(expires_at);
+-- User search, trigram GIN for substring matches and a C-collated btree for username prefixes
+CREATE INDEX idx_users_email_trgm ON users USING GIN (lower(email::text) gin_trgm_ops);
+CREATE INDEX idx_users_username_trgm ON users USING GIN (lower(username::text) gin_trgm_ops);
+-- The prefix LIKE, ORDER BY and keyset comparison all use the C collation so this one index serves them
+CREATE INDEX idx_users_username_prefix ON users((lower(username::text) COLLATE "C"), user_id);